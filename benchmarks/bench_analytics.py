@@ -0,0 +1,203 @@
+"""
+Analytics read path: reporting queries run as raw GROUP BYs over tweet_actions against the
+same answers read from the rollups of twitter_bot.analytics, over a generated action
+history (10M actions by default, spread over 90 days and 20 bot accounts). Also times the
+initial rollup build and an incremental refresh after another hour of actions, and checks
+that every rollup answer matches its raw query.
+
+Uses a temporary SQLite file by default; set BENCH_DATABASE_URL to run against a scratch
+PostgreSQL database (generated rows are left in place, the rollups are rebuilt).
+
+    poetry run python benchmarks/bench_analytics.py
+    poetry run python benchmarks/bench_analytics.py --actions 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select, text
+from twitter_bot.analytics import ACCOUNT, ROLLUP_TABLES, ActionAnalytics, _utc_naive, time_bucket
+from twitter_bot.db import Tweet, TweetAction, TwitterDBLogger, TwitterUser
+
+DAYS = 90
+ACCOUNTS = 20
+AUTHORS = 1000
+TWEETS = 200000
+CHUNK = 1000000
+
+# Row generators; :lo..:hi is the range of sequence numbers to insert.
+SEQUENCE = {
+    'sqlite': "WITH RECURSIVE seq(x) AS (SELECT :lo UNION ALL SELECT x + 1 FROM seq WHERE x < :hi) ",
+    'postgresql': ""
+}
+FROM_SEQUENCE = {'sqlite': "FROM seq", 'postgresql': "FROM generate_series(:lo, :hi) AS x"}
+TIMESTAMP = {
+    'sqlite': "strftime('%Y-%m-%d %H:%M:%S', {}, 'unixepoch') || '.000000'",
+    'postgresql': "to_timestamp({}) AT TIME ZONE 'UTC'"
+}
+JSON_OBJECT = {'sqlite': 'json_object', 'postgresql': 'jsonb_build_object'}
+
+
+def generate(conn, dialect: str, tag: str, actions: int, start: float, span: float, first_action: int = 0) -> None:
+    """Users, tweets (first call only) and `actions` actions evenly spread over [start, start + span)."""
+    seq, source, ts, obj = SEQUENCE[dialect], FROM_SEQUENCE[dialect], TIMESTAMP[dialect], JSON_OBJECT[dialect]
+    if not first_action:
+        conn.execute(text(
+            f"INSERT INTO twitter_users (twitter_handle) {seq}SELECT 'b{tag}_' || x {source}"
+        ), {'lo': 1, 'hi': AUTHORS})
+        first_user = conn.execute(select(func.min(TwitterUser.id)).where(TwitterUser.twitter_handle.like(f'b{tag}_%'))).scalar()
+        # Skewed towards low author numbers, so some authors are acted on far more than others.
+        conn.execute(text(
+            f"INSERT INTO tweets (tweet_id, author_id, content, metadata) {seq}"
+            f"SELECT '{tag}-' || x, :first_user + x % (1 + x % :authors), 'Bench tweet ' || x, "
+            f"{obj}('url', 'https://twitter.com/bench/status/' || x) {source}"
+        ), {'lo': 1, 'hi': TWEETS, 'first_user': first_user, 'authors': AUTHORS})
+    first_tweet = conn.execute(select(func.min(Tweet.id)).where(Tweet.tweet_id.like(f'{tag}-%'))).scalar()
+    for lo in range(first_action, first_action + actions, CHUNK):
+        hi = min(lo + CHUNK, first_action + actions) - 1
+        conn.execute(text(
+            "INSERT INTO tweet_actions (tweet_id, action_type, likes, retweets, replies, action_timestamp, extra) "
+            f"{seq}SELECT :first_tweet + (x * 7919) % :tweets, "
+            "CASE WHEN x % 2 = 0 THEN 'repost' ELSE 'reply' END, (x * 37) % 5000, (x * 13) % 900, x % 120, "
+            f"{ts.format(':start + (x - :first) * :span / :n')}, "
+            f"{obj}('url', 'https://twitter.com/bench/status/' || x, 'account', 'bot' || (x % :accounts)) {source}"
+        ), {'lo': lo, 'hi': hi, 'first_tweet': first_tweet, 'tweets': TWEETS, 'start': int(start), 'first': first_action,
+            'span': int(span), 'n': actions, 'accounts': ACCOUNTS})
+        if actions > CHUNK:
+            print(f"  generated {hi + 1 - first_action:,} actions")
+
+
+def raw_rows(dialect: str):
+    actions = TweetAction.__table__
+    return select(
+        time_bucket(actions.c.action_timestamp, dialect).label('hour'),
+        func.coalesce(ACCOUNT, '').label('account'),
+        actions.c.action_type, actions.c.likes, actions.c.retweets, actions.c.replies, actions.c.tweet_id,
+        actions.c.action_timestamp
+    )
+
+
+def raw_per_hour(conn, dialect: str, since: datetime):
+    rows = raw_rows(dialect).where(TweetAction.action_timestamp >= since).subquery()
+    stmt = select(rows.c.hour, rows.c.account, rows.c.action_type, func.count()).group_by(
+        rows.c.hour, rows.c.account, rows.c.action_type
+    )
+    return {(_hour(hour), account, action_type): n for hour, account, action_type, n in conn.execute(stmt)}
+
+
+def raw_per_account(conn, dialect: str):
+    rows = raw_rows(dialect).subquery()
+    stmt = select(rows.c.account, func.count()).group_by(rows.c.account)
+    return sorted(({'account': account, 'actions': n} for account, n in conn.execute(stmt)),
+                  key=lambda row: (-row['actions'], row['account']))
+
+
+def raw_reply_engagement(conn):
+    actions = TweetAction.__table__
+    count, likes, retweets, replies = conn.execute(select(
+        func.count(), func.sum(actions.c.likes), func.sum(actions.c.retweets), func.sum(actions.c.replies)
+    ).where(actions.c.action_type == 'reply')).one()
+    return {'replies_sent': count, 'avg_likes': likes / count, 'avg_retweets': retweets / count, 'avg_replies': replies / count}
+
+
+def raw_top_authors(conn, limit: int = 10):
+    actions, tweets, users = TweetAction.__table__, Tweet.__table__, TwitterUser.__table__
+    total = func.count().label('actions')
+    stmt = select(users.c.twitter_handle, total).select_from(
+        actions.join(tweets, tweets.c.id == actions.c.tweet_id).join(users, users.c.id == tweets.c.author_id)
+    ).group_by(users.c.id, users.c.twitter_handle).order_by(total.desc(), users.c.id).limit(limit)
+    return [{'author': handle, 'actions': n} for handle, n in conn.execute(stmt)]
+
+
+def _hour(value) -> datetime:
+    """Raw hour buckets come back as text on SQLite."""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw GROUP BY scans versus hourly rollups.")
+    parser.add_argument('--actions', type=int, default=10_000_000, help="actions to generate (default 10M)")
+    parser.add_argument('--fresh', type=int, default=20000, help="actions added in the last hour before the incremental refresh")
+    args = parser.parse_args()
+
+    url = os.getenv('BENCH_DATABASE_URL')
+    tmpdir = None
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    db = TwitterDBLogger(url)
+    dialect = db.engine.dialect.name
+    analytics = ActionAnalytics(db)
+    now = _utc_naive(datetime.now(timezone.utc))
+    tag = str(int(time.time()))
+
+    start = time.perf_counter()
+    with db.engine.begin() as conn:
+        generate(conn, dialect, tag, args.actions, (now - timedelta(days=DAYS)).replace(tzinfo=timezone.utc).timestamp(), DAYS * 86400 - 3600)
+    print(f"generated {args.actions:,} actions in {time.perf_counter() - start:.1f}s ({dialect})")
+    _, seconds = timed(analytics.migrate)
+    print(f"migrate (indexes{', partitions' if dialect == 'postgresql' else ''}): {seconds:.1f}s")
+    with db.engine.begin() as conn:
+        for table in ROLLUP_TABLES:
+            conn.execute(delete(table))
+        if dialect == 'sqlite':
+            conn.exec_driver_sql("ANALYZE")
+        else:
+            conn.exec_driver_sql("ANALYZE tweet_actions")
+
+    result, seconds = timed(analytics.refresh, now)
+    print(f"initial rollup build: {seconds:.1f}s ({result['action_rows']:,} action, {result['author_rows']:,} author rollup rows)")
+
+    week = (now - timedelta(days=7)).replace(minute=0, second=0, microsecond=0)
+    with db.engine.connect() as conn:
+        queries = [
+            ('actions per account per hour, 7 days',
+             lambda: raw_per_hour(conn, dialect, week),
+             lambda: {(row['hour'], row['account'], row['action_type']): row['actions'] for row in analytics.actions_per_hour(since=week)}),
+            ('actions per account, all time', lambda: raw_per_account(conn, dialect), analytics.actions_per_account),
+            ('reply engagement, all time', lambda: raw_reply_engagement(conn), analytics.reply_engagement),
+            ('top 10 authors, all time', lambda: raw_top_authors(conn), analytics.top_authors),
+        ]
+        for name, raw, rollup in queries:
+            expected, raw_seconds = timed(raw)
+            got, rollup_seconds = timed(rollup)
+            if isinstance(expected, dict) and 'avg_likes' in expected:
+                assert got['replies_sent'] == expected['replies_sent'] and all(
+                    abs(got[key] - expected[key]) < 1e-6 for key in expected
+                ), (got, expected)
+            else:
+                assert got == expected, (name, got if len(str(got)) < 500 else len(got))
+            print(f"{name:<40} raw {raw_seconds * 1000:9.1f} ms | rollup {rollup_seconds * 1000:7.1f} ms | "
+                  f"{raw_seconds / rollup_seconds:7.0f}x")
+
+    # Another hour of actions, then an incremental refresh re-aggregates only the last few hours.
+    with db.engine.begin() as conn:
+        generate(conn, dialect, tag, args.fresh, (now - timedelta(minutes=59)).replace(tzinfo=timezone.utc).timestamp(), 3540,
+                 first_action=args.actions)
+    result, seconds = timed(analytics.refresh, now + timedelta(minutes=1))
+    print(f"incremental refresh after {args.fresh:,} new actions: {seconds * 1000:.0f} ms "
+          f"(from {result['from']}, {result['action_rows']:,} action rollup rows rewritten)")
+    with db.engine.connect() as conn:
+        assert analytics.actions_per_account() == raw_per_account(conn, dialect)
+        expected = raw_per_hour(conn, dialect, week)
+    got = {(row['hour'], row['account'], row['action_type']): row['actions'] for row in analytics.actions_per_hour(since=week)}
+    assert got == expected
+    print("rollups match the raw queries after the incremental refresh")
+    db.close()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
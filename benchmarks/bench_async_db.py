@@ -0,0 +1,115 @@
+"""
+AsyncTwitterDBLogger against aiosqlite: actions logged one transaction each with the sync
+TwitterDBLogger (as the runner does, in an executor thread) versus enqueued and written in
+batches by the async logger, plus checks of its batching, flush-on-interval, shutdown
+draining and full-queue behaviour.
+
+    poetry run python benchmarks/bench_async_db.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from twitter_bot.async_db import AsyncTwitterDBLogger
+from twitter_bot.db import TweetAction, TwitterDBLogger
+
+ACTIONS = 2000
+
+
+def count_actions(url: str) -> int:
+    db = TwitterDBLogger(url)
+    with db.engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(TweetAction.__table__)).scalar()
+    db.close()
+    return count
+
+
+async def ids(logger: AsyncTwitterDBLogger):
+    user_id = await logger.upsert_user('bench')
+    tweet_id = await logger.upsert_tweet('1', user_id, 'Async logger benchmark tweet')
+    session_id = await logger.create_session(user_id, datetime.now(timezone.utc))
+    return session_id, tweet_id
+
+
+def enqueue(logger: AsyncTwitterDBLogger, session_id: int, tweet_id: int, n: int) -> int:
+    return sum(logger.enqueue_action(session_id, tweet_id, 'repost', likes=i) for i in range(n))
+
+
+async def sync_per_call(url: str) -> float:
+    db = TwitterDBLogger(url)
+    user_id = db.upsert_user('bench')
+    tweet_id = db.upsert_tweet('1', user_id, 'Async logger benchmark tweet')
+    session_id = db.create_session(user_id, datetime.now(timezone.utc))
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    for i in range(ACTIONS):
+        await loop.run_in_executor(None, db.log_action, session_id, tweet_id, 'repost', None, i)
+    seconds = time.perf_counter() - start
+    db.close()
+    return seconds
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/sync.db"
+        seconds = await sync_per_call(url)
+        assert count_actions(url) == ACTIONS
+        print(f"sync, one transaction per action: {ACTIONS / seconds:8.0f} actions/s")
+
+        # Batching: actions are written batch_size at a time.
+        url = f"sqlite:///{tmp}/batch.db"
+        async with AsyncTwitterDBLogger(url, batch_size=100, flush_interval=5.0) as logger:
+            session_id, tweet_id = await ids(logger)
+            start = time.perf_counter()
+            queued = enqueue(logger, session_id, tweet_id, ACTIONS)
+            enqueue_seconds = time.perf_counter() - start
+            await logger.flush()
+            seconds = time.perf_counter() - start
+            stats = logger.metrics()
+        assert queued == ACTIONS and stats['written'] == ACTIONS and stats['batches'] == ACTIONS // 100, stats
+        assert count_actions(url) == ACTIONS
+        print(f"async, batches of 100:            {ACTIONS / seconds:8.0f} actions/s "
+              f"({enqueue_seconds / ACTIONS * 1e6:.1f} us per enqueue_action, {stats['batches']} batches)")
+
+        # Flush on interval: a partial batch is written once flush_interval has passed.
+        url = f"sqlite:///{tmp}/interval.db"
+        async with AsyncTwitterDBLogger(url, batch_size=100, flush_interval=0.2) as logger:
+            session_id, tweet_id = await ids(logger)
+            enqueue(logger, session_id, tweet_id, 3)
+            await asyncio.sleep(0.6)
+            written = count_actions(url)
+            stats = logger.metrics()
+        assert written == 3 and stats['batches'] == 1 and stats['queue_depth'] == 0, (written, stats)
+        print(f"interval:  3 actions written by the 0.2s flush interval without flush() ({stats['batches']} batch)")
+
+        # Shutdown draining: close() writes whatever is still queued.
+        url = f"sqlite:///{tmp}/drain.db"
+        logger = AsyncTwitterDBLogger(url, batch_size=1000, flush_interval=60.0)
+        await logger.start()
+        session_id, tweet_id = await ids(logger)
+        enqueue(logger, session_id, tweet_id, 250)
+        await logger.close()
+        assert count_actions(url) == 250
+        print("shutdown:  250 queued actions written by close() before a 60s flush interval")
+
+        # Full queue: actions beyond max_queue are dropped and counted, never blocking the caller.
+        url = f"sqlite:///{tmp}/full.db"
+        async with AsyncTwitterDBLogger(url, max_queue=10) as logger:
+            session_id, tweet_id = await ids(logger)
+            with contextlib.redirect_stdout(io.StringIO()):
+                queued = enqueue(logger, session_id, tweet_id, 25)
+            stats = logger.metrics()
+        assert queued == 10 and stats['dropped'] == 15 and count_actions(url) == 10, stats
+        print(f"full:      max_queue=10 kept {queued} of 25 actions, dropped {stats['dropped']}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Compare per-tweet and batched reply generation against the local chat completions stub:
+requests, prompt/completion tokens and wall time for N tweets.
+
+    poetry run python benchmarks/bench_batch_replies.py
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_openai import start_stub_server
+from twitter_bot.ai_reply import AsyncReplyGenerator
+
+SIZES = [1, 5, 20]
+LATENCY = 0.3  # seconds per completion, roughly a short gpt-3.5-turbo reply
+
+
+def responder(body):
+    """Answer batch prompts with JSON replies; drops the last item of the first batch to exercise retries."""
+    prompt = body['messages'][-1]['content']
+    match = re.search(r'Tweets: (\[.*\])$', prompt, re.S)
+    if not match:
+        return "Stub reply with a handful of words."
+    tweets = json.loads(match.group(1))
+    if len(tweets) > 1 and not responder.dropped:
+        responder.dropped = True
+        tweets = tweets[:-1]
+    return json.dumps({'replies': [{'id': t['id'], 'reply': f"Stub reply to @{t['author']}"} for t in tweets]})
+
+
+responder.dropped = False
+
+
+async def main():
+    server, base_url = start_stub_server(latency=LATENCY, responder=responder)
+    tweets = [{'url': f'u{i}', 'author': f'author{i}', 'content': f'Benchmark tweet number {i} about something viral.'} for i in range(max(SIZES))]
+    for n in SIZES:
+        responder.dropped = False
+        async with AsyncReplyGenerator(api_key='stub', base_url=base_url) as generator:
+            start = time.perf_counter()
+            for tweet in tweets[:n]:
+                await generator.generate(tweet['content'], tweet['author'])
+            single_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            replies = await generator.generate_batch(tweets[:n])
+            batch_seconds = time.perf_counter() - start
+            assert not any('AI error' in r for r in replies), replies
+            for mode, seconds in (('single', single_seconds), ('batch', batch_seconds)):
+                u = generator.usage[mode]
+                print(f"{n:>3} tweets | {mode:<6} | {u['requests']:>3} requests | "
+                      f"{u['prompt_tokens']:>5} prompt + {u['completion_tokens']:>4} completion tokens | {seconds:6.2f}s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
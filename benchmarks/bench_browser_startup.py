@@ -0,0 +1,50 @@
+"""
+Benchmark per-run browser startup: a cold Chromium launch per client versus attaching to a
+warm browser (BROWSER_ENDPOINT) and leasing contexts from a BrowserPool.
+
+    poetry run python benchmarks/bench_browser_startup.py
+    poetry run python -m twitter_bot.browser_pool --port 9222 &
+    BROWSER_ENDPOINT=http://127.0.0.1:9222 poetry run python benchmarks/bench_browser_startup.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.browser_pool import BrowserPool
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+
+RUNS = 10
+
+
+async def time_runs(make_client):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        async with make_client() as client:
+            await client.page.set_content('<div data-testid="primaryColumn"></div>')
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    print(f"{name:<22} mean {statistics.mean(timings) * 1000:8.1f} ms | p50 {statistics.median(timings) * 1000:8.1f} ms | max {max(timings) * 1000:8.1f} ms")
+
+
+async def main():
+    endpoint = os.getenv('BROWSER_ENDPOINT')
+    report('cold launch', await time_runs(lambda: PlaywrightTwitterClient('bench', 'bench')))
+    if endpoint:
+        report('warm browser endpoint', await time_runs(
+            lambda: PlaywrightTwitterClient('bench', 'bench', browser_endpoint=endpoint)
+        ))
+    async with BrowserPool(endpoint) as pool:
+        report('context pool', await time_runs(lambda: PlaywrightTwitterClient('bench', 'bench', browser_pool=pool)))
+        print(f"pool stats: {pool.stats}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
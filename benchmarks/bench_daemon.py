@@ -0,0 +1,175 @@
+"""
+Per-engagement overhead of one-shot runs versus the long-running daemon. A one-shot run pays
+for DB engine setup and create_all, a browser launch and a login before it can act, as
+main.py does every time; the daemon pays once and then only plans and acts. The browser is
+a fake client with fixed latencies and replies come from the local chat completions stub.
+
+Also checks that the token-bucket budget caps actions, that budget levels survive a reload,
+and that queued actions survive a daemon restart.
+
+    poetry run python benchmarks/bench_daemon.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import update
+from stub_openai import start_stub_server
+from twitter_bot.ai_reply import AsyncReplyGenerator
+from twitter_bot.daemon import EngagementDaemon
+from twitter_bot.db import ScheduledAction, TwitterDBLogger
+from twitter_bot.rate_budget import RateBudget
+from twitter_bot.runner import engage_best_tweet
+from twitter_bot.work_queue import ActionQueue
+
+ENGAGEMENTS = 6
+LAUNCH_SECONDS = 1.5     # Chromium launch and context setup
+LOGIN_SECONDS = 4.0      # login() with its waits
+TWEET_SECONDS = 0.02     # feed extraction + scrolling per tweet
+NAV_SECONDS = 0.25       # opening a tweet page
+ACTION_SECONDS = 0.15    # clicks for a repost or a reply
+LLM_SECONDS = 0.3        # completion latency of the stub
+
+
+class FakeTwitter:
+    """Stands in for PlaywrightTwitterClient with sleep-based latencies."""
+    def __init__(self, username='bench', offset=0):
+        self.username = username
+        self.offset = offset
+        self.delay_scale = 0.0
+        self.parks = 0
+
+    async def __aenter__(self):
+        await asyncio.sleep(LAUNCH_SECONDS)
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def ensure_logged_in(self):
+        await asyncio.sleep(LOGIN_SECONDS)
+
+    async def refresh_session(self):
+        return False
+
+    async def park(self):
+        self.parks += 1
+
+    async def iter_feed(self, limit=None, stop=None, **kwargs):
+        for i in range(limit or 1000):
+            await asyncio.sleep(TWEET_SECONDS)
+            n = self.offset + i
+            yield {
+                'url': f'https://twitter.com/bench/status/{n}', 'tweet_id': str(n), 'author': f'author{n}',
+                'content': f'Daemon benchmark tweet {n}', 'created_at': datetime.now(timezone.utc),
+                'likes': (n * 37) % 101, 'retweets': (n * 13) % 29, 'replies': n % 7
+            }
+        self.offset += limit or 1000
+
+    async def scrape_feed(self, count=20):
+        return [tweet async for tweet in self.iter_feed(limit=count)]
+
+    async def engage(self, url, actions, reply_text=None):
+        await asyncio.sleep(NAV_SECONDS)
+        results = []
+        for action in actions:
+            text = await reply_text if action == 'reply' and asyncio.isfuture(reply_text) else reply_text
+            await asyncio.sleep(ACTION_SECONDS)
+            results.append({'action': action, 'success': action != 'reply' or bool(text), 'selector': None,
+                            'seconds': ACTION_SECONDS, 'error': None})
+        return results
+
+
+async def one_shot(tmp: str, base_url: str) -> float:
+    """ENGAGEMENTS separate runs, each setting everything up from scratch."""
+    start = time.perf_counter()
+    for run in range(ENGAGEMENTS):
+        db_logger = TwitterDBLogger(f"sqlite:///{tmp}/oneshot.db")
+        async with AsyncReplyGenerator(api_key='stub', base_url=base_url) as generator, FakeTwitter(offset=run * 1000) as twitter:
+            await twitter.ensure_logged_in()
+            await engage_best_tweet(twitter, db_logger, reply_generator=generator)
+        db_logger.close()
+    return time.perf_counter() - start
+
+
+async def run_daemon(daemon: EngagementDaemon, until) -> float:
+    """Run `daemon` until `until()` holds; returns the seconds it took."""
+    stop = asyncio.Event()
+
+    async def watch():
+        while not until():
+            await asyncio.sleep(0.02)
+        stop.set()
+
+    start = time.perf_counter()
+    await asyncio.gather(daemon.run(stop), watch())
+    return time.perf_counter() - start
+
+
+async def main():
+    server, base_url = start_stub_server(latency=LLM_SECONDS)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = await one_shot(tmp, base_url)
+        print(f"one-shot: {ENGAGEMENTS} engagements in {seconds:.1f}s = {seconds / ENGAGEMENTS:.2f}s each")
+
+        db_logger = TwitterDBLogger(f"sqlite:///{tmp}/daemon.db")
+        budget_path = os.path.join(tmp, 'budgets.json')
+        async with AsyncReplyGenerator(api_key='stub', base_url=base_url) as generator:
+            start = time.perf_counter()
+            twitter = await FakeTwitter().__aenter__()
+            await twitter.ensure_logged_in()
+            setup = time.perf_counter() - start
+            budget = RateBudget('bench', per_hour=100, per_day=0, state_path=budget_path)
+            daemon = EngagementDaemon(twitter, db_logger, ActionQueue(db_logger), budget, reply_generator=generator,
+                                      interval=0.0, jitter=0.0, per_cycle=3, feed_size=20)
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds = await run_daemon(daemon, lambda: daemon.stats['engaged'] >= ENGAGEMENTS)
+            engaged = daemon.stats['engaged']
+            print(f"daemon:   {engaged} engagements in {seconds:.1f}s (+{setup:.1f}s setup once) = "
+                  f"{seconds / engaged:.2f}s each, {daemon.stats['action_seconds'] / engaged:.2f}s of it acting; "
+                  f"{daemon.stats['cycles']} planning cycles")
+
+            # Budget: 5 actions per hour allow two repost+reply engagements, then the daemon waits.
+            capped = RateBudget('capped', per_hour=5, per_day=0, state_path=budget_path)
+            daemon = EngagementDaemon(FakeTwitter('capped'), db_logger, ActionQueue(db_logger), capped,
+                                      reply_generator=generator, interval=0.0, jitter=0.0, per_cycle=3)
+            with contextlib.redirect_stdout(io.StringIO()):
+                await run_daemon(daemon, lambda: daemon.stats['budget_waits'] > 0)
+            assert daemon.stats['engaged'] == 2, daemon.stats
+            reloaded = RateBudget('capped', per_hour=5, per_day=0, state_path=budget_path)
+            assert reloaded.available() == 1 and reloaded.wait_seconds(2) > 600, reloaded.report()
+            print(f"budget:   5/hour allowed {daemon.stats['engaged']} engagements, then waits "
+                  f"{reloaded.wait_seconds(2) / 60:.0f} min; after reload {reloaded.report()}")
+
+            # Restart: items queued by one daemon are run by the next one, not planned again.
+            queue = ActionQueue(db_logger)
+            first = EngagementDaemon(FakeTwitter('restart'), db_logger, queue, RateBudget('restart', 0, 0),
+                                     reply_generator=generator, per_cycle=3, action_gap=(3600, 3600))
+            first.twitter.delay_scale = 1.0
+            with contextlib.redirect_stdout(io.StringIO()):
+                await first.plan()
+            queued = queue.pending_count('restart')
+            with db_logger.engine.begin() as conn:
+                # Pretend the hours have passed while the daemon was down.
+                table = ScheduledAction.__table__
+                conn.execute(update(table).where(table.c.account == 'restart').values(due_at=datetime.now(timezone.utc)))
+            second = EngagementDaemon(FakeTwitter('restart', offset=5000), db_logger, queue, RateBudget('restart', 0, 0),
+                                      reply_generator=generator)
+            with contextlib.redirect_stdout(io.StringIO()):
+                await run_daemon(second, lambda: queue.pending_count('restart') == 0)
+            assert queued == 3 and second.stats['engaged'] == 3, (queued, second.stats)
+            print(f"restart:  {queued} queued items run by the restarted daemon")
+        db_logger.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
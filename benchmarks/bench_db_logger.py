@@ -0,0 +1,98 @@
+"""
+Benchmark TwitterDBLogger writes: the per-call ORM path (SELECT then INSERT/UPDATE,
+one transaction per call) against the set-based ON CONFLICT path.
+
+Uses a temporary SQLite file by default; set BENCH_DATABASE_URL to run against
+a scratch PostgreSQL database (rows are left in place).
+
+    poetry run python benchmarks/bench_db_logger.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.db import Tweet, TwitterDBLogger, TwitterUser, scraped_tweet_metadata
+
+SIZES = [20, 200, 2000]
+
+
+def make_tweets(n: int, offset: int = 0):
+    return [
+        {
+            'content': f'benchmark tweet {i}',
+            'author': f'author{i % max(n // 4, 1)}',
+            'url': f'https://twitter.com/author/status/{offset + i}',
+            'tweet_id': str(offset + i),
+            'created_at': datetime.now(timezone.utc),
+            'likes': i,
+            'retweets': i // 2,
+            'replies': i // 3
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_upsert(db: TwitterDBLogger, tweets):
+    """The ORM code path TwitterDBLogger used before ON CONFLICT upserts."""
+    for t in tweets:
+        session = db.Session()
+        user = session.query(TwitterUser).filter_by(twitter_handle=t['author']).first()
+        if not user:
+            user = TwitterUser(twitter_handle=t['author'])
+            session.add(user)
+            session.commit()
+        user_id = user.id
+        session.close()
+        session = db.Session()
+        tweet = session.query(Tweet).filter_by(tweet_id=t['tweet_id']).first()
+        if not tweet:
+            tweet = Tweet(tweet_id=t['tweet_id'], author_id=user_id, content=t['content'],
+                          created_at=t['created_at'], tweet_metadata=scraped_tweet_metadata(t))
+            session.add(tweet)
+        else:
+            tweet.content = t['content']
+            tweet.tweet_metadata = scraped_tweet_metadata(t)
+        session.commit()
+        session.close()
+
+
+def per_call_upsert(db: TwitterDBLogger, tweets):
+    for t in tweets:
+        user_id = db.upsert_user(t['author'])
+        db.upsert_tweet(t['tweet_id'], user_id, t['content'], t['created_at'], scraped_tweet_metadata(t))
+
+
+def bulk_upsert(db: TwitterDBLogger, tweets):
+    db.upsert_scraped(tweets)
+
+
+def main():
+    url = os.getenv('BENCH_DATABASE_URL')
+    tmpdir = None
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    db = TwitterDBLogger(url)
+    offset = 0
+    for n in SIZES:
+        line = f"{n:>5} tweets"
+        for name, fn in (('legacy orm', legacy_upsert), ('on conflict', per_call_upsert), ('bulk', bulk_upsert)):
+            tweets = make_tweets(n, offset)
+            offset += n
+            start = time.perf_counter()
+            fn(db, tweets)
+            elapsed = time.perf_counter() - start
+            # Two rows (author + tweet) are written per scraped tweet.
+            line += f" | {name} {2 * n / elapsed:10.0f} rows/s"
+        print(line)
+    db.close()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
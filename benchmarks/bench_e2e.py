@@ -0,0 +1,268 @@
+"""
+End-to-end run of main.py against local stand-ins only: the fake Twitter site
+(benchmarks/fake_twitter.py), the chat completions stub and a SQLite database. Human-like
+delays are scaled to zero (HUMAN_DELAY_SCALE=0) unless --keep-delays is given, so the numbers
+show the bot's own cost. The first run logs in, later runs restore the cached session.
+
+Reports per-phase latency from the stage spans, tweets/s scraped, DB rows/s written and the
+peak RSS of the process tree (Python plus the browser), and saves the results as JSON under
+benchmarks/results. With --baseline the run is compared against an earlier result file and
+the script exits non-zero when a metric regressed by more than --threshold.
+
+    poetry run python benchmarks/bench_e2e.py --runs 3 --save-baseline
+    poetry run python benchmarks/bench_e2e.py --runs 3 --baseline benchmarks/results/e2e-baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import main as bot_main
+from fake_twitter import start_fake_twitter
+from stub_openai import start_stub_server
+from twitter_bot.metrics import METRICS
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+BASELINE = os.path.join(RESULTS_DIR, 'e2e-baseline.json')
+
+# Stages spent getting tweets off the timeline, for tweets/s.
+SCRAPE_SPANS = ('feed_load', 'extract', 'scroll')
+
+# metric -> True when higher is better; phases are compared by mean ms per call (lower is better).
+COMPARED = {'tweets_per_second': True, 'db_rows_per_second': True, 'peak_rss_mb': False, 'wall_seconds': False}
+
+
+class RssSampler(threading.Thread):
+    """Peak of the summed VmRSS of this process and all its descendants, sampled from /proc."""
+    def __init__(self, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_kb = 0
+        self._done = threading.Event()
+
+    @staticmethod
+    def _tree_rss_kb(root: int) -> int:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces; fields after it are fixed.
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        total, todo = 0, [root]
+        while todo:
+            pid = todo.pop()
+            todo.extend(children.get(pid, []))
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    total += next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+            except OSError:
+                pass
+        return total
+
+    def run(self):
+        while not self._done.is_set():
+            try:
+                self.peak_kb = max(self.peak_kb, self._tree_rss_kb(os.getpid()))
+            except OSError:
+                # No /proc (macOS): peak RSS of this process and its waited-for children instead.
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+                self.peak_kb = max(self.peak_kb, rss // 1024 if sys.platform == 'darwin' else rss)
+            self._done.wait(self.interval)
+
+    def stop(self) -> float:
+        self._done.set()
+        self.join()
+        return self.peak_kb / 1024
+
+
+def count_rows(db_path: str) -> int:
+    if not os.path.exists(db_path):
+        return 0
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        return sum(conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables)
+
+
+def phase_table(summary):
+    """{'stage label': {calls, seconds, idle_seconds, mean_ms}} from METRICS.summary() rows."""
+    phases = {}
+    for row in summary:
+        if 'span' not in row:
+            continue
+        label = row['span'] + ''.join(f" {key}={value}" for key, value in sorted(row['labels'].items()))
+        phases[label] = {
+            'calls': row['count'], 'seconds': round(row['seconds'], 4), 'idle_seconds': round(row['idle_seconds'], 4),
+            'mean_ms': round(row['seconds'] / row['count'] * 1000, 2)
+        }
+    return phases
+
+
+def counter_total(summary, name: str) -> float:
+    return sum(row['value'] for row in summary if row.get('counter') == name)
+
+
+def span_seconds(summary, name: str, **labels) -> float:
+    return sum(row['seconds'] for row in summary
+               if row.get('span') == name and all(row['labels'].get(k) == v for k, v in labels.items()))
+
+
+async def one_run(number: int, db_path: str, site_stats, verbose: bool):
+    METRICS.reset()
+    rows_before, requests_before = count_rows(db_path), site_stats['requests']
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        await bot_main.main()
+    wall = time.perf_counter() - start
+    peak_rss = sampler.stop()
+
+    summary = METRICS.summary()
+    tweets = counter_total(summary, 'feed_tweets')
+    scrape_seconds = sum(span_seconds(summary, name) for name in SCRAPE_SPANS)
+    rows = count_rows(db_path) - rows_before
+    db_seconds = span_seconds(summary, 'db', op='run')
+    return {
+        'run': number,
+        'wall_seconds': round(wall, 3),
+        'phases': phase_table(summary),
+        'tweets_scraped': int(tweets),
+        'tweets_per_second': round(tweets / scrape_seconds, 2) if scrape_seconds else 0.0,
+        'db_rows': rows,
+        'db_rows_per_second': round(rows / db_seconds, 1) if db_seconds else 0.0,
+        'peak_rss_mb': round(peak_rss, 1),
+        'site_requests': site_stats['requests'] - requests_before,
+        'actions': sum(row['value'] for row in summary
+                       if row.get('counter') == 'actions' and row['labels'].get('result') == 'ok')
+    }
+
+
+def summarize(runs):
+    """Warm-run averages (every run but the first, which logs in) plus phases summed over all runs."""
+    warm = runs[1:] or runs
+    summary = {key: round(sum(run[key] for run in warm) / len(warm), 2) for key in COMPARED}
+    phases = {}
+    for run in runs:
+        for label, phase in run['phases'].items():
+            total = phases.setdefault(label, {'calls': 0, 'seconds': 0.0})
+            total['calls'] += phase['calls']
+            total['seconds'] += phase['seconds']
+    summary['phases'] = {
+        label: {'calls': p['calls'], 'seconds': round(p['seconds'], 4), 'mean_ms': round(p['seconds'] / p['calls'] * 1000, 2)}
+        for label, p in sorted(phases.items(), key=lambda item: -item[1]['seconds'])
+    }
+    return summary
+
+
+def compare(current, baseline, threshold: float):
+    """Lines describing each compared metric and the list of regressions beyond `threshold`."""
+    lines, regressions = [], []
+
+    def check(name, now, before, higher_is_better):
+        if not before:
+            return
+        change = (now - before) / before
+        worse = -change if higher_is_better else change
+        flag = '  REGRESSION' if worse > threshold else ''
+        lines.append(f"  {name:<32} {before:>10.2f} -> {now:>10.2f} ({change:+.0%}){flag}")
+        if flag:
+            regressions.append(name)
+
+    for key, higher_is_better in COMPARED.items():
+        check(key, current[key], baseline.get(key), higher_is_better)
+    for label, phase in current['phases'].items():
+        before = baseline.get('phases', {}).get(label)
+        if before:
+            check(f"{label} mean_ms", phase['mean_ms'], before['mean_ms'], False)
+    return lines, regressions
+
+
+def print_run(run):
+    print(f"run {run['run']}: {run['wall_seconds']:.2f}s wall, {run['tweets_scraped']} tweets at "
+          f"{run['tweets_per_second']:.1f}/s, {run['db_rows']} DB rows at {run['db_rows_per_second']:.0f}/s, "
+          f"{run['actions']:.0f} actions, peak RSS {run['peak_rss_mb']:.0f} MB, {run['site_requests']} site requests")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of main.py.")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--max-actions', type=int, default=1, help="MAX_ACTIONS per run; >1 uses the pipeline")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="seconds per stub completion")
+    parser.add_argument('--keep-delays', action='store_true', help="keep the human-like delays")
+    parser.add_argument('--baseline', help="result file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    parser.add_argument('--save-baseline', action='store_true', help=f"also write the results to {BASELINE}")
+    parser.add_argument('--verbose', action='store_true', help="show main.py output")
+    args = parser.parse_args()
+
+    site, base_url, site_stats = start_fake_twitter()
+    llm, llm_url = start_stub_server(latency=args.llm_latency)
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        os.environ.update({
+            'TWITTER_USERNAME': 'bench', 'TWITTER_PASSWORD': 'bench',
+            'DATABASE_URL': f'sqlite:///{db_path}', 'OPENAI_API_KEY': 'stub', 'OPENAI_BASE_URL': llm_url,
+            'SESSION_CACHE_DIR': os.path.join(tmp, 'session_cache'), 'TWITTER_BASE_URL': base_url,
+            'MAX_ACTIONS': str(args.max_actions), 'HUMAN_DELAY_SCALE': '1' if args.keep_delays else '0'
+        })
+        for var in ('PROXIES', 'BROWSER_ENDPOINT', 'METRICS_FILE', 'METRICS_PORT'):
+            os.environ.pop(var, None)
+        METRICS.enable()
+        for number in range(1, args.runs + 1):
+            run = await one_run(number, db_path, site_stats, args.verbose)
+            print_run(run)
+            runs.append(run)
+    site.shutdown()
+    llm.shutdown()
+
+    result = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'config': {'runs': args.runs, 'max_actions': args.max_actions, 'llm_latency': args.llm_latency,
+                   'human_delays': args.keep_delays, 'python': sys.version.split()[0]},
+        'site_actions': site_stats['actions'],
+        'runs': runs,
+        'summary': summarize(runs)
+    }
+    print(f"\n{'stage':<32} {'calls':>6} {'total s':>9} {'mean ms':>9}")
+    for label, phase in result['summary']['phases'].items():
+        print(f"{label:<32} {phase['calls']:>6} {phase['seconds']:>9.3f} {phase['mean_ms']:>9.2f}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"e2e-{datetime.now():%Y%m%d-%H%M%S}.json")
+    for target in [path] + ([BASELINE] if args.save_baseline else []):
+        with open(target, 'w') as f:
+            json.dump(result, f, indent=2)
+    print(f"\nResults saved to {path}" + (f" and {BASELINE}" if args.save_baseline else ''))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(result['summary'], baseline['summary'], args.threshold)
+        print(f"Compared with {args.baseline} (threshold {args.threshold:.0%}):")
+        print('\n'.join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
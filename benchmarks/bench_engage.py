@@ -0,0 +1,72 @@
+"""
+Browser time and bytes per engaged tweet: repost_tweet() followed by reply_to_tweet()
+(two navigations) versus one engage(url, ['repost', 'reply']) call, against a local
+tweet page fixture served over HTTP. Human delays are scaled down by DELAY_SCALE.
+
+    poetry run python benchmarks/bench_engage.py
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'selectors', 'testid_divs.html')
+TWEETS = 5
+DELAY_SCALE = 0.1
+
+
+def start_fixture_server():
+    with open(FIXTURE, 'rb') as f:
+        body = f.read()
+    traffic = {'requests': 0, 'bytes': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            traffic['requests'] += 1
+            traffic['bytes'] += len(body)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", traffic
+
+
+async def main():
+    server, base_url, traffic = start_fixture_server()
+    async with PlaywrightTwitterClient('bench', 'unused', base_url=base_url) as twitter:
+        async def scaled_delay(min_sec=0.7, max_sec=1.8):
+            await asyncio.sleep(random.uniform(min_sec, max_sec) * DELAY_SCALE)
+
+        twitter._human_delay = scaled_delay
+        for mode in ('separate', 'engage'):
+            traffic.update(requests=0, bytes=0)
+            start = time.perf_counter()
+            for i in range(TWEETS):
+                url = f"{base_url}/bench/status/{i}"
+                if mode == 'separate':
+                    results = [await twitter.repost_tweet(url), await twitter.reply_to_tweet(url, "Nice one")]
+                else:
+                    results = await twitter.engage(url, ['repost', 'reply'], reply_text="Nice one")
+                assert all(r['success'] for r in results), results
+            seconds = time.perf_counter() - start
+            print(f"{mode:<9} {seconds / TWEETS:.2f}s/tweet, {traffic['requests'] / TWEETS:.1f} page loads/tweet, "
+                  f"{traffic['bytes'] / TWEETS / 1024:.1f} KiB/tweet")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
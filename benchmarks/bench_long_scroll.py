@@ -0,0 +1,77 @@
+"""
+Memory of a long scrolling session on an endless local feed: iter_feed() without limits
+versus with a MemoryGovernor that recycles the page at a DOM node ceiling. Prints the page's
+JS heap and DOM node count every few hundred tweets and the peaks of both runs.
+
+    poetry run python benchmarks/bench_long_scroll.py
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.memory_governor import MemoryGovernor, MemoryLimits
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'infinite_feed.html')
+TWEETS = 3000
+REPORT_EVERY = 500
+LIMITS = MemoryLimits(max_heap_mb=64, max_dom_nodes=20000, check_every=5)
+
+
+def start_feed_server():
+    with open(FIXTURE, 'rb') as f:
+        body = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+async def scroll(base_url: str, governor):
+    probe = MemoryGovernor()  # measures both runs the same way
+    peaks = {'heap_mb': 0.0, 'dom_nodes': 0}
+    async with PlaywrightTwitterClient('bench', 'unused', base_url=base_url, memory_governor=governor) as twitter:
+        async def no_delay(min_sec=0, max_sec=0):
+            await asyncio.sleep(0)
+
+        twitter._human_delay = no_delay
+        start = time.perf_counter()
+        count = 0
+        async for _ in twitter.iter_feed(limit=TWEETS):
+            count += 1
+            if count % REPORT_EVERY == 0:
+                sample = await probe.sample(twitter.page)
+                peaks = {key: max(peaks[key], sample[key]) for key in peaks}
+                print(f"  {count:>5} tweets: {sample['heap_mb']:6.1f} MB heap, {sample['dom_nodes']:>6} DOM nodes")
+        seconds = time.perf_counter() - start
+    print(f"  {count} tweets in {seconds:.1f}s, peak {peaks['heap_mb']:.1f} MB heap, {peaks['dom_nodes']} DOM nodes"
+          + (f", {governor.stats['recycles']} recycles" if governor else ""))
+
+
+async def main():
+    server, base_url = start_feed_server()
+    print("unbounded:")
+    await scroll(base_url, None)
+    print(f"governed ({LIMITS.max_heap_mb:.0f} MB / {LIMITS.max_dom_nodes} nodes):")
+    await scroll(base_url, MemoryGovernor(LIMITS))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
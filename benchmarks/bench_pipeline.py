@@ -0,0 +1,101 @@
+"""
+Actions per browser-minute for one warm session: engage_best_tweet run back to back versus
+the staged EngagementPipeline. The browser is a fake client with fixed per-step latencies
+and replies come from the local chat completions stub, so only the scheduling differs.
+
+    poetry run python benchmarks/bench_pipeline.py
+"""
+import asyncio
+import contextlib
+import inspect
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_openai import start_stub_server
+from twitter_bot.ai_reply import AsyncReplyGenerator
+from twitter_bot.db import TwitterDBLogger
+from twitter_bot.pipeline import EngagementPipeline, print_pipeline_stats
+from twitter_bot.runner import TweetClaims, engage_best_tweet
+
+ACTIONS = 5
+FEED_SIZE = 20           # tweets scraped per engage_best_tweet run
+TWEET_SECONDS = 0.05     # feed extraction + scrolling per tweet
+NAV_SECONDS = 0.25       # opening a tweet page and letting it settle
+ACTION_SECONDS = 0.15    # clicks for a repost or a reply on the loaded page
+LLM_SECONDS = 0.8        # completion latency of the stub
+
+
+class FakeTwitter:
+    """Stands in for PlaywrightTwitterClient with sleep-based latencies."""
+    def __init__(self, username='bench', offset=0):
+        self.username = username
+        self.offset = offset
+
+    async def iter_feed(self, limit=None, stop=None, **kwargs):
+        for i in range(limit or 1000):
+            await asyncio.sleep(TWEET_SECONDS)
+            n = self.offset + i
+            tweet = {
+                'url': f'https://twitter.com/bench/status/{n}', 'tweet_id': str(n), 'author': f'author{n}',
+                'content': f'Benchmark tweet {n}', 'created_at': datetime.now(timezone.utc),
+                'likes': (n * 37) % 101, 'retweets': (n * 13) % 29, 'replies': n % 7
+            }
+            yield tweet
+            if stop and stop(tweet):
+                return
+
+    async def scrape_feed(self, count=20):
+        return [tweet async for tweet in self.iter_feed(limit=count)]
+
+    async def engage(self, url, actions, reply_text=None):
+        await asyncio.sleep(NAV_SECONDS)
+        results = []
+        for action in actions:
+            success = True
+            if action == 'reply':
+                success = bool(await reply_text if inspect.isawaitable(reply_text) else reply_text)
+            await asyncio.sleep(ACTION_SECONDS)
+            results.append({'action': action, 'success': success, 'selector': None, 'seconds': ACTION_SECONDS, 'error': None})
+        return results
+
+    async def open_tab(self):
+        return self
+
+    async def close_tab(self):
+        pass
+
+
+async def main():
+    server, base_url = start_stub_server(latency=LLM_SECONDS)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_logger = TwitterDBLogger(f"sqlite:///{tmp}/bench.db")
+        async with AsyncReplyGenerator(api_key='stub', base_url=base_url) as generator:
+            claims = TweetClaims()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for run in range(ACTIONS):
+                    await engage_best_tweet(FakeTwitter('sequential', run * FEED_SIZE), db_logger, claims,
+                                            count=FEED_SIZE, reply_generator=generator)
+            sequential = time.perf_counter() - start
+            print(f"sequential: {ACTIONS} actions in {sequential:.1f}s = {ACTIONS / sequential * 60:.1f} actions/min")
+
+            pipeline = EngagementPipeline(FakeTwitter('pipeline'), db_logger, reply_generator=generator,
+                                          max_actions=ACTIONS, window=FEED_SIZE // 2, act_concurrency=2)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = await pipeline.run()
+            seconds = time.perf_counter() - start
+            print(f"pipeline:   {len(results)} actions in {seconds:.1f}s = {len(results) / seconds * 60:.1f} actions/min")
+            print_pipeline_stats(pipeline.stats)
+        db_logger.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Request latency and failures through four local stub proxies (fast, slow, flaky, dead):
+picking a proxy at random per request, as the client did before, versus ProxyPool.choose()
+with every outcome recorded. Also checks that health state survives a reload from disk.
+
+    poetry run python benchmarks/bench_proxy_pool.py
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_proxy import start_stub_proxy
+from twitter_bot.proxy_pool import ProxyPool
+
+REQUESTS = 200
+
+
+def start_origin():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = b"User-agent: *\n"
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/robots.txt"
+
+
+def unused_port_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BaseHTTPRequestHandler)
+    port = server.server_port
+    server.server_close()
+    return f"http://127.0.0.1:{port}"
+
+
+def fetch(pool: ProxyPool, proxy: str):
+    """One request through `proxy`; returns (ok, seconds)."""
+    start = time.monotonic()
+    try:
+        pool._probe_sync(proxy)
+        return True, time.monotonic() - start
+    except Exception:
+        return False, time.monotonic() - start
+
+
+def run(mode: str, pool: ProxyPool, proxies):
+    failures, seconds, picks = 0, 0.0, {proxy: 0 for proxy in proxies}
+    for _ in range(REQUESTS):
+        proxy = random.choice(proxies) if mode == 'random' else pool.choose()
+        picks[proxy] += 1
+        ok, elapsed = fetch(pool, proxy)
+        seconds += elapsed
+        failures += not ok
+        if mode == 'pool':
+            pool.record(proxy, ok, latency=elapsed if ok else None)
+    return failures, seconds, picks
+
+
+async def main():
+    origin, probe_url = start_origin()
+    fast, fast_url = start_stub_proxy(latency=0.01)
+    slow, slow_url = start_stub_proxy(latency=0.15)
+    flaky, flaky_url = start_stub_proxy(latency=0.01, fail_every=2)
+    dead_url = unused_port_url()
+    names = {fast_url: 'fast', slow_url: 'slow', flaky_url: 'flaky', dead_url: 'dead'}
+    proxies = list(names)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'proxies.json')
+        pool = ProxyPool(proxies, state_path=state_path, probe_url=probe_url, probe_timeout=2)
+        start = time.monotonic()
+        probed = await pool.probe_all()
+        print(f"probe_all: {len(probed)} proxies in {time.monotonic() - start:.2f}s, "
+              f"healthy: {', '.join(names[p] for p, ok in probed.items() if ok)}")
+
+        for mode in ('random', 'pool'):
+            failures, seconds, picks = run(mode, pool, proxies)
+            share = ', '.join(f"{names[p]} {n}" for p, n in picks.items())
+            print(f"{mode:<6} {REQUESTS} requests: {failures} failed, mean {seconds / REQUESTS * 1000:.0f}ms ({share})")
+
+        pool.save()
+        reloaded = ProxyPool(proxies, state_path=state_path, probe_url=probe_url)
+        assert not reloaded.is_healthy(dead_url), "quarantine lost on reload"
+        assert [r['proxy'] for r in reloaded.report()] == [r['proxy'] for r in pool.report()], "ranking lost on reload"
+        for row in reloaded.report():
+            latency = f"{row['latency'] * 1000:.0f}ms" if row['latency'] is not None else '-'
+            print(f"  {names[row['proxy']]:<5} latency {latency:>6}  error rate {row['error_rate']:.2f}  "
+                  f"quarantine {row['quarantine_seconds']:.0f}s")
+
+    for server in (origin, fast, slow, flaky):
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
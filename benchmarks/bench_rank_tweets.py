@@ -0,0 +1,72 @@
+"""
+Compare the per-tweet viral_score ranking with the vectorized ViralRanker at 1e2, 1e4 and 1e6 tweets:
+top-1 and top-10 from tweet dicts, top-10 from prebuilt columns, and a chunked top-10 as used for
+ranking the tweets table.
+
+    poetry run python benchmarks/bench_rank_tweets.py
+"""
+import heapq
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.tweet_analyzer import ViralRanker, tweet_columns, viral_score
+
+SIZES = [10 ** 2, 10 ** 4, 10 ** 6]
+K = 10
+CHUNK = 50000
+
+
+def make_tweets(n, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'url': f"https://twitter.com/bench/status/{i}",
+            'likes': rng.randint(0, 50000),
+            'retweets': rng.randint(0, 10000),
+            'replies': rng.randint(0, 2000),
+            'created_at': now - timedelta(minutes=rng.uniform(0, 7 * 24 * 60)) if rng.random() > 0.05 else None
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    ranker = ViralRanker()
+    print(f"{'tweets':>9} {'legacy max':>11} {'legacy top10':>13} {'numpy top1':>11} {'numpy top10':>12} "
+          f"{'columns only':>13} {'chunked':>9}")
+    for n in SIZES:
+        tweets = make_tweets(n)
+        now = datetime.now(timezone.utc)
+        legacy_best, legacy_max = timed(lambda: max(tweets, key=viral_score))
+        legacy_top, legacy_topk = timed(lambda: heapq.nlargest(K, tweets, key=lambda t: viral_score(t, now)))
+        best, numpy_top1 = timed(lambda: ranker.top_k(tweets, 1, now))
+        top, numpy_topk = timed(lambda: ranker.top_k(tweets, K, now))
+        columns = tweet_columns(tweets, [t['created_at'] for t in tweets])
+        top_idx, columns_only = timed(lambda: ranker.top_indices(ranker.scores(columns, now), K))
+        chunks = [
+            (list(range(i, min(i + CHUNK, n))), {name: col[i:i + CHUNK] for name, col in columns.items()})
+            for i in range(0, n, CHUNK)
+        ]
+        chunked, chunked_time = timed(lambda: ranker.top_k_chunks(chunks, K, now))
+
+        assert best[0] is legacy_best
+        assert [t['url'] for t in top] == [t['url'] for t in legacy_top]
+        assert [i for _, i in chunked] == top_idx.tolist()
+        print(f"{n:>9} {legacy_max * 1000:>9.1f}ms {legacy_topk * 1000:>11.1f}ms {numpy_top1 * 1000:>9.1f}ms "
+              f"{numpy_topk * 1000:>10.1f}ms {columns_only * 1000:>11.2f}ms {chunked_time * 1000:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Bytes per page load of a local static site (tweet page with images, video, a web font,
+content-hashed JS/CSS bundles and an analytics beacon) without a resource policy, with the
+policy and a cold asset cache, and with a warm cache in a fresh context, as a new run would
+see it. Also checks LRU eviction, persistence, index merging between processes and the orphan
+sweep of AssetCache without a browser.
+
+    poetry run python benchmarks/bench_resource_policy.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+from twitter_bot.resource_policy import ORPHAN_GRACE, AssetCache, ResourcePolicy
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'asset_page.html')
+LOADS = 3
+
+# path suffix -> (content type, size in bytes, cache-control)
+ASSETS = {
+    '.js': ('application/javascript', 400 * 1024, 'public, max-age=31536000, immutable'),
+    '.css': ('text/css', 60 * 1024, 'public, max-age=31536000, immutable'),
+    '.woff2': ('font/woff2', 40 * 1024, 'public, max-age=31536000'),
+    '.jpg': ('image/jpeg', 80 * 1024, 'public, max-age=86400'),
+    '.mp4': ('video/mp4', 1024 * 1024, 'public, max-age=86400'),
+}
+
+
+def start_static_server():
+    with open(FIXTURE, 'rb') as f:
+        page = f.read()
+    traffic = {'requests': 0, 'bytes': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            kind = next((ASSETS[s] for s in ASSETS if path.endswith(s)), None)
+            if path.startswith('/i/jot/'):
+                content_type, body, cache_control = 'application/javascript', b'/* beacon */' * 2048, 'no-store'
+            elif kind:
+                content_type, size, cache_control = kind
+                # A comment is valid JS and CSS; images, fonts and video just fail to decode.
+                body = b'/*' + b'x' * (size - 4) + b'*/'
+            else:
+                content_type, body, cache_control = 'text/html', page, 'no-cache'
+            traffic['requests'] += 1
+            traffic['bytes'] += len(body)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", traffic
+
+
+def check_asset_cache(tmp: str):
+    """Eviction keeps the cache under max_bytes in LRU order, and the order survives a reload."""
+    cache = AssetCache(os.path.join(tmp, 'lru'), max_bytes=250)
+    for name in ('a', 'b', 'c'):
+        cache.put(f'http://x/{name}.js', 200, {'Content-Type': 'application/javascript'}, name.encode() * 100)
+    assert cache.get('http://x/a.js') is None and cache.total_bytes == 200, cache.stats
+    assert cache.get('http://x/b.js')[2] == b'b' * 100
+    cache.put('http://x/d.js', 200, {}, b'd' * 100)  # evicts c, the least recently used
+    cache.save()
+    reloaded = AssetCache(os.path.join(tmp, 'lru'), max_bytes=250)
+    assert reloaded.get('http://x/c.js') is None and reloaded.get('http://x/b.js') is not None
+    assert reloaded.total_bytes == 200
+    print("AssetCache: LRU eviction and reload ok")
+
+
+def check_shared_cache(tmp: str):
+    """Two processes' caches on one directory merge their indexes; unindexed old files are swept."""
+    cache_dir = os.path.join(tmp, 'shared')
+    first, second = AssetCache(cache_dir), AssetCache(cache_dir)
+    first.put('http://x/a.js', 200, {}, b'a' * 100)
+    second.put('http://x/b.js', 200, {}, b'b' * 100)
+    first.save()
+    second.save()
+    merged = AssetCache(cache_dir)
+    assert merged.get('http://x/a.js') and merged.get('http://x/b.js') and merged.total_bytes == 200
+    # A body and a temp file from a crashed run: swept once older than ORPHAN_GRACE, kept before.
+    stale = time.time() - ORPHAN_GRACE - 60
+    for name in ('0' * 32 + '.bin', '.tmp-crashed'):
+        with open(os.path.join(cache_dir, name), 'wb') as f:
+            f.write(b'x')
+    AssetCache(cache_dir)
+    assert os.path.exists(os.path.join(cache_dir, '.tmp-crashed'))
+    for name in ('0' * 32 + '.bin', '.tmp-crashed'):
+        os.utime(os.path.join(cache_dir, name), (stale, stale))
+    swept = AssetCache(cache_dir)
+    assert not any(name.startswith(('0' * 32, '.tmp-')) for name in os.listdir(cache_dir)), os.listdir(cache_dir)
+    assert swept.get('http://x/a.js') and swept.get('http://x/b.js')
+    print("AssetCache: shared directory index merge and orphan sweep ok")
+
+
+async def load(base_url: str, policy):
+    async with PlaywrightTwitterClient('bench', 'unused', base_url=base_url, resource_policy=policy) as twitter:
+        await twitter.page.goto(f"{base_url}/home", wait_until='load')
+        await twitter.page.wait_for_timeout(300)
+
+
+async def main():
+    server, base_url, traffic = start_static_server()
+    with tempfile.TemporaryDirectory() as tmp:
+        check_asset_cache(tmp)
+        check_shared_cache(tmp)
+        cache_dir = os.path.join(tmp, 'assets')
+        for label, loads in (('no policy', LOADS), ('cold cache', 1), ('warm cache', LOADS)):
+            traffic.update(requests=0, bytes=0)
+            policy = None
+            for _ in range(loads):
+                # Every load is a new client and context; the warm runs reopen the cache from disk.
+                policy = ResourcePolicy(cache=AssetCache(cache_dir)) if label != 'no policy' else None
+                await load(base_url, policy)
+            print(f"{label:<10} {traffic['requests'] / loads:.1f} requests/load, "
+                  f"{traffic['bytes'] / loads / 1024:.0f} KiB/load served")
+            if policy:
+                print(f"           {policy.report()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
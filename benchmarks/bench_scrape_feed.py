@@ -0,0 +1,95 @@
+"""
+Benchmark per-element, batch and network-intercepted extraction in
+PlaywrightTwitterClient.scrape_feed.
+
+Serves a feed built from the saved article fixture, plus a HomeTimeline payload built
+from the recorded JSON fixture, through route handlers, so no network access or login
+is needed. Human delays are disabled to measure only IPC cost.
+
+    poetry run python benchmarks/bench_scrape_feed.py
+"""
+import asyncio
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE = os.path.join(FIXTURES, 'feed_article.html')
+TIMELINE_FIXTURE = os.path.join(FIXTURES, 'home_timeline.json')
+SIZES = [20, 200, 2000]
+
+
+def build_feed(n: int) -> str:
+    with open(FIXTURE) as f:
+        article = f.read()
+    body = ''.join(
+        article.format(
+            i=i,
+            tweet_id=1900000000000000000 + i,
+            created_at='2025-07-10T12:%02d:00.000Z' % (i % 60),
+            likes=f'{i * 3:,}',
+            retweets=i,
+            replies=i % 7
+        )
+        for i in range(n)
+    )
+    script = "<script>fetch('/i/api/graphql/bench/HomeTimeline?variables=%7B%7D')</script>"
+    return f'<html><body><div data-testid="primaryColumn">{body}</div>{script}</body></html>'
+
+
+def build_timeline(n: int) -> str:
+    """Replicate the first recorded timeline entry `n` times with distinct tweet IDs."""
+    with open(TIMELINE_FIXTURE) as f:
+        payload = json.load(f)
+    instruction = payload['data']['home']['home_timeline_urt']['instructions'][0]
+    template = instruction['entries'][0]
+    entries = []
+    for i in range(n):
+        entry = copy.deepcopy(template)
+        result = entry['content']['itemContent']['tweet_results']['result']
+        result['rest_id'] = result['legacy']['id_str'] = str(1900000000000000000 + i)
+        result['legacy']['favorite_count'] = i * 3
+        entries.append(entry)
+    instruction['entries'] = entries
+    return json.dumps(payload)
+
+
+async def _no_delay(*args, **kwargs):
+    return None
+
+
+async def run():
+    async with PlaywrightTwitterClient('bench', 'bench') as client:
+        client._human_delay = _no_delay
+        for n in SIZES:
+            html, timeline = build_feed(n), build_timeline(n)
+            await client.page.route(
+                'https://twitter.com/home',
+                lambda route: route.fulfill(status=200, content_type='text/html', body=html)
+            )
+            await client.page.route(
+                'https://twitter.com/i/api/graphql/**',
+                lambda route: route.fulfill(status=200, content_type='application/json', body=timeline)
+            )
+            results = {}
+            for name, kwargs in (('per-element', {'batch': False}), ('batch', {}), ('network', {'intercept': True})):
+                start = time.perf_counter()
+                tweets = await client.scrape_feed(count=n, **kwargs)
+                results[name] = (time.perf_counter() - start, len(tweets))
+            await client.page.unroute('https://twitter.com/home')
+            await client.page.unroute('https://twitter.com/i/api/graphql/**')
+            legacy = results['per-element'][0]
+            print(f"{n:>5} tweets | " + " | ".join(
+                f"{name} {elapsed:8.3f}s ({found}, {legacy / elapsed:5.1f}x)"
+                for name, (elapsed, found) in results.items()
+            ))
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -0,0 +1,97 @@
+"""
+Resolve the action buttons of repost_tweet/reply_to_tweet on local HTML fixtures with
+different markup variants: sequential query_selector per fallback (the old lookup) versus
+SelectorResolver's single DOM query. Checks that both pick the same selector, that the
+fallbacks still find every button after a markup change, and that the change is reported
+as drift.
+
+    poetry run python benchmarks/bench_selectors.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+from twitter_bot.selector_resolver import SELECTORS, SelectorResolver
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'selectors')
+EXPECTED = {
+    'testid_divs.html': {
+        'retweet': 'div[data-testid="retweet"]',
+        'retweet_confirm': 'div[data-testid="retweetConfirm"]',
+        'reply': 'div[data-testid="reply"]',
+        'reply_textarea': 'div[role="textbox"]',
+        'reply_send': 'button[data-testid="tweetButton"]'
+    },
+    'aria_labels.html': {
+        'retweet': 'div[aria-label*="Repost"]',
+        'retweet_confirm': '[role="menu"] div[role="button"][aria-label*="Repost"]',
+        'reply': 'div[aria-label*="Reply"]',
+        'reply_textarea': 'div[contenteditable="true"]',
+        'reply_send': 'div[role="button"][aria-label*="Tweet"]'
+    },
+    'inline_composer.html': {
+        'retweet': '[data-testid="retweet"]',
+        'retweet_confirm': '[data-testid="retweetConfirm"]',
+        'reply': 'button[data-testid="reply"]',
+        'reply_textarea': '[data-testid="tweetTextarea_0_label"]',
+        'reply_send': 'div[data-testid="tweetButtonInline"]'
+    }
+}
+ROUNDS = 20
+
+
+async def legacy_lookup(page, action):
+    """The old loop: one query_selector round trip per candidate until one matches."""
+    for queries, selector in enumerate(SELECTORS[action], start=1):
+        if await page.query_selector(selector):
+            return selector, queries
+    return None, len(SELECTORS[action])
+
+
+async def main():
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for fixture, expected in EXPECTED.items():
+            with open(os.path.join(FIXTURES, fixture)) as f:
+                await page.set_content(f.read())
+            resolver = SelectorResolver()
+            legacy_queries = 0
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                for action in expected:
+                    selector, queries = await legacy_lookup(page, action)
+                    assert selector == expected[action], (fixture, action, selector)
+                    legacy_queries += queries
+            legacy_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                for action in expected:
+                    selector = await resolver.match(page, action)
+                    assert selector == expected[action], (fixture, action, selector)
+            resolver_seconds = time.perf_counter() - start
+            lookups = ROUNDS * len(expected)
+            print(f"{fixture:<22} legacy {legacy_queries / lookups:.1f} queries/lookup {legacy_seconds / lookups * 1000:.2f}ms | "
+                  f"resolver 1.0 queries/lookup {resolver_seconds / lookups * 1000:.2f}ms")
+
+        # Markup change: a resolver used on one variant finds the buttons of the next and reports the drift.
+        resolver = SelectorResolver(drift_threshold=3)
+        for fixture in ('testid_divs.html', 'aria_labels.html'):
+            with open(os.path.join(FIXTURES, fixture)) as f:
+                await page.set_content(f.read())
+            for _ in range(5):
+                for action in EXPECTED[fixture]:
+                    selector = await resolver.match(page, action)
+                    assert selector == EXPECTED[fixture][action], (fixture, action, selector)
+        drifted = {(d['action'], d['selector']) for d in resolver.drift()}
+        assert ('retweet', 'div[data-testid="retweet"]') in drifted, drifted
+        print(f"drift after markup change: {len(drifted)} selectors, metrics {resolver.metrics}")
+        await browser.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Type a reply into a local page that records the key events it receives: the old
+per-character textarea.type() loop versus twitter_bot.typing_engine. Reports awaited
+protocol calls, wall time, the delivered text and the inter-key interval profile of the
+events actually delivered, next to the planned profile. Fails if a reply takes more than
+MAX_CALLS keyboard calls.
+
+    poetry run python benchmarks/bench_typing.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+from twitter_bot.typing_engine import burst_intervals, plan_typing, schedule_stats, type_text
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'typing_page.html')
+REPLY = "Honestly this is the best take I've seen all week. Totally agree with you, well said!"
+# About one call per word (16 here) plus corrected typos; the per-character loop makes len(REPLY).
+MAX_CALLS = 30
+
+
+class CountingKeyboard:
+    """Wraps page.keyboard and counts the awaited calls made through it."""
+    def __init__(self, keyboard):
+        self.keyboard = keyboard
+        self.calls = 0
+
+    async def type(self, text, delay=None):
+        self.calls += 1
+        await self.keyboard.type(text, delay=delay)
+
+    async def press(self, key, delay=None):
+        self.calls += 1
+        await self.keyboard.press(key, delay=delay)
+
+
+class CountingPage:
+    def __init__(self, page):
+        self.keyboard = CountingKeyboard(page.keyboard)
+
+
+async def load(page):
+    with open(FIXTURE) as f:
+        await page.set_content(f.read())
+    await page.click('[role="textbox"]')
+
+
+async def delivered(page):
+    events = await page.evaluate('window.keyEvents')
+    text = await page.inner_text('[role="textbox"]')
+    intervals = [b['t'] - a['t'] for a, b in zip(events, events[1:])]
+    return text, events, intervals
+
+
+def fmt(stats):
+    return f"mean {stats['mean']:.0f}ms sd {stats['stdev']:.0f} p10 {stats['p10']:.0f} p50 {stats['p50']:.0f} p90 {stats['p90']:.0f}"
+
+
+async def main():
+    planned, calls = [], []
+    for seed in range(200):
+        bursts = plan_typing(REPLY, rng=random.Random(seed))
+        planned += burst_intervals(bursts)
+        calls.append(len(bursts))
+    assert max(calls) <= MAX_CALLS, max(calls)
+    print(f"planned over 200 replies: {sum(calls) / len(calls):.1f} calls on average (max {max(calls)}), {fmt(schedule_stats(planned))}")
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+
+        await load(page)
+        textarea = await page.query_selector('[role="textbox"]')
+        start = time.perf_counter()
+        for char in REPLY:
+            await textarea.type(char, delay=random.randint(30, 80))
+        seconds = time.perf_counter() - start
+        text, events, intervals = await delivered(page)
+        assert text == REPLY, text
+        print(f"per-char loop: {len(REPLY)} calls, {seconds:.1f}s, {len(events)} key events, delivered {fmt(schedule_stats(intervals))}")
+
+        await load(page)
+        counting = CountingPage(page)
+        start = time.perf_counter()
+        bursts = await type_text(counting, REPLY, rng=random.Random(7))
+        seconds = time.perf_counter() - start
+        text, events, intervals = await delivered(page)
+        assert text == REPLY, text
+        assert all(e['trusted'] for e in events)
+        assert counting.keyboard.calls <= MAX_CALLS, counting.keyboard.calls
+        print(f"typing engine: {counting.keyboard.calls} calls, {seconds:.1f}s, {len(events)} key events, delivered {fmt(schedule_stats(intervals))}")
+        print(f"               planned {fmt(schedule_stats(burst_intervals(bursts)[1:]))}")
+        await browser.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
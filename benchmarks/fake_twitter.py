@@ -0,0 +1,149 @@
+"""
+Local stand-in for the parts of twitter.com the bot touches, for offline end-to-end runs and
+benchmarks: a two-step login form that sets an auth_token cookie, an infinite-scroll home
+timeline of tweet articles, and tweet pages whose repost, reply, like and bookmark buttons
+POST the finished action back to the server. Pages are built from benchmarks/fixtures/fake_twitter.
+
+    poetry run python benchmarks/fake_twitter.py --port 8090
+    TWITTER_BASE_URL=http://127.0.0.1:8090 poetry run python main.py
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fake_twitter')
+PAGE_SIZE = 10
+FEED_STRIDE = 100000  # every /home load starts this many tweets further on, so each visit sees new tweets
+_FIRST_ID = 1790000000000000000
+_EPOCH = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def _template(name: str) -> str:
+    with open(os.path.join(TEMPLATES, name)) as f:
+        return f.read()
+
+
+def render_article(i: int) -> str:
+    """Tweet number `i` of the timeline; the same number always renders the same tweet."""
+    return _template('article.html').format(
+        author=f'author{i % 53}',
+        tweet_id=_FIRST_ID + i,
+        created_at=(_EPOCH - timedelta(minutes=7 * i)).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        text=f'Fake timeline tweet number {i} with a little text to extract and rank.',
+        likes=(i * 7919) % 5000,
+        retweets=(i * 104729) % 900,
+        replies=(i * 31) % 120
+    )
+
+
+class FakeTwitterHandler(BaseHTTPRequestHandler):
+    """Serves /login, /home, /i/api/timeline, /<author>/status/<id> and the /i/api login and action posts."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/') or '/'
+        if path == '/login':
+            self._send(200, _template('login.html'))
+        elif path in ('/', '/home'):
+            if not self._logged_in():
+                self._redirect('/login')
+                return
+            with self.server.lock:
+                first = self.server.stats['feeds'] * FEED_STRIDE
+                self.server.stats['feeds'] += 1
+            articles = ''.join(render_article(i) for i in range(first, first + PAGE_SIZE))
+            page = _template('home.html').replace('{articles}', articles)
+            self._send(200, page.replace('{cursor}', str(first + PAGE_SIZE)))
+        elif path == '/i/api/timeline':
+            cursor = int(parse_qs(url.query).get('cursor', ['0'])[0])
+            self._send(200, ''.join(render_article(i) for i in range(cursor, cursor + PAGE_SIZE)),
+                       headers={'X-Next-Cursor': str(cursor + PAGE_SIZE)})
+        elif '/status/' in path:
+            tweet_id = path.rsplit('/', 1)[-1]
+            if not tweet_id.isdigit() or int(tweet_id) < _FIRST_ID:
+                self._send(404, 'Not found')
+                return
+            article = render_article(int(tweet_id) - _FIRST_ID)
+            page = _template('status.html').replace('{article}', article)
+            self._send(200, page.replace('{author}', path.split('/')[1]).replace('{tweet_id}', tweet_id))
+        else:
+            self._send(404, 'Not found')
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.path == '/i/api/login':
+            with self.server.lock:
+                self.server.stats['logins'] += 1
+            self._send(200, '{}', content_type='application/json',
+                       headers={'Set-Cookie': f"auth_token={body.get('username', 'user')}; Path=/; Max-Age=86400"})
+        elif self.path == '/i/api/action':
+            with self.server.lock:
+                self.server.actions.append(body)
+                kind = body.get('type', 'unknown')
+                self.server.stats['actions'][kind] = self.server.stats['actions'].get(kind, 0) + 1
+            self._send(200, '{}', content_type='application/json')
+        else:
+            self._send(404, 'Not found')
+
+    def _logged_in(self) -> bool:
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return 'auth_token' in cookie
+
+    def _redirect(self, location: str):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        self._count(0)
+
+    def _send(self, status: int, text: str, content_type: str = 'text/html; charset=utf-8', headers=None):
+        data = text.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-cache')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except BrokenPipeError:
+            pass  # the page navigated away mid-response
+        self._count(len(data))
+
+    def _count(self, size: int):
+        with self.server.lock:
+            self.server.stats['requests'] += 1
+            self.server.stats['bytes'] += size
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_twitter(port: int = 0):
+    """
+    Start the site in a daemon thread; returns (server, base_url, stats). `stats` counts
+    requests, bytes served, logins, home timeline loads and actions by type;
+    `server.actions` keeps every action posted.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeTwitterHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.actions = []
+    server.stats = {'requests': 0, 'bytes': 0, 'logins': 0, 'feeds': 0, 'actions': {}}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", server.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake Twitter site for offline runs.")
+    parser.add_argument('--port', type=int, default=8090)
+    args = parser.parse_args()
+    server, base_url, stats = start_fake_twitter(args.port)
+    print(f"Fake Twitter at {base_url} (any username and password log in)")
+    threading.Event().wait()
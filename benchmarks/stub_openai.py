@@ -0,0 +1,78 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, for offline runs and benchmarks.
+
+    poetry run python benchmarks/stub_openai.py --port 8081 --latency 0.8
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8081/v1 poetry run python main.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubCompletionsHandler(BaseHTTPRequestHandler):
+    """Answers POST /v1/chat/completions after `server.latency` seconds; every `server.fail_every`-th call gets a 500."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            call = server.calls
+            server.requests.append(body)
+        time.sleep(server.latency)
+        if server.fail_every and call % server.fail_every == 0:
+            self._send(500, {'error': {'message': 'stub failure', 'type': 'server_error'}})
+            return
+        prompt = body.get('messages', [{}])[-1].get('content', '')
+        content = server.responder(body) if server.responder else f"Stub reply #{call} to: {prompt[-40:]}"
+        prompt_tokens = sum(len(m.get('content', '').split()) for m in body.get('messages', []))
+        completion_tokens = len(content.split())
+        self._send(200, {
+            'id': f'chatcmpl-stub-{call}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except BrokenPipeError:
+            pass  # the client cancelled the request
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, latency: float = 0.0, fail_every: int = 0, responder=None):
+    """Start the stub in a daemon thread; returns (server, base_url). `responder(body)` can override the reply text."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubCompletionsHandler)
+    server.latency = latency
+    server.fail_every = fail_every
+    server.responder = responder
+    server.calls = 0
+    server.requests = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server.")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--fail-every', type=int, default=0)
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.port, args.latency, args.fail_every)
+    print(f"Stub chat completions at {base_url}")
+    threading.Event().wait()
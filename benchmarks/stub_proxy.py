@@ -0,0 +1,111 @@
+"""
+Local forward HTTP proxy with injected latency and failures, for offline proxy pool runs and benchmarks.
+Plain GETs with an absolute URI are forwarded; CONNECT is tunnelled.
+
+    poetry run python benchmarks/stub_proxy.py --port 8888 --latency 0.2 --fail-every 3
+    PROXIES=http://127.0.0.1:8888 poetry run python main.py
+"""
+import argparse
+import select
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DIRECT = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+class StubProxyHandler(BaseHTTPRequestHandler):
+    """Waits `server.latency` seconds per request; every `server.fail_every`-th one gets its connection dropped."""
+
+    def _should_fail(self) -> bool:
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            call = server.calls
+        time.sleep(server.latency)
+        if server.down or (server.fail_every and call % server.fail_every == 0):
+            with server.lock:
+                server.failures += 1
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return True
+        return False
+
+    def do_GET(self):
+        if self._should_fail():
+            return
+        try:
+            with _DIRECT.open(self.path, timeout=10) as upstream:
+                status, headers, body = upstream.status, upstream.headers, upstream.read()
+        except urllib.error.HTTPError as e:
+            status, headers, body = e.code, e.headers, e.read()
+        except OSError:
+            self.send_error(502)
+            return
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in ('transfer-encoding', 'connection', 'content-length'):
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_CONNECT(self):
+        if self._should_fail():
+            return
+        host, _, port = self.path.rpartition(':')
+        try:
+            upstream = socket.create_connection((host, int(port)), timeout=10)
+        except OSError:
+            self.send_error(502)
+            return
+        self.send_response(200, 'Connection established')
+        self.end_headers()
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, broken = select.select(sockets, [], sockets, 30)
+                if broken or not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is self.connection else self.connection).sendall(data)
+        finally:
+            upstream.close()
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_proxy(port: int = 0, latency: float = 0.0, fail_every: int = 0):
+    """Start the proxy in a daemon thread; returns (server, proxy_url). Set `server.down = True` to drop everything."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubProxyHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_every = fail_every
+    server.down = False
+    server.calls = 0
+    server.failures = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--fail-every', type=int, default=0, help='drop every n-th connection (0 = never)')
+    args = parser.parse_args()
+    server, url = start_stub_proxy(args.port, args.latency, args.fail_every)
+    print(f"Stub proxy listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -3,10 +3,17 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 from twitter_bot.playwright_client import PlaywrightTwitterClient
-from twitter_bot.tweet_analyzer import select_most_viral
-from twitter_bot.ai_reply import generate_ai_reply
+from twitter_bot.ai_reply import AsyncReplyGenerator
 from twitter_bot.db import TwitterDBLogger
-from datetime import datetime, timezone
+from twitter_bot.memory_governor import governor_from_env
+from twitter_bot.metrics import METRICS
+from twitter_bot.pipeline import EngagementPipeline, print_pipeline_stats
+from twitter_bot.proxy_pool import ProxyPool
+from twitter_bot.reply_cache import ReplyCache
+from twitter_bot.resource_policy import policy_from_env
+from twitter_bot.runner import engage_best_tweet
+from twitter_bot.selector_resolver import SelectorResolver
+from twitter_bot.session_cache import SessionCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,81 +29,68 @@ async def main():
     db_url = os.getenv('DATABASE_URL')
     proxies = os.getenv('PROXIES')  # comma-separated list, optional
     proxy_list = [p.strip() for p in proxies.split(',')] if proxies else []
+    max_actions = int(os.getenv('MAX_ACTIONS', '1'))  # tweets to engage with per run
 
     # Check for missing environment variables
     if not username or not password or not db_url:
         print("Error: Please set TWITTER_USERNAME, TWITTER_PASSWORD, and DATABASE_URL environment variables.")
         sys.exit(1)
 
+    # Stage timings as JSON lines (METRICS_FILE) and/or Prometheus text on METRICS_PORT, off by default
+    METRICS.configure_from_env()
+
     db_logger = TwitterDBLogger(db_url)
 
-    async with PlaywrightTwitterClient(username, password, proxies=proxy_list) as twitter:
-        # Login and scrape feed
-        await twitter.login()
-        print("Logged in")
-        print("Scraping feed....")
-        tweets = await twitter.scrape_feed(count=20)
+    session_cache = SessionCache(os.getenv('SESSION_CACHE_DIR', '.session_cache'))
 
-        # Analyze and select most viral tweet
-        best_tweet = select_most_viral(tweets)
-        print(f"Selected most viral tweet: {best_tweet}")
-        if not best_tweet:
-            print('No tweets found.')
-            return
+    reply_cache = ReplyCache(db_logger)
 
-        # Generate AI reply
-        ai_reply = generate_ai_reply(best_tweet['content'], best_tweet['author'])
+    proxy_pool = None
+    if proxy_list:
+        # Probe every proxy up front so the run starts on a fast, working one
+        proxy_pool = ProxyPool(proxy_list, state_path=os.path.join(session_cache.cache_dir, 'proxies.json'))
+        await proxy_pool.probe_all()
 
-        if "AI error" in ai_reply:      
-            print(f"AI error: {ai_reply}")
-            return
+    # Block media, fonts and analytics; serve static bundles from <SESSION_CACHE_DIR>/assets
+    resource_policy = policy_from_env(session_cache.cache_dir)
 
-        # Repost and reply
-        await twitter.repost_tweet(best_tweet['url'])
-        print("Reposted")
-        await twitter.reply_to_tweet(best_tweet['url'], ai_reply)
-        print(f"Replied: {ai_reply}")
+    # Recycle the feed page once its JS heap or DOM outgrows PAGE_HEAP_LIMIT_MB / PAGE_DOM_NODE_LIMIT
+    memory_governor = governor_from_env()
 
-        # --- DB logic using SQLAlchemy ORM ---
-        # 1. Upsert user
-        user_id = db_logger.upsert_user(twitter_handle=best_tweet['author'])
-        # 2. Upsert tweet
-        tweet_db_id = db_logger.upsert_tweet(
-            tweet_id=best_tweet.get('tweet_id', best_tweet['url']),  # fallback to URL if no tweet_id
-            author_id=user_id,
-            content=best_tweet['content'],
-            created_at=best_tweet.get('created_at'),
-            metadata={
-                'url': best_tweet['url'],
-                'likes': best_tweet['likes'],
-                'retweets': best_tweet['retweets'],
-                'replies': best_tweet['replies']
-            }
-        )
-        # 3. Create session
-        session_id = db_logger.create_session(user_id=user_id, session_timestamp=datetime.now(timezone.utc))
-        # 4. Log repost action
-        db_logger.log_action(
-            session_id=session_id,
-            tweet_db_id=tweet_db_id,
-            action_type='repost',
-            likes=best_tweet['likes'],
-            retweets=best_tweet['retweets'],
-            replies=best_tweet['replies'],
-            extra={'url': best_tweet['url']}
-        )
-        # 5. Log reply action
-        db_logger.log_action(
-            session_id=session_id,
-            tweet_db_id=tweet_db_id,
-            action_type='reply',
-            ai_reply=ai_reply,
-            likes=best_tweet['likes'],
-            retweets=best_tweet['retweets'],
-            replies=best_tweet['replies'],
-            extra={'url': best_tweet['url']}
-        )
-        print("Logged to DB")
+    # Whole session, so the stage table adds up to the run's wall time
+    with METRICS.span('run'):
+        async with AsyncReplyGenerator(cache=reply_cache) as reply_generator, PlaywrightTwitterClient(
+            username,
+            password,
+            proxies=proxy_list,
+            session_cache=session_cache,
+            browser_endpoint=os.getenv('BROWSER_ENDPOINT'),  # optional warm browser, see twitter_bot.browser_pool
+            selectors=SelectorResolver(os.path.join(session_cache.cache_dir, 'selectors.json')),
+            proxy_pool=proxy_pool,
+            resource_policy=resource_policy,
+            memory_governor=memory_governor,
+            base_url=os.getenv('TWITTER_BASE_URL', 'https://twitter.com')  # e.g. the fake site in benchmarks/fake_twitter.py
+        ) as twitter:
+            # Login (or restore a cached session)
+            await twitter.ensure_logged_in()
+            print("Logged in")
+            if max_actions > 1:
+                # Scrape, rank, generate, act and log as concurrent stages until max_actions tweets are done
+                pipeline = EngagementPipeline(twitter, db_logger, reply_generator=reply_generator, max_actions=max_actions)
+                await pipeline.run()
+                print_pipeline_stats(pipeline.stats)
+            else:
+                # Scrape, select the most viral tweet, repost, reply and log it
+                await engage_best_tweet(twitter, db_logger, reply_generator=reply_generator)
+    if resource_policy:
+        print(resource_policy.report())
+    if memory_governor and memory_governor.stats['samples']:
+        s = memory_governor.stats
+        print(f"Feed page peak {s['peak_heap_mb']:.0f} MB heap, {s['peak_dom_nodes']} DOM nodes, {s['recycles']} recycles")
+    print(f"Reply cache hit rate {reply_cache.hit_rate:.0%}, OpenAI calls saved: {reply_cache.api_calls_saved}")
+    if METRICS.enabled:
+        print(METRICS.report())
+        METRICS.close()
     db_logger.close()
 
 if __name__ == '__main__':
@@ -26,8 +26,11 @@ CREATE TABLE twitter_sessions (
 );
 
 -- Actions table (repost, reply, etc.)
+-- Partitioned by month on action_timestamp. The first monthly partitions (tweet_actions_yYYYYmMM)
+-- are created below; later ones ahead of time by `python -m twitter_bot.analytics --migrate` and on
+-- every refresh, which also move rows that landed in the default partition into their month.
 CREATE TABLE tweet_actions (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     session_id INTEGER REFERENCES twitter_sessions(id),
     tweet_id INTEGER REFERENCES tweets(id),
     action_type VARCHAR(20) NOT NULL, -- e.g., 'repost', 'reply'
@@ -35,10 +38,119 @@ CREATE TABLE tweet_actions (
     likes INTEGER,
     retweets INTEGER,
     replies INTEGER,
-    action_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    extra JSONB
-);
+    action_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    extra JSONB, -- url and the acting account
+    CONSTRAINT tweet_actions_partitioned_pkey PRIMARY KEY (id, action_timestamp)
+) PARTITION BY RANGE (action_timestamp);
+
+CREATE TABLE tweet_actions_default PARTITION OF tweet_actions DEFAULT;
+
+-- Partitions for the current month and the next two, so new actions do not pile up in the default one.
+DO $$
+DECLARE
+    m DATE := date_trunc('month', CURRENT_DATE);
+BEGIN
+    FOR i IN 0..2 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF tweet_actions FOR VALUES FROM (%L) TO (%L)',
+            'tweet_actions_y' || to_char(m, 'YYYY"m"MM'), m, (m + INTERVAL '1 month')::date
+        );
+        m := (m + INTERVAL '1 month')::date;
+    END LOOP;
+END $$;
 
 -- Indexes for performance
 CREATE INDEX idx_tweets_author_id ON tweets(author_id);
-CREATE INDEX idx_actions_session_id ON tweet_actions(session_id); 
\ No newline at end of file
+CREATE INDEX idx_actions_session_id ON tweet_actions(session_id);
+CREATE INDEX ix_tweet_actions_type_timestamp ON tweet_actions(action_type, action_timestamp);
+CREATE INDEX ix_tweet_actions_timestamp ON tweet_actions(action_timestamp);
+CREATE INDEX ix_tweet_actions_tweet_id ON tweet_actions(tweet_id);
+CREATE INDEX ix_tweet_actions_account ON tweet_actions((extra ->> 'account'), action_timestamp);
+CREATE INDEX ix_tweet_actions_extra ON tweet_actions USING GIN (extra jsonb_path_ops);
+CREATE INDEX ix_tweets_metadata ON tweets USING GIN (metadata jsonb_path_ops);
+
+-- Work-claim queue for sharded launches (one row per account per launch)
+CREATE TABLE work_items (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) NOT NULL,
+    account VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, claimed, done, failed
+    claimed_by VARCHAR(50),
+    claimed_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    error TEXT
+);
+
+-- Tweets already taken by some worker in a launch
+CREATE TABLE tweet_claims (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) NOT NULL,
+    tweet_url VARCHAR(255) NOT NULL,
+    claimed_by VARCHAR(50),
+    claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(run_id, tweet_url)
+);
+
+CREATE INDEX ix_work_items_run_id ON work_items(run_id);
+
+-- Generated replies, reused while a tweet keeps showing up in the feed
+CREATE TABLE reply_cache (
+    id SERIAL PRIMARY KEY,
+    cache_key VARCHAR(120) UNIQUE NOT NULL, -- tweet_id:content hash
+    reply TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Tweets each bot account has already acted on
+CREATE TABLE acted_tweets (
+    id SERIAL PRIMARY KEY,
+    account VARCHAR(50) NOT NULL,
+    tweet_id VARCHAR(255) NOT NULL,
+    acted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(account, tweet_id)
+);
+
+CREATE INDEX ix_reply_cache_expires_at ON reply_cache(expires_at);
+
+-- Engagements planned by the daemon, kept until they have run so a restart resumes them
+CREATE TABLE scheduled_actions (
+    id SERIAL PRIMARY KEY,
+    account VARCHAR(50) NOT NULL,
+    tweet_id VARCHAR(255) NOT NULL,
+    tweet JSONB NOT NULL,
+    reply TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running, done, failed, expired
+    due_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    error TEXT
+);
+
+CREATE INDEX ix_scheduled_actions_account_status_due ON scheduled_actions(account, status, due_at);
+
+-- Rollups of tweet_actions, refreshed incrementally by twitter_bot.analytics
+CREATE TABLE action_rollups_hourly (
+    hour TIMESTAMP NOT NULL,
+    account VARCHAR(50) NOT NULL, -- '' for actions logged without an account
+    action_type VARCHAR(20) NOT NULL,
+    actions INTEGER NOT NULL,
+    likes BIGINT NOT NULL,
+    retweets BIGINT NOT NULL,
+    replies BIGINT NOT NULL,
+    PRIMARY KEY (hour, account, action_type)
+);
+
+CREATE TABLE author_rollups_daily (
+    day TIMESTAMP NOT NULL,
+    account VARCHAR(50) NOT NULL,
+    author_id INTEGER NOT NULL,
+    actions INTEGER NOT NULL,
+    PRIMARY KEY (day, account, author_id)
+);
+
+CREATE TABLE rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    rolled_up_to TIMESTAMP NOT NULL, -- every hour before this one is in the rollups
+    refreshed_at TIMESTAMP
+);
@@ -1,5 +1,72 @@
+import asyncio
+import json
 import os
-from openai import OpenAI
+import random
+import time
+import weakref
+from typing import Dict, List, Optional, Set, Tuple
+from openai import AsyncOpenAI, OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from twitter_bot.metrics import METRICS
+from twitter_bot.reply_cache import ReplyCache, reply_cache_key
+
+MODEL = "gpt-3.5-turbo"
+MAX_REPLY_CHARS = 280
+# Completion budget per tweet in a batch request (the single-reply path uses 60 tokens).
+BATCH_TOKENS_PER_REPLY = 70
+
+# Errors worth retrying with backoff; anything else fails the reply immediately.
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+def _build_messages(tweet_content: str, author: str) -> List[Dict]:
+    prompt = (
+        f"You are a friendly, witty Twitter user. "
+        f"Reply to the following tweet in a human-like, context-aware, and conversational way. "
+        f"Keep it short and engaging.\n"
+        f"Tweet from @{author}: '{tweet_content}'"
+    )
+    return [
+        {"role": "system", "content": "You are a helpful, witty Twitter user."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _build_batch_messages(items: List[Tuple[int, Dict]]) -> List[Dict]:
+    tweets = [{"id": i, "author": t['author'], "tweet": t['content']} for i, t in items]
+    prompt = (
+        f"You are a friendly, witty Twitter user. "
+        f"Reply to each of the following tweets in a human-like, context-aware, and conversational way. "
+        f"Keep each reply short and engaging.\n"
+        f'Answer with a JSON object {{"replies": [{{"id": <id>, "reply": "<text>"}}]}} '
+        f"containing exactly one reply per tweet id.\n"
+        f"Tweets: {json.dumps(tweets, ensure_ascii=False)}"
+    )
+    return [
+        {"role": "system", "content": "You are a helpful, witty Twitter user."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_batch_replies(content: str, ids: Set[int]) -> Dict[int, str]:
+    """Valid replies from a batch completion, keyed by tweet id; malformed items are left out."""
+    try:
+        items = json.loads(content).get('replies')
+    except (ValueError, AttributeError):
+        return {}
+    replies = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            # Models sometimes quote the ids ("0"); only items whose id is not a number are dropped.
+            tweet_id = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        reply = item.get('reply')
+        if tweet_id in ids and isinstance(reply, str) and 0 < len(reply.strip()) <= MAX_REPLY_CHARS:
+            replies[tweet_id] = reply.strip()
+    return replies
+
 
 def generate_ai_reply(tweet_content: str, author: str) -> str:
     """
@@ -8,25 +75,222 @@ def generate_ai_reply(tweet_content: str, author: str) -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return f"@{author} Interesting point! AI error: OpenAI API key not set"
-    
+
     client = OpenAI(api_key=api_key)
-    prompt = (
-        f"You are a friendly, witty Twitter user. "
-        f"Reply to the following tweet in a human-like, context-aware, and conversational way. "
-        f"Keep it short and engaging.\n"
-        f"Tweet from @{author}: '{tweet_content}'"
-    )
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful, witty Twitter user."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=60,
-            temperature=0.8,
-        )
+        with METRICS.span('openai', mode='sync'):
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=_build_messages(tweet_content, author),
+                max_tokens=60,
+                temperature=0.8,
+            )
         reply = response.choices[0].message.content.strip()
         return reply
     except Exception as e:
-        return f"@{author} Interesting thought! (AI error: {e})" 
\ No newline at end of file
+        return f"@{author} Interesting thought! (AI error: {e})"
+
+
+class AsyncReplyGenerator:
+    """
+    Async counterpart of generate_ai_reply that keeps one pooled AsyncOpenAI client,
+    with a per-request timeout and retries with exponential backoff.
+
+    speculation() hands out a ReplySpeculation for generating likely replies ahead of time.
+    generate_batch() answers several tweets with a single request.
+    With a `cache`, replies already generated for the same tweet are reused instead of
+    calling the API again.
+    Failed replies return the same "AI error" strings as generate_ai_reply.
+    """
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: str = MODEL,
+        timeout: float = 20.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        cache: Optional[ReplyCache] = None
+    ):
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        # base_url (or OPENAI_BASE_URL) can point at a local stub of the chat completions API.
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0) if api_key else None
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self._speculations = weakref.WeakSet()
+        self.stats = {'requests': 0, 'retries': 0, 'speculated': 0, 'speculation_hits': 0, 'cancelled': 0}
+        # Token and latency accounting for per-tweet ('single') and batched requests.
+        self.usage = {
+            mode: {'requests': 0, 'items': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'seconds': 0.0}
+            for mode in ('single', 'batch')
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _complete(self, messages: List[Dict], max_tokens: int, mode: str, json_output: bool = False) -> str:
+        """One chat completion; records token usage and latency under usage[mode]."""
+        extra = {'response_format': {'type': 'json_object'}} if json_output else {}
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+        with METRICS.span('openai', mode=mode):
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.8,
+                **extra
+            )
+        usage = self.usage[mode]
+        usage['requests'] += 1
+        usage['seconds'] += time.perf_counter() - start
+        if response.usage:
+            usage['prompt_tokens'] += response.usage.prompt_tokens
+            usage['completion_tokens'] += response.usage.completion_tokens
+            METRICS.count('openai_tokens', response.usage.prompt_tokens, kind='prompt')
+            METRICS.count('openai_tokens', response.usage.completion_tokens, kind='completion')
+        return response.choices[0].message.content
+
+    async def generate(self, tweet_content: str, author: str, tweet_id: Optional[str] = None) -> str:
+        key = reply_cache_key(tweet_id, tweet_content, author)
+        if self.cache:
+            cached = await self.cache.get(key)
+            if cached:
+                return cached
+        if not self.client:
+            return f"@{author} Interesting point! AI error: OpenAI API key not set"
+        for attempt in range(self.max_retries + 1):
+            try:
+                reply = await self._complete(_build_messages(tweet_content, author), max_tokens=60, mode='single')
+                self.usage['single']['items'] += 1
+                reply = reply.strip()
+                if self.cache:
+                    await self.cache.put(key, reply)
+                return reply
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    return f"@{author} Interesting thought! (AI error: {e})"
+                await self._backoff(attempt)
+            except Exception as e:
+                return f"@{author} Interesting thought! (AI error: {e})"
+
+    async def generate_batch(self, tweets: List[Dict]) -> List[str]:
+        """
+        Replies for several tweets from one chat completion, in the order of `tweets`.
+        The system/persona prompt is sent once and the model answers with structured JSON;
+        items missing or invalid in the output are retried on their own, and anything still
+        unanswered after the retries gets an "AI error" reply.
+        """
+        keys = [reply_cache_key(t.get('tweet_id'), t['content'], t['author']) for t in tweets]
+        replies: Dict[int, str] = {}
+        if self.cache:
+            for i, key in enumerate(keys):
+                cached = await self.cache.get(key)
+                if cached:
+                    replies[i] = cached
+        if not self.client:
+            return [replies.get(i) or f"@{t['author']} Interesting point! AI error: OpenAI API key not set" for i, t in enumerate(tweets)]
+        pending = [i for i in range(len(tweets)) if i not in replies]
+        error = "no valid reply in batch output"
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            try:
+                content = await self._complete(
+                    _build_batch_messages([(i, tweets[i]) for i in pending]),
+                    max_tokens=BATCH_TOKENS_PER_REPLY * len(pending) + 20,
+                    mode='batch',
+                    json_output=True
+                )
+            except RETRYABLE_ERRORS as e:
+                error = e
+                if attempt < self.max_retries:
+                    await self._backoff(attempt)
+                continue
+            except Exception as e:
+                error = e
+                break
+            parsed = _parse_batch_replies(content, set(pending))
+            self.usage['batch']['items'] += len(parsed)
+            if self.cache:
+                for i, reply in parsed.items():
+                    await self.cache.put(keys[i], reply)
+            replies.update(parsed)
+            pending = [i for i in pending if i not in parsed]
+            if pending and attempt < self.max_retries:
+                self.stats['retries'] += 1
+        return [
+            replies.get(i) or f"@{t['author']} Interesting thought! (AI error: {error})"
+            for i, t in enumerate(tweets)
+        ]
+
+    async def _backoff(self, attempt: int):
+        self.stats['retries'] += 1
+        await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.8, 1.2))
+
+    def speculation(self) -> 'ReplySpeculation':
+        """Per-session set of speculative replies (sessions sharing a generator do not interfere)."""
+        speculation = ReplySpeculation(self)
+        self._speculations.add(speculation)
+        return speculation
+
+    async def close(self):
+        for speculation in list(self._speculations):
+            speculation.cancel()
+        if self.client:
+            await self.client.close()
+
+
+class ReplySpeculation:
+    """
+    Replies generated ahead of time for one session: speculate() starts replies for likely
+    candidates (e.g. the current top-k while the feed is still being scraped), reply_for()
+    reuses a speculated reply or starts a new one, and cancel() drops the ones not needed.
+    A candidate that drops out of the top-k keeps its reply, finished or running, in case it
+    comes back; a running one is only cancelled after `max_idle` seconds out of the candidates.
+    """
+    def __init__(self, generator: AsyncReplyGenerator, max_idle: float = 15.0):
+        self.generator = generator
+        self.max_idle = max_idle
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._last_wanted: Dict[str, float] = {}
+
+    def speculate(self, tweets: List[Dict]) -> None:
+        """Start replies for `tweets` in the background; cancel running ones out of the candidates for too long."""
+        now = time.monotonic()
+        for tweet in tweets:
+            self._last_wanted[tweet['url']] = now
+        for url, task in list(self._tasks.items()):
+            if not task.done() and now - self._last_wanted[url] > self.max_idle:
+                self._cancel(url)
+        for tweet in tweets:
+            if tweet['url'] not in self._tasks:
+                self._tasks[tweet['url']] = asyncio.create_task(
+                    self.generator.generate(tweet['content'], tweet['author'], tweet.get('tweet_id'))
+                )
+                self.generator.stats['speculated'] += 1
+
+    def reply_for(self, tweet: Dict) -> asyncio.Task:
+        """Task resolving to the reply for `tweet`, reusing a speculative one when available."""
+        task = self._tasks.pop(tweet['url'], None)
+        self._last_wanted.pop(tweet['url'], None)
+        if task is not None:
+            self.generator.stats['speculation_hits'] += 1
+            return task
+        return asyncio.create_task(self.generator.generate(tweet['content'], tweet['author'], tweet.get('tweet_id')))
+
+    def cancel(self) -> None:
+        for url in list(self._tasks):
+            self._cancel(url)
+
+    def _cancel(self, url: str) -> None:
+        task = self._tasks.pop(url)
+        self._last_wanted.pop(url, None)
+        if not task.done():
+            task.cancel()
+            self.generator.stats['cancelled'] += 1
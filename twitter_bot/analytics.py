@@ -0,0 +1,420 @@
+"""
+Analytics read path over the action history.
+
+tweet_actions only grows, so questions like "actions per account per hour", "engagement of
+tweets we replied to" or "authors we interacted with most" turn into full scans of it.
+ActionAnalytics answers them from rollup tables instead:
+
+- migrate() indexes tweet_actions (action type, timestamp, acting account). On PostgreSQL it
+  also turns the table into one range-partitioned by month on action_timestamp, copying the
+  existing rows, and moves the JSON columns to JSONB with GIN indexes.
+- refresh() updates the rollups incrementally. Each call re-aggregates only the hours since
+  the previous one, plus `overlap` hours for actions committed late.
+- actions_per_hour(), actions_per_account(), reply_engagement() and top_authors() read only
+  the rollups.
+
+    poetry run python -m twitter_bot.analytics --migrate --refresh --hours 48
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy import BigInteger, Column, Integer, String, TIMESTAMP, delete, func, insert, literal_column, select
+from sqlalchemy.schema import CreateIndex
+from twitter_bot.db import Base, Tweet, TweetAction, TwitterDBLogger, TwitterUser
+
+ROLLUP_NAME = 'hourly'
+
+
+class ActionRollup(Base):
+    """Actions per hour, bot account and action type, with the acted-on tweets' counts summed."""
+    __tablename__ = 'action_rollups_hourly'
+    hour = Column(TIMESTAMP, primary_key=True)
+    account = Column(String(50), primary_key=True)  # '' for actions logged without an account
+    action_type = Column(String(20), primary_key=True)
+    actions = Column(Integer, nullable=False)
+    likes = Column(BigInteger, nullable=False)
+    retweets = Column(BigInteger, nullable=False)
+    replies = Column(BigInteger, nullable=False)
+
+
+class AuthorRollup(Base):
+    """
+    Actions per day and bot account on the tweets of one author. Daily, because per hour
+    almost every action is on a different author and the rollup would be as big as the history.
+    """
+    __tablename__ = 'author_rollups_daily'
+    day = Column(TIMESTAMP, primary_key=True)
+    account = Column(String(50), primary_key=True)
+    author_id = Column(Integer, primary_key=True)
+    actions = Column(Integer, nullable=False)
+
+
+class RollupState(Base):
+    """How far the rollups are complete: every hour before `rolled_up_to` has been aggregated."""
+    __tablename__ = 'rollup_state'
+    name = Column(String(50), primary_key=True)
+    rolled_up_to = Column(TIMESTAMP, nullable=False)
+    refreshed_at = Column(TIMESTAMP)
+
+
+ROLLUP_TABLES = [ActionRollup.__table__, AuthorRollup.__table__, RollupState.__table__]
+
+# The acting account, as record_engagement stores it in extra.
+ACCOUNT = TweetAction.extra['account'].as_string()
+
+# Indexes on the JSON documents: the acting account, for ad-hoc lookups of one account's raw
+# history, and on PostgreSQL GIN indexes for containment (@>) queries.
+ACCOUNT_INDEXES = {
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS ix_tweet_actions_account ON tweet_actions ((extra ->> 'account'), action_timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_tweet_actions_extra ON tweet_actions USING GIN (extra jsonb_path_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_tweets_metadata ON tweets USING GIN (metadata jsonb_path_ops)"
+    ],
+    'sqlite': [
+        "CREATE INDEX IF NOT EXISTS ix_tweet_actions_account ON tweet_actions (json_extract(extra, '$.account'), action_timestamp)"
+    ]
+}
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """TIMESTAMP columns hold naive UTC."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def time_bucket(column, dialect: str, unit: str = 'hour'):
+    """SQL expression truncating a timestamp column to the hour or day."""
+    if dialect == 'postgresql':
+        return func.date_trunc(literal_column(f"'{unit}'"), column)
+    # Same text format SQLAlchemy stores datetimes in on SQLite, so comparisons with bound datetimes work.
+    return func.strftime('%Y-%m-%d %H:00:00.000000' if unit == 'hour' else '%Y-%m-%d 00:00:00.000000', column)
+
+
+class ActionAnalytics:
+    """
+    Rollup-backed queries over tweet_actions. Each refresh rebuilds action_rollups_hourly from
+    `overlap` hours before the previous refresh onward (author_rollups_daily from the start of
+    that day), so actions committed up to that much later than their action_timestamp still count.
+    On PostgreSQL, partitions for the next `months_ahead` months are kept created.
+    """
+    def __init__(self, db_logger: TwitterDBLogger, overlap_hours: float = 2, months_ahead: int = 2):
+        self.engine = db_logger.engine
+        self.dialect = self.engine.dialect.name
+        self._insert = db_logger._insert
+        self.overlap = timedelta(hours=overlap_hours)
+        self.months_ahead = months_ahead
+        Base.metadata.create_all(self.engine, tables=ROLLUP_TABLES)
+
+    # Schema
+
+    def migrate(self) -> Dict:
+        """Partition (PostgreSQL) and index tweet_actions; safe to run again. Returns what was changed."""
+        done = {'partitioned': False, 'jsonb': []}
+        with self.engine.begin() as conn:
+            if self.dialect == 'postgresql':
+                done['jsonb'] = self._jsonb_columns(conn)
+                if not self.is_partitioned(conn):
+                    self._partition(conn)
+                    done['partitioned'] = True
+                self._ensure_partitions(conn, datetime.now(timezone.utc))
+            for index in TweetAction.__table__.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+            for statement in ACCOUNT_INDEXES.get(self.dialect, []):
+                conn.exec_driver_sql(statement)
+        return done
+
+    def is_partitioned(self, conn) -> bool:
+        if self.dialect != 'postgresql':
+            return False
+        return conn.exec_driver_sql(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'tweet_actions'::regclass"
+        ).first() is not None
+
+    def _jsonb_columns(self, conn) -> List[str]:
+        """Convert JSON columns created by older versions of the ORM to JSONB."""
+        converted = []
+        for table, column in (('tweets', 'metadata'), ('tweet_actions', 'extra')):
+            data_type = conn.exec_driver_sql(
+                "SELECT data_type FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+                (table, column)
+            ).scalar()
+            if data_type == 'json':
+                conn.exec_driver_sql(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb")
+                converted.append(f"{table}.{column}")
+        return converted
+
+    def _partition(self, conn) -> None:
+        """Swap tweet_actions for a copy range-partitioned by month on action_timestamp, with the same indexes."""
+        sql = conn.exec_driver_sql
+        # Index definitions (not those backing constraints), recreated once the old table is gone.
+        indexes = [definition for (definition,) in sql(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = 'tweet_actions'::regclass "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)"
+        )]
+        sql("ALTER TABLE tweet_actions RENAME TO tweet_actions_unpartitioned")
+        sequence = sql("SELECT pg_get_serial_sequence('tweet_actions_unpartitioned', 'id')").scalar()
+        sql("CREATE TABLE tweet_actions (LIKE tweet_actions_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (action_timestamp)")
+        # The partition key has to be part of the primary key, so it cannot be NULL.
+        sql("ALTER TABLE tweet_actions ALTER COLUMN action_timestamp SET NOT NULL")
+        sql("ALTER TABLE tweet_actions ADD CONSTRAINT tweet_actions_partitioned_pkey PRIMARY KEY (id, action_timestamp)")
+        sql("ALTER TABLE tweet_actions ADD FOREIGN KEY (session_id) REFERENCES twitter_sessions(id)")
+        sql("ALTER TABLE tweet_actions ADD FOREIGN KEY (tweet_id) REFERENCES tweets(id)")
+        if sequence:
+            # Keep the id sequence alive when the old table is dropped.
+            sql(f"ALTER SEQUENCE {sequence} OWNED BY tweet_actions.id")
+        first = sql("SELECT min(action_timestamp) FROM tweet_actions_unpartitioned").scalar()
+        sql("CREATE TABLE tweet_actions_default PARTITION OF tweet_actions DEFAULT")
+        self._ensure_partitions(conn, first or datetime.now(timezone.utc))
+        columns = 'id, session_id, tweet_id, action_type, ai_reply, likes, retweets, replies, action_timestamp, extra'
+        sql(f"INSERT INTO tweet_actions ({columns}) "
+            "SELECT id, session_id, tweet_id, action_type, ai_reply, likes, retweets, replies, "
+            "COALESCE(action_timestamp, 'epoch'), extra::jsonb FROM tweet_actions_unpartitioned")
+        sql("DROP TABLE tweet_actions_unpartitioned")
+        for definition in indexes:
+            try:
+                with conn.begin_nested():
+                    sql(definition.replace('CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1))
+            except Exception as e:
+                # e.g. a unique index without action_timestamp, which a partitioned table cannot have.
+                print(f"Could not recreate index on the partitioned table: {definition}: {e}")
+
+    def _ensure_partitions(self, conn, since: datetime) -> None:
+        """Monthly partitions from `since` through `months_ahead` months after now."""
+        month, last = _month(since), _month(datetime.now(timezone.utc))
+        for _ in range(self.months_ahead):
+            last = _next_month(last)
+        while month <= last:
+            name = f"tweet_actions_y{month.year}m{month.month:02d}"
+            try:
+                with conn.begin_nested():
+                    self._create_partition(conn, name, month)
+            except Exception as e:
+                print(f"Could not create partition {name}: {e}")
+            month = _next_month(month)
+
+    def _create_partition(self, conn, name: str, month: date) -> None:
+        """
+        Partition `name` for `month`. Rows of that month already in the default partition would
+        make CREATE fail, so the default is detached, the partition created, the rows moved into
+        it and the default attached again.
+        """
+        sql = conn.exec_driver_sql
+        if sql("SELECT to_regclass(%s)", (name,)).scalar():
+            return
+        bounds = f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+        in_month = f"action_timestamp >= '{month}' AND action_timestamp < '{_next_month(month)}'"
+        stray = sql("SELECT to_regclass('tweet_actions_default')").scalar() and sql(
+            f"SELECT 1 FROM tweet_actions_default WHERE {in_month} LIMIT 1"
+        ).first()
+        if not stray:
+            sql(f"CREATE TABLE {name} PARTITION OF tweet_actions {bounds}")
+            return
+        sql("ALTER TABLE tweet_actions DETACH PARTITION tweet_actions_default")
+        sql(f"CREATE TABLE {name} PARTITION OF tweet_actions {bounds}")
+        sql(f"INSERT INTO tweet_actions SELECT * FROM tweet_actions_default WHERE {in_month}")
+        sql(f"DELETE FROM tweet_actions_default WHERE {in_month}")
+        sql("ALTER TABLE tweet_actions ATTACH PARTITION tweet_actions_default DEFAULT")
+
+    # Rollups
+
+    def refresh(self, now: Optional[datetime] = None) -> Dict:
+        """Re-aggregate the hours since the last refresh (all history the first time)."""
+        now = _utc_naive(now or datetime.now(timezone.utc))
+        actions = TweetAction.__table__
+        state_table = RollupState.__table__
+        with self.engine.begin() as conn:
+            if self.dialect == 'postgresql' and self.is_partitioned(conn):
+                self._ensure_partitions(conn, now)
+            rolled_up_to = conn.execute(select(state_table.c.rolled_up_to).where(state_table.c.name == ROLLUP_NAME)).scalar()
+            if rolled_up_to is None:
+                first = conn.execute(select(func.min(actions.c.action_timestamp))).scalar()
+                if first is None:
+                    return {'from': None, 'action_rows': 0, 'author_rows': 0}
+                start = _floor_hour(_utc_naive(first))
+            else:
+                start = _floor_hour(rolled_up_to) - self.overlap
+            conn.execute(delete(ActionRollup.__table__).where(ActionRollup.__table__.c.hour >= start))
+            conn.execute(delete(AuthorRollup.__table__).where(AuthorRollup.__table__.c.day >= _floor_day(start)))
+            action_rows = conn.execute(self._action_rollup(start)).rowcount
+            author_rows = conn.execute(self._author_rollup(_floor_day(start))).rowcount
+            state = {'name': ROLLUP_NAME, 'rolled_up_to': _floor_hour(now), 'refreshed_at': now}
+            stmt = self._insert(state_table)
+            if stmt is None:
+                # No ON CONFLICT on this dialect; the transaction makes delete + insert safe.
+                conn.execute(delete(state_table).where(state_table.c.name == ROLLUP_NAME))
+                conn.execute(state_table.insert().values(**state))
+            else:
+                stmt = stmt.values(**state)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=[state_table.c.name],
+                    set_={'rolled_up_to': stmt.excluded.rolled_up_to, 'refreshed_at': stmt.excluded.refreshed_at}
+                ))
+        return {'from': start, 'action_rows': action_rows, 'author_rows': author_rows}
+
+    def _action_rollup(self, start: datetime):
+        actions = TweetAction.__table__
+        # Group in an outer query, so the bucket and account expressions are not repeated with new bind parameters.
+        rows = select(
+            time_bucket(actions.c.action_timestamp, self.dialect).label('hour'),
+            func.coalesce(ACCOUNT, '').label('account'),
+            actions.c.action_type, actions.c.likes, actions.c.retweets, actions.c.replies
+        ).where(actions.c.action_timestamp >= start).subquery()
+        grouped = select(
+            rows.c.hour, rows.c.account, rows.c.action_type, func.count(),
+            func.coalesce(func.sum(rows.c.likes), 0), func.coalesce(func.sum(rows.c.retweets), 0),
+            func.coalesce(func.sum(rows.c.replies), 0)
+        ).group_by(rows.c.hour, rows.c.account, rows.c.action_type)
+        return insert(ActionRollup.__table__).from_select(
+            ['hour', 'account', 'action_type', 'actions', 'likes', 'retweets', 'replies'], grouped
+        )
+
+    def _author_rollup(self, start: datetime):
+        actions, tweets = TweetAction.__table__, Tweet.__table__
+        rows = select(
+            time_bucket(actions.c.action_timestamp, self.dialect, 'day').label('day'),
+            func.coalesce(ACCOUNT, '').label('account'),
+            tweets.c.author_id
+        ).select_from(actions.join(tweets, tweets.c.id == actions.c.tweet_id)).where(
+            actions.c.action_timestamp >= start, tweets.c.author_id.isnot(None)
+        ).subquery()
+        grouped = select(rows.c.day, rows.c.account, rows.c.author_id, func.count()).group_by(
+            rows.c.day, rows.c.account, rows.c.author_id
+        )
+        return insert(AuthorRollup.__table__).from_select(['day', 'account', 'author_id', 'actions'], grouped)
+
+    # Queries (rollups only)
+
+    @staticmethod
+    def _window(bucket, account_column, account: Optional[str], since: Optional[datetime], until: Optional[datetime], floor=_floor_hour) -> List:
+        """Conditions for the buckets from the one holding `since` up to `until`."""
+        conditions = []
+        if account is not None:
+            conditions.append(account_column == account)
+        if since is not None:
+            conditions.append(bucket >= floor(_utc_naive(since)))
+        if until is not None:
+            conditions.append(bucket < _utc_naive(until))
+        return conditions
+
+    def actions_per_hour(
+        self,
+        account: Optional[str] = None,
+        action_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict]:
+        """[{hour, account, action_type, actions}] in hour order."""
+        table = ActionRollup.__table__
+        conditions = self._window(table.c.hour, table.c.account, account, since, until)
+        if action_type is not None:
+            conditions.append(table.c.action_type == action_type)
+        stmt = select(table.c.hour, table.c.account, table.c.action_type, table.c.actions).where(*conditions).order_by(
+            table.c.hour, table.c.account, table.c.action_type
+        )
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(stmt)]
+
+    def actions_per_account(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict]:
+        """[{account, actions}] with the busiest account first."""
+        table = ActionRollup.__table__
+        total = func.sum(table.c.actions).label('actions')
+        stmt = select(table.c.account, total).where(*self._window(table.c.hour, table.c.account, None, since, until)).group_by(
+            table.c.account
+        ).order_by(total.desc(), table.c.account)
+        with self.engine.connect() as conn:
+            return [{'account': account, 'actions': int(actions)} for account, actions in conn.execute(stmt)]
+
+    def reply_engagement(
+        self,
+        account: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Dict:
+        """Replies sent and the average likes, retweets and replies the replied-to tweets had."""
+        table = ActionRollup.__table__
+        stmt = select(
+            func.sum(table.c.actions), func.sum(table.c.likes), func.sum(table.c.retweets), func.sum(table.c.replies)
+        ).where(table.c.action_type == 'reply', *self._window(table.c.hour, table.c.account, account, since, until))
+        with self.engine.connect() as conn:
+            count, likes, retweets, replies = conn.execute(stmt).one()
+        count = int(count or 0)
+        return {
+            'replies_sent': count,
+            'avg_likes': likes / count if count else 0.0,
+            'avg_retweets': retweets / count if count else 0.0,
+            'avg_replies': replies / count if count else 0.0
+        }
+
+    def top_authors(
+        self,
+        account: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 10
+    ) -> List[Dict]:
+        """[{author, actions}] for the authors acted on most, most first; the window is in whole days."""
+        table, users = AuthorRollup.__table__, TwitterUser.__table__
+        total = func.sum(table.c.actions).label('actions')
+        top = select(table.c.author_id, total).where(*self._window(table.c.day, table.c.account, account, since, until, _floor_day)).group_by(
+            table.c.author_id
+        ).order_by(total.desc(), table.c.author_id).limit(limit).subquery()
+        stmt = select(users.c.twitter_handle, top.c.actions).join_from(top, users, users.c.id == top.c.author_id).order_by(
+            top.c.actions.desc(), top.c.author_id
+        )
+        with self.engine.connect() as conn:
+            return [{'author': handle, 'actions': int(actions)} for handle, actions in conn.execute(stmt)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Action history analytics from hourly rollups.")
+    parser.add_argument('--migrate', action='store_true', help="partition (PostgreSQL) and index tweet_actions first")
+    parser.add_argument('--refresh', action='store_true', help="bring the rollups up to date first")
+    parser.add_argument('--hours', type=float, default=24, help="report window (default 24)")
+    parser.add_argument('--account', help="only this bot account")
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("Error: Please set the DATABASE_URL environment variable.")
+        sys.exit(1)
+    db_logger = TwitterDBLogger(db_url)
+    analytics = ActionAnalytics(db_logger)
+    if args.migrate:
+        print(f"Migrated: {analytics.migrate()}")
+    if args.refresh:
+        result = analytics.refresh()
+        print(f"Refreshed from {result['from']}: {result['action_rows']} action and {result['author_rows']} author rollup rows")
+    since = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+    print(f"\nActions per account, last {args.hours:g}h:")
+    for row in analytics.actions_per_account(since=since):
+        print(f"  {row['account'] or '(none)':<20} {row['actions']:>8}")
+    e = analytics.reply_engagement(account=args.account, since=since)
+    print(f"\nReplies sent: {e['replies_sent']}, replied-to tweets averaged {e['avg_likes']:.1f} likes, "
+          f"{e['avg_retweets']:.1f} retweets, {e['avg_replies']:.1f} replies")
+    print("\nAuthors interacted with most:")
+    for row in analytics.top_authors(account=args.account, since=since):
+        print(f"  {row['author']:<20} {row['actions']:>8}")
+    db_logger.close()
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import create_async_engine
+from twitter_bot.db import Base, TweetAction, TwitterSession, dialect_insert, tweet_upsert_stmt, user_upsert_stmt
+
+# Drivers used for the async engine, keyed by the dialect part of the database URL.
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+_STOP = object()
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """asyncpg rejects aware datetimes for TIMESTAMP columns, so store naive UTC."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _now() -> datetime:
+    return _utc_naive(datetime.now(timezone.utc))
+
+
+def async_db_url(db_url: str) -> str:
+    """Rewrite a DATABASE_URL (e.g. postgresql+psycopg2://...) to its asyncpg/aiosqlite form."""
+    scheme, sep, rest = db_url.partition('://')
+    dialect = scheme.split('+', 1)[0]
+    if dialect == 'postgres':
+        dialect = 'postgresql'
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {scheme}")
+    return f"{ASYNC_DRIVERS[dialect]}{sep}{rest}"
+
+
+class AsyncTwitterDBLogger:
+    """
+    Non-blocking logger for asyncio code (asyncpg on PostgreSQL, aiosqlite on SQLite).
+    Lookups that return IDs (users, tweets, sessions) are awaited on a pooled connection;
+    actions are queued with enqueue_action and written by a background task in batches,
+    once `batch_size` actions are waiting or `flush_interval` seconds have passed.
+    """
+    def __init__(
+        self,
+        db_url: str,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        pool_size: int = 5
+    ):
+        self.db_url = async_db_url(db_url)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.pool_size = pool_size
+        self.engine = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0, 'max_depth': 0, 'write_seconds': 0.0}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        engine_args = {}
+        if not self.db_url.startswith('sqlite'):
+            engine_args['pool_size'] = self.pool_size
+        self.engine = create_async_engine(self.db_url, **engine_args)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def _insert(self, table):
+        return dialect_insert(self.engine.dialect.name, table)
+
+    async def upsert_user(self, twitter_handle: str, display_name: Optional[str] = None) -> int:
+        rows = [{'twitter_handle': twitter_handle, 'display_name': display_name, 'created_at': _now()}]
+        async with self.engine.begin() as conn:
+            result = await conn.execute(user_upsert_stmt(self._insert, rows))
+            return result.first()[0]
+
+    async def upsert_tweet(self, tweet_id: str, author_id: int, content: str, created_at: Optional[datetime] = None, metadata: Optional[Dict] = None) -> int:
+        rows = [{'tweet_id': tweet_id, 'author_id': author_id, 'content': content, 'created_at': _utc_naive(created_at), 'metadata': metadata}]
+        async with self.engine.begin() as conn:
+            result = await conn.execute(tweet_upsert_stmt(self._insert, rows))
+            return result.first()[0]
+
+    async def create_session(self, user_id: int, session_timestamp: datetime) -> int:
+        table = TwitterSession.__table__
+        stmt = table.insert().values(
+            user_id=user_id,
+            session_timestamp=_utc_naive(session_timestamp),
+            created_at=_now()
+        ).returning(table.c.id)
+        async with self.engine.begin() as conn:
+            return (await conn.execute(stmt)).scalar_one()
+
+    def enqueue_action(
+        self,
+        session_id: int,
+        tweet_db_id: int,
+        action_type: str,
+        ai_reply: Optional[str] = None,
+        likes: Optional[int] = None,
+        retweets: Optional[int] = None,
+        replies: Optional[int] = None,
+        extra: Optional[Dict] = None
+    ) -> bool:
+        """Queue an action for the background writer without blocking; False if the queue is full."""
+        if self._queue is None:
+            raise RuntimeError("Logger not started. Use 'async with' or call start() first.")
+        action = {
+            'session_id': session_id,
+            'tweet_id': tweet_db_id,
+            'action_type': action_type,
+            'ai_reply': ai_reply,
+            'likes': likes,
+            'retweets': retweets,
+            'replies': replies,
+            'extra': extra,
+            'action_timestamp': _now()
+        }
+        try:
+            self._queue.put_nowait(action)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            print(f"DB write queue full, dropped {action_type} action.")
+            return False
+        self.stats['enqueued'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], self._queue.qsize())
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def metrics(self) -> Dict:
+        """Queue depth and writer counters."""
+        return dict(self.stats, queue_depth=self.queue_depth)
+
+    async def flush(self):
+        """Wait until every queued action has been written."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        """Write everything still queued, stop the writer and dispose of the pool."""
+        if self._writer:
+            await self._queue.put(_STOP)
+            await self._writer
+            self._writer = None
+        if self.engine:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            batch: List = [item]
+            deadline = loop.time() + self.flush_interval
+            while item is not _STOP and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+            actions = [a for a in batch if a is not _STOP]
+            stopping = len(actions) != len(batch)
+            if actions:
+                await self._write(actions)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _write(self, actions: List[Dict]):
+        start = time.perf_counter()
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(TweetAction.__table__.insert(), actions)
+            self.stats['written'] += len(actions)
+            self.stats['batches'] += 1
+        except Exception as e:
+            self.stats['failed'] += len(actions)
+            print(f"Failed to write {len(actions)} actions: {e}")
+        self.stats['write_seconds'] += time.perf_counter() - start
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+from typing import Dict, List, Optional
+from playwright.async_api import async_playwright
+from twitter_bot.stealth import IGNORE_DEFAULT_ARGS, apply_stealth
+
+
+async def connect_browser(playwright, endpoint: str):
+    """Attach to a running browser: ws:// for `playwright run-server`, http:// for a CDP endpoint."""
+    if endpoint.startswith('ws'):
+        return await playwright.chromium.connect(endpoint)
+    return await playwright.chromium.connect_over_cdp(endpoint)
+
+
+async def restore_origins(page, origins: List[Dict]):
+    """
+    Seed the localStorage part of a storage_state into an existing context, as
+    new_context(storage_state=...) does: each origin is loaded with an empty document served
+    by a route (nothing goes over the network) and its items are set there.
+    """
+    async def empty(route):
+        await route.fulfill(status=200, content_type='text/html', body='<html><head></head><body></body></html>')
+
+    await page.route('**/*', empty)
+    try:
+        for origin in origins:
+            await page.goto(origin['origin'])
+            await page.evaluate(
+                "items => { for (const {name, value} of items) localStorage.setItem(name, value); }",
+                origin.get('localStorage', [])
+            )
+    finally:
+        await page.unroute('**/*', empty)
+    await page.goto('about:blank')
+
+
+class ContextLease:
+    """A browser context plus its stealth-configured page, handed out by BrowserPool."""
+    def __init__(self, context, page, cdp, proxy: Optional[str] = None):
+        self.context = context
+        self.page = page
+        self.cdp = cdp
+        self.proxy = proxy
+        self.key: Optional[str] = None
+        self.uses = 0
+
+    async def heap_mb(self) -> float:
+        """Used JS heap of the leased page, in MB."""
+        usage = await self.cdp.send('Runtime.getHeapUsage')
+        return usage['usedSize'] / (1024 * 1024)
+
+
+class BrowserPool:
+    """
+    Long-lived Chromium with a pool of pre-configured contexts.
+
+    The browser is launched locally, or attached to an already running one when `endpoint`
+    is given: an http:// CDP endpoint (see `python -m twitter_bot.browser_pool`) or a ws://
+    `playwright run-server` endpoint. Contexts come with the stealth init scripts and the
+    user-agent override installed. A released context is kept for the same account/proxy
+    key and recycled after `max_uses` leases or once its JS heap exceeds `max_heap_mb`.
+    """
+    def __init__(self, endpoint: Optional[str] = None, size: int = 2, max_uses: int = 25, max_heap_mb: float = 512.0):
+        self.endpoint = endpoint
+        self.size = size
+        self.max_uses = max_uses
+        self.max_heap_mb = max_heap_mb
+        self.playwright = None
+        self.browser = None
+        self._blank: List[ContextLease] = []
+        self._idle: Dict[str, List[ContextLease]] = {}
+        self._warming: Optional[asyncio.Task] = None
+        self.stats = {'created': 0, 'reused': 0, 'warm_hits': 0, 'recycled': 0}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        if self.endpoint:
+            self.browser = await connect_browser(self.playwright, self.endpoint)
+        else:
+            self.browser = await self.playwright.chromium.launch(headless=True, ignore_default_args=IGNORE_DEFAULT_ARGS)
+        await self._warm()
+
+    async def _new_lease(self, proxy: Optional[str] = None, storage_state: Optional[Dict] = None) -> ContextLease:
+        context_args = {}
+        if proxy:
+            context_args["proxy"] = {"server": proxy}
+        if storage_state:
+            context_args["storage_state"] = storage_state
+        context = await self.browser.new_context(**context_args)
+        page = await context.new_page()
+        cdp = await apply_stealth(page)
+        self.stats['created'] += 1
+        return ContextLease(context, page, cdp, proxy)
+
+    async def _warm(self):
+        """Top the pool of blank (proxy-less, logged-out) contexts back up to `size`."""
+        while len(self._blank) < self.size:
+            self._blank.append(await self._new_lease())
+
+    async def acquire(self, key: str, proxy: Optional[str] = None, storage_state: Optional[Dict] = None) -> ContextLease:
+        """
+        Lease a context for `key` (account and proxy). Reuses an idle context of the same key,
+        else takes a pre-warmed blank one when no proxy is needed, else creates a new one.
+        A blank context gets the cookies and localStorage of `storage_state`, like a new one.
+        """
+        idle = self._idle.get(key)
+        if idle:
+            lease = idle.pop()
+            self.stats['reused'] += 1
+        elif not proxy and self._blank:
+            lease = self._blank.pop()
+            if storage_state and storage_state.get('cookies'):
+                await lease.context.add_cookies(storage_state['cookies'])
+            if storage_state and storage_state.get('origins'):
+                await restore_origins(lease.page, storage_state['origins'])
+            self.stats['warm_hits'] += 1
+            if self._warming is None or self._warming.done():
+                self._warming = asyncio.create_task(self._warm())
+        else:
+            lease = await self._new_lease(proxy, storage_state)
+        lease.key = key
+        return lease
+
+    async def release(self, lease: ContextLease, discard: bool = False):
+        """Return a lease; it is closed instead when it has hit its use or memory limit, or with `discard`."""
+        lease.uses += 1
+        if discard:
+            self.stats['recycled'] += 1
+            await self._close_lease(lease)
+            return
+        try:
+            heap_mb = await lease.heap_mb()
+        except Exception:
+            heap_mb = None
+        if heap_mb is None or lease.uses >= self.max_uses or heap_mb >= self.max_heap_mb:
+            self.stats['recycled'] += 1
+            await self._close_lease(lease)
+            return
+        self._idle.setdefault(lease.key, []).append(lease)
+
+    async def _close_lease(self, lease: ContextLease):
+        try:
+            await lease.context.close()
+        except Exception as e:
+            print(f"Failed to close context: {e}")
+
+    async def close(self):
+        if self._warming:
+            await asyncio.gather(self._warming, return_exceptions=True)
+        leases = self._blank + [lease for idle in self._idle.values() for lease in idle]
+        self._blank, self._idle = [], {}
+        for lease in leases:
+            await self._close_lease(lease)
+        if self.browser:
+            # For a connected browser this only disconnects; the shared process keeps running.
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+
+async def serve(port: int = 9222, host: str = '127.0.0.1'):
+    """Run a long-lived headless Chromium that BrowserPool can attach to over CDP."""
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(
+            headless=True,
+            ignore_default_args=IGNORE_DEFAULT_ARGS,
+            args=[f'--remote-debugging-port={port}', f'--remote-debugging-address={host}']
+        )
+        print(f"Browser ready, set BROWSER_ENDPOINT=http://{host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await browser.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a warm Chromium for BrowserPool clients.")
+    parser.add_argument('--port', type=int, default=9222)
+    parser.add_argument('--host', default='127.0.0.1')
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.host))
@@ -0,0 +1,274 @@
+"""
+Long-running engagement daemon for one account.
+
+main.py launches a browser, logs in and sets up the DB on every run, then acts once. The
+daemon does all of that once and keeps the client and DB engine for its whole life. It
+alternates two kinds of work:
+
+- planning cycles, every `interval` seconds give or take `jitter`, which scrape and rank the
+  feed and queue the best tweets (replies generated up front) at spread-out due times;
+- queued actions, run when due and when the account's RateBudget allows.
+
+In between, the page is parked on about:blank and the daemon sleeps until the next thing is
+due. The queue lives in the database (scheduled_actions), so a restart resumes it.
+
+    poetry run python -m twitter_bot.daemon
+"""
+import asyncio
+import os
+import random
+import signal
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from twitter_bot.ai_reply import AsyncReplyGenerator, generate_ai_reply
+from twitter_bot.db import TwitterDBLogger
+from twitter_bot.memory_governor import governor_from_env
+from twitter_bot.metrics import METRICS
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+from twitter_bot.proxy_pool import ProxyPool
+from twitter_bot.rate_budget import RateBudget, budget_from_env
+from twitter_bot.reply_cache import ActedIndex, ReplyCache
+from twitter_bot.resource_policy import policy_from_env
+from twitter_bot.runner import record_engagement, repost_and_reply
+from twitter_bot.selector_resolver import SelectorResolver
+from twitter_bot.session_cache import SessionCache
+from twitter_bot.tweet_analyzer import select_top_viral
+from twitter_bot.work_queue import ActionQueue
+
+# Actions run on every queued tweet; each one costs a token of the budget.
+ACTIONS = ('repost', 'reply')
+
+
+class EngagementDaemon:
+    """
+    Plans and runs engagements for the logged-in `twitter` client until stopped. Each planning
+    cycle queues at most `per_cycle` tweets out of `feed_size` scraped (fewer when the budget
+    is low), spaced `action_gap` seconds apart, scaled like the client's human-like delays.
+    Pending items overdue by more than `max_overdue` seconds are dropped.
+    """
+    def __init__(
+        self,
+        twitter,
+        db_logger: TwitterDBLogger,
+        queue: ActionQueue,
+        budget: RateBudget,
+        reply_generator: Optional[AsyncReplyGenerator] = None,
+        interval: float = 1800.0,
+        jitter: float = 0.3,
+        per_cycle: int = 3,
+        feed_size: int = 40,
+        action_gap: Tuple[float, float] = (30.0, 120.0),
+        max_overdue: float = 6 * 3600
+    ):
+        self.twitter = twitter
+        self.db_logger = db_logger
+        self.queue = queue
+        self.budget = budget
+        self.reply_generator = reply_generator
+        self.interval = interval
+        self.jitter = jitter
+        self.per_cycle = per_cycle
+        self.feed_size = feed_size
+        self.action_gap = action_gap
+        self.max_overdue = max_overdue
+        self.account = twitter.username
+        self.next_cycle = 0.0
+        self.stats = {'cycles': 0, 'planned': 0, 'engaged': 0, 'failed': 0, 'budget_waits': 0, 'action_seconds': 0.0}
+
+    async def _db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Work until `stop` is set; the item in progress is finished first."""
+        stop = stop or asyncio.Event()
+        abandoned = await self._db(self.queue.abandon, self.account)
+        expired = await self._db(self.queue.expire, self.account, self.max_overdue)
+        pending = await self._db(self.queue.pending_count, self.account)
+        print(f"[{self.account}] Daemon started: {pending} queued, {abandoned} interrupted, {expired} expired; "
+              f"budget {self.budget.report()}")
+        while not stop.is_set():
+            delay = await self.step()
+            if delay <= 0:
+                continue
+            await self.twitter.park()
+            with METRICS.idle():
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def step(self) -> float:
+        """Run whatever is due now; returns the seconds until something else will be (0: go on)."""
+        now = time.time()
+        item = await self._db(self.queue.next_pending, self.account)
+        if item:
+            due_in = item['due_at'].timestamp() - now
+            budget_wait = self.budget.wait_seconds(len(ACTIONS))
+            if due_in <= 0 and budget_wait <= 0:
+                await self.execute(item)
+                return 0.0
+            if budget_wait > due_in:
+                self.stats['budget_waits'] += 1
+            return max(due_in, budget_wait)
+        if now < self.next_cycle:
+            return self.next_cycle - now
+        budget_wait = self.budget.wait_seconds(len(ACTIONS))
+        if budget_wait > 0:
+            self.stats['budget_waits'] += 1
+            return budget_wait
+        try:
+            await self.plan()
+        except Exception as e:
+            print(f"[{self.account}] Planning cycle failed: {e}")
+        self.next_cycle = time.time() + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return 0.0
+
+    async def plan(self) -> int:
+        """Scrape and rank the feed and queue the best fresh tweets; returns how many were queued."""
+        self.stats['cycles'] += 1
+        with METRICS.span('daemon_plan'):
+            await self._db(self.queue.expire, self.account, self.max_overdue)
+            acted = await self._db(ActedIndex.load, self.db_logger, self.account)
+            queued = await self._db(self.queue.queued_tweet_ids, self.account)
+            tweets = acted.filter(await self._scrape())
+            fresh = [tweet for tweet in tweets if (tweet.get('tweet_id') or tweet['url']) not in queued]
+            slots = min(self.per_cycle, self.budget.available() // len(ACTIONS))
+            best = select_top_viral(fresh, slots) if slots > 0 else []
+            replies = await self._replies(best)
+            due, planned = time.time(), []
+            for tweet, reply in zip(best, replies):
+                due += random.uniform(*self.action_gap) * self.twitter.delay_scale
+                planned.append({
+                    'tweet': tweet,
+                    'reply': reply if reply and "AI error" not in reply else None,
+                    'due_at': datetime.fromtimestamp(due, timezone.utc)
+                })
+            await self._db(self.queue.enqueue, self.account, planned)
+        self.stats['planned'] += len(planned)
+        print(f"[{self.account}] Cycle {self.stats['cycles']}: {len(tweets)} fresh tweets, queued {len(planned)}")
+        return len(planned)
+
+    async def _scrape(self) -> List[Dict]:
+        """Feed tweets; an empty or failing feed gets one retry after re-checking the session."""
+        try:
+            tweets = await self.twitter.scrape_feed(count=self.feed_size)
+        except Exception as e:
+            print(f"[{self.account}] Feed failed: {e}")
+            tweets = []
+        if not tweets and await self.twitter.refresh_session():
+            tweets = await self.twitter.scrape_feed(count=self.feed_size)
+        return tweets
+
+    async def _replies(self, tweets: List[Dict]) -> List[str]:
+        if not tweets:
+            return []
+        if self.reply_generator:
+            if len(tweets) == 1:
+                return [await self.reply_generator.generate(tweets[0]['content'], tweets[0]['author'], tweets[0].get('tweet_id'))]
+            return await self.reply_generator.generate_batch(tweets)
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(
+            loop.run_in_executor(None, generate_ai_reply, tweet['content'], tweet['author']) for tweet in tweets
+        ))
+
+    async def execute(self, item: Dict) -> bool:
+        """Repost and reply to one queued tweet, spend the budget for what succeeded and log it."""
+        if not await self._db(self.queue.start, item['id']):
+            return False
+        tweet = item['tweet']
+        reply = item['reply']
+        if reply is None:
+            # Not generated at planning time (or it failed then): generate now, during the repost.
+            if self.reply_generator:
+                reply = self.reply_generator.generate(tweet['content'], tweet['author'], tweet.get('tweet_id'))
+            else:
+                reply = asyncio.get_running_loop().run_in_executor(None, generate_ai_reply, tweet['content'], tweet['author'])
+        start = time.monotonic()
+        ai_reply, actions, error = None, [], None
+        try:
+            with METRICS.span('daemon_action'):
+                ai_reply, actions = await repost_and_reply(self.twitter, tweet, reply, self.reply_generator)
+        except Exception as e:
+            error = str(e)
+        self.stats['action_seconds'] += time.monotonic() - start
+        succeeded = sum(action['success'] for action in actions)
+        if succeeded:
+            self.budget.spend(succeeded)
+            await self._db(record_engagement, self.db_logger, tweet, actions, ai_reply, self.account)
+            self.stats['engaged'] += 1
+        else:
+            error = error or (actions[0]['error'] if actions else 'no action ran')
+            self.stats['failed'] += 1
+        await self._db(self.queue.complete, item['id'], None if succeeded else error)
+        return bool(succeeded)
+
+
+async def main():
+    username = os.getenv('TWITTER_USERNAME')
+    password = os.getenv('TWITTER_PASSWORD')
+    db_url = os.getenv('DATABASE_URL')
+    proxies = os.getenv('PROXIES')
+    proxy_list = [p.strip() for p in proxies.split(',')] if proxies else []
+    if not username or not password or not db_url:
+        print("Error: Please set TWITTER_USERNAME, TWITTER_PASSWORD, and DATABASE_URL environment variables.")
+        sys.exit(1)
+
+    METRICS.configure_from_env()
+    db_logger = TwitterDBLogger(db_url)
+    session_cache = SessionCache(os.getenv('SESSION_CACHE_DIR', '.session_cache'))
+    proxy_pool = None
+    if proxy_list:
+        proxy_pool = ProxyPool(proxy_list, state_path=os.path.join(session_cache.cache_dir, 'proxies.json'))
+        await proxy_pool.probe_all()
+    try:
+        budget = budget_from_env(username, session_cache.cache_dir, min_allowance=len(ACTIONS))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # SIGINT/SIGTERM stop the daemon after the action in progress; queued items stay for the next start.
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with AsyncReplyGenerator(cache=ReplyCache(db_logger)) as reply_generator, PlaywrightTwitterClient(
+        username,
+        password,
+        proxies=proxy_list,
+        session_cache=session_cache,
+        browser_endpoint=os.getenv('BROWSER_ENDPOINT'),
+        selectors=SelectorResolver(os.path.join(session_cache.cache_dir, 'selectors.json')),
+        proxy_pool=proxy_pool,
+        resource_policy=policy_from_env(session_cache.cache_dir),
+        memory_governor=governor_from_env(),
+        base_url=os.getenv('TWITTER_BASE_URL', 'https://twitter.com')
+    ) as twitter:
+        await twitter.ensure_logged_in()
+        daemon = EngagementDaemon(
+            twitter,
+            db_logger,
+            ActionQueue(db_logger),
+            budget,
+            reply_generator=reply_generator,
+            interval=float(os.getenv('DAEMON_INTERVAL', '1800')),
+            jitter=float(os.getenv('DAEMON_JITTER', '0.3')),
+            per_cycle=int(os.getenv('DAEMON_ACTIONS_PER_CYCLE', '3'))
+        )
+        await daemon.run(stop)
+    s = daemon.stats
+    ran = s['engaged'] + s['failed']
+    print(f"Daemon stopped: {s['cycles']} cycles, {s['engaged']} engaged, {s['failed']} failed, "
+          f"{s['action_seconds'] / ran if ran else 0.0:.1f}s per queued tweet; budget {budget.report()}")
+    if METRICS.enabled:
+        print(METRICS.report())
+        METRICS.close()
+    db_logger.close()
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    asyncio.run(main())
@@ -1,10 +1,16 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, TIMESTAMP, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy import create_engine, func, select, update, Column, Index, Integer, String, Text, TIMESTAMP, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, Iterator, List
+from twitter_bot.metrics import METRICS
 
 Base = declarative_base()
 
+# JSON documents are stored as JSONB on PostgreSQL (as in schema.sql), so they can be GIN-indexed.
+JSONDocument = JSON().with_variant(postgresql.JSONB(), 'postgresql')
+
 class TwitterUser(Base):
     __tablename__ = 'twitter_users'
     id = Column(Integer, primary_key=True)
@@ -21,7 +27,7 @@ class Tweet(Base):
     author_id = Column(Integer, ForeignKey('twitter_users.id'))
     content = Column(Text, nullable=False)
     created_at = Column(TIMESTAMP)
-    tweet_metadata = Column("metadata", JSON)
+    tweet_metadata = Column("metadata", JSONDocument)
     author = relationship('TwitterUser', back_populates='tweets')
     actions = relationship('TweetAction', back_populates='tweet')
 
@@ -36,6 +42,12 @@ class TwitterSession(Base):
 
 class TweetAction(Base):
     __tablename__ = 'tweet_actions'
+    __table_args__ = (
+        Index('ix_tweet_actions_type_timestamp', 'action_type', 'action_timestamp'),
+        Index('ix_tweet_actions_timestamp', 'action_timestamp'),
+        Index('ix_tweet_actions_tweet_id', 'tweet_id'),
+        Index('idx_actions_session_id', 'session_id'),  # named as in schema.sql
+    )
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey('twitter_sessions.id'))
     tweet_id = Column(Integer, ForeignKey('tweets.id'))
@@ -45,57 +57,293 @@ class TweetAction(Base):
     retweets = Column(Integer)
     replies = Column(Integer)
     action_timestamp = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
-    extra = Column(JSON)
+    extra = Column(JSONDocument)  # url and the acting account
     session = relationship('TwitterSession', back_populates='actions')
     tweet = relationship('Tweet', back_populates='actions')
 
+class WorkItem(Base):
+    """One account to run in a sharded launch, claimed by a worker process."""
+    __tablename__ = 'work_items'
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String(36), nullable=False, index=True)
+    account = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default='pending')  # pending, claimed, done, failed
+    claimed_by = Column(String(50))
+    claimed_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
+    error = Column(Text)
+
+class ScheduledAction(Base):
+    """Engagement planned by the daemon for one account, kept until it has run so restarts resume it."""
+    __tablename__ = 'scheduled_actions'
+    __table_args__ = (
+        # Pending items of an account by due time (next_pending, expire) and recent ones (queued_tweet_ids).
+        Index('ix_scheduled_actions_account_status_due', 'account', 'status', 'due_at'),
+    )
+    id = Column(Integer, primary_key=True)
+    account = Column(String(50), nullable=False)
+    tweet_id = Column(String(255), nullable=False)
+    tweet = Column(JSON, nullable=False)  # the scraped tweet dict, created_at as ISO 8601
+    reply = Column(Text)  # generated ahead of time; NULL means generate when the action runs
+    status = Column(String(20), nullable=False, default='pending')  # pending, running, done, failed, expired
+    due_at = Column(TIMESTAMP, nullable=False)
+    created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(TIMESTAMP)
+    error = Column(Text)
+
+class TweetClaim(Base):
+    """Tweet URL taken by one account in a launch, so no other process acts on it."""
+    __tablename__ = 'tweet_claims'
+    __table_args__ = (UniqueConstraint('run_id', 'tweet_url'),)
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String(36), nullable=False)
+    tweet_url = Column(String(255), nullable=False)
+    claimed_by = Column(String(50))
+    claimed_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+
+class ReplyCacheEntry(Base):
+    """Generated reply for a tweet, keyed by tweet_id and a hash of its content."""
+    __tablename__ = 'reply_cache'
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(120), unique=True, nullable=False)
+    reply = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
+
+class ActedTweet(Base):
+    """Tweets an account has already acted on, checked before scoring."""
+    __tablename__ = 'acted_tweets'
+    __table_args__ = (UniqueConstraint('account', 'tweet_id'),)
+    id = Column(Integer, primary_key=True)
+    account = Column(String(50), nullable=False)
+    tweet_id = Column(String(255), nullable=False)
+    acted_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+
+# Rows per multi-row VALUES statement; keeps bound parameters under SQLite's limit.
+BULK_CHUNK_SIZE = 150
+
+
+def chunks(rows: List[Dict], size: int = BULK_CHUNK_SIZE) -> Iterator[List[Dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def scraped_tweet_metadata(tweet: Dict) -> Dict:
+    """Metadata stored alongside a tweet dict returned by scrape_feed."""
+    return {
+        'url': tweet['url'],
+        'likes': tweet['likes'],
+        'retweets': tweet['retweets'],
+        'replies': tweet['replies']
+    }
+
+
+def dialect_insert(dialect: str, table):
+    """
+    Dialect-specific INSERT construct that supports on_conflict_do_update, or None on dialects
+    without ON CONFLICT (e.g. MySQL), where callers fall back to select_then_upsert.
+    """
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    return None
+
+
+def select_then_upsert(conn, table, key: str, rows: List[Dict], refresh: Iterable[str], keep_stored: bool = False) -> Dict:
+    """
+    Portable upsert: look up the rows by their unique `key`, update the `refresh` columns of
+    those that exist (with `keep_stored`, a NULL keeps the stored value) and insert the rest
+    one by one. Returns {key: id}.
+    """
+    key_column = table.c[key]
+    ids = dict(conn.execute(select(key_column, table.c.id).where(key_column.in_([row[key] for row in rows]))).all())
+    for row in rows:
+        if row[key] in ids:
+            values = {column: row[column] for column in refresh if not (keep_stored and row.get(column) is None)}
+            if values:
+                conn.execute(update(table).where(table.c.id == ids[row[key]]).values(**values))
+        else:
+            ids[row[key]] = conn.execute(table.insert().values(**row)).inserted_primary_key[0]
+    return ids
+
+
+def user_upsert_stmt(insert, rows: List[Dict]):
+    """Multi-row user upsert returning (id, twitter_handle); a NULL display_name keeps the stored one."""
+    table = TwitterUser.__table__
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.twitter_handle],
+        set_={'display_name': func.coalesce(stmt.excluded.display_name, table.c.display_name)}
+    ).returning(table.c.id, table.c.twitter_handle)
+
+
+def tweet_upsert_stmt(insert, rows: List[Dict]):
+    """Multi-row tweet upsert returning (id, tweet_id); content and metadata are refreshed."""
+    table = Tweet.__table__
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.tweet_id],
+        set_={'content': stmt.excluded.content, 'metadata': stmt.excluded.metadata}
+    ).returning(table.c.id, table.c.tweet_id)
+
+
+class RunRecorder:
+    """
+    Unit of work bound to one open transaction (see TwitterDBLogger.run).
+    Users and tweets are upserted with INSERT ... ON CONFLICT ... RETURNING in a single
+    round trip each; actions are buffered and inserted together when the run is flushed.
+    """
+    def __init__(self, conn, insert):
+        self.conn = conn
+        self._insert = insert
+        self._pending_actions: List[Dict] = []
+
+    def upsert_user(self, twitter_handle: str, display_name: Optional[str] = None) -> int:
+        return self.upsert_users([twitter_handle], {twitter_handle: display_name})[twitter_handle]
+
+    def upsert_users(self, twitter_handles: Iterable[str], display_names: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, int]:
+        """Upsert many users with multi-row VALUES; returns {twitter_handle: id}."""
+        display_names = display_names or {}
+        rows = [
+            {'twitter_handle': handle, 'display_name': display_names.get(handle)}
+            for handle in dict.fromkeys(twitter_handles)
+        ]
+        if self._insert(TwitterUser.__table__) is None:
+            return select_then_upsert(self.conn, TwitterUser.__table__, 'twitter_handle', rows, ['display_name'], keep_stored=True)
+        ids = {}
+        for chunk in chunks(rows):
+            for row_id, handle in self.conn.execute(user_upsert_stmt(self._insert, chunk)):
+                ids[handle] = row_id
+        return ids
+
+    def upsert_tweet(self, tweet_id: str, author_id: int, content: str, created_at: Optional[datetime] = None, metadata: Optional[Dict] = None) -> int:
+        row = {'tweet_id': tweet_id, 'author_id': author_id, 'content': content, 'created_at': created_at, 'metadata': metadata}
+        return self.upsert_tweets([row])[tweet_id]
+
+    def upsert_tweets(self, rows: List[Dict]) -> Dict[str, int]:
+        """
+        Upsert many tweets with multi-row VALUES; returns {tweet_id: id}.
+        Each row has tweet_id, author_id, content, created_at and metadata keys.
+        """
+        rows = list({row['tweet_id']: row for row in rows}.values())
+        if self._insert(Tweet.__table__) is None:
+            return select_then_upsert(self.conn, Tweet.__table__, 'tweet_id', rows, ['content', 'metadata'])
+        ids = {}
+        for chunk in chunks(rows):
+            for row_id, tweet_id in self.conn.execute(tweet_upsert_stmt(self._insert, chunk)):
+                ids[tweet_id] = row_id
+        return ids
+
+    def upsert_scraped(self, tweets: List[Dict]) -> Dict[str, int]:
+        """Upsert the authors and tweets of a scrape_feed result; returns {tweet_id: id}."""
+        user_ids = self.upsert_users(t['author'] for t in tweets)
+        return self.upsert_tweets([
+            {
+                'tweet_id': t.get('tweet_id') or t['url'],
+                'author_id': user_ids[t['author']],
+                'content': t['content'],
+                'created_at': t.get('created_at'),
+                'metadata': scraped_tweet_metadata(t)
+            }
+            for t in tweets
+        ])
+
+    def create_session(self, user_id: int, session_timestamp: datetime) -> int:
+        table = TwitterSession.__table__
+        stmt = table.insert().values(user_id=user_id, session_timestamp=session_timestamp)
+        return self.conn.execute(stmt).inserted_primary_key[0]
+
+    def log_action(
+        self,
+        session_id: int,
+        tweet_db_id: int,
+        action_type: str,
+        ai_reply: Optional[str] = None,
+        likes: Optional[int] = None,
+        retweets: Optional[int] = None,
+        replies: Optional[int] = None,
+        extra: Optional[Dict] = None
+    ) -> None:
+        self._pending_actions.append({
+            'session_id': session_id,
+            'tweet_id': tweet_db_id,
+            'action_type': action_type,
+            'ai_reply': ai_reply,
+            'likes': likes,
+            'retweets': retweets,
+            'replies': replies,
+            'extra': extra
+        })
+
+    def mark_acted(self, account: str, tweet_ids: Iterable[str]) -> None:
+        """Add tweets to the account's already-acted index (existing entries are kept)."""
+        table = ActedTweet.__table__
+        rows = [{'account': account, 'tweet_id': tweet_id} for tweet_id in dict.fromkeys(tweet_ids)]
+        if rows and self._insert(table) is None:
+            stored = set(self.conn.execute(select(table.c.tweet_id).where(
+                table.c.account == account, table.c.tweet_id.in_([row['tweet_id'] for row in rows])
+            )).scalars())
+            rows = [row for row in rows if row['tweet_id'] not in stored]
+            if rows:
+                self.conn.execute(table.insert(), rows)
+            return
+        for chunk in chunks(rows):
+            stmt = self._insert(table).values(chunk).on_conflict_do_nothing(
+                index_elements=[table.c.account, table.c.tweet_id]
+            )
+            self.conn.execute(stmt)
+
+    def flush(self) -> None:
+        """Insert all buffered actions with one executemany."""
+        if self._pending_actions:
+            self.conn.execute(TweetAction.__table__.insert(), self._pending_actions)
+            self._pending_actions = []
+
+
 class TwitterDBLogger:
     """
     Handles logging of session and operation data to PostgreSQL using SQLAlchemy ORM.
+    Upserts use INSERT ... ON CONFLICT ... RETURNING on PostgreSQL and SQLite, and
+    select-then-insert on other databases.
     """
     def __init__(self, db_url: str):
         self.engine = create_engine(db_url)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
 
+    def _insert(self, table):
+        return dialect_insert(self.engine.dialect.name, table)
+
+    @contextmanager
+    def run(self) -> Iterator[RunRecorder]:
+        """Record a whole bot run in one transaction, committed when the block exits."""
+        with METRICS.span('db', op='run'), self.engine.begin() as conn:
+            recorder = RunRecorder(conn, self._insert)
+            yield recorder
+            recorder.flush()
+
+    @METRICS.timed('db', op='upsert_user')
     def upsert_user(self, twitter_handle: str, display_name: Optional[str] = None) -> int:
-        session = self.Session()
-        user = session.query(TwitterUser).filter_by(twitter_handle=twitter_handle).first()
-        if not user:
-            user = TwitterUser(twitter_handle=twitter_handle, display_name=display_name)
-            session.add(user)
-            session.commit()
-        elif display_name and user.display_name != display_name:
-            user.display_name = display_name
-            session.commit()
-        user_id = user.id
-        session.close()
-        return user_id
+        with self.run() as run:
+            return run.upsert_user(twitter_handle, display_name)
 
+    @METRICS.timed('db', op='upsert_tweet')
     def upsert_tweet(self, tweet_id: str, author_id: int, content: str, created_at: Optional[datetime] = None, metadata: Optional[Dict] = None) -> int:
-        session = self.Session()
-        tweet = session.query(Tweet).filter_by(tweet_id=tweet_id).first()
-        if not tweet:
-            tweet = Tweet(tweet_id=tweet_id, author_id=author_id, content=content, created_at=created_at, tweet_metadata=metadata)
-            session.add(tweet)
-            session.commit()
-        else:
-            tweet.content = content
-            tweet.tweet_metadata = metadata
-            session.commit()
-        tweet_db_id = tweet.id
-        session.close()
-        return tweet_db_id
+        with self.run() as run:
+            return run.upsert_tweet(tweet_id, author_id, content, created_at, metadata)
+
+    @METRICS.timed('db', op='upsert_scraped')
+    def upsert_scraped(self, tweets: List[Dict]) -> Dict[str, int]:
+        with self.run() as run:
+            return run.upsert_scraped(tweets)
 
+    @METRICS.timed('db', op='create_session')
     def create_session(self, user_id: int, session_timestamp: datetime) -> int:
-        session = self.Session()
-        sess = TwitterSession(user_id=user_id, session_timestamp=session_timestamp)
-        session.add(sess)
-        session.commit()
-        session_id = sess.id
-        session.close()
-        return session_id
+        with self.run() as run:
+            return run.create_session(user_id, session_timestamp)
 
+    @METRICS.timed('db', op='log_action')
     def log_action(
         self,
         session_id: int,
@@ -107,20 +355,8 @@ class TwitterDBLogger:
         replies: Optional[int] = None,
         extra: Optional[Dict] = None
     ) -> None:
-        session = self.Session()
-        action = TweetAction(
-            session_id=session_id,
-            tweet_id=tweet_db_id,
-            action_type=action_type,
-            ai_reply=ai_reply,
-            likes=likes,
-            retweets=retweets,
-            replies=replies,
-            extra=extra
-        )
-        session.add(action)
-        session.commit()
-        session.close()
+        with self.run() as run:
+            run.log_action(session_id, tweet_db_id, action_type, ai_reply, likes, retweets, replies, extra)
 
     def close(self):
-        self.engine.dispose() 
\ No newline at end of file
+        self.engine.dispose()
@@ -0,0 +1,91 @@
+"""
+Memory ceilings for long scrolling sessions.
+
+Hours of scrolling the home timeline grow the page's JS heap and DOM without bound. The
+MemoryGovernor samples both through CDP every few scroll steps (Runtime.getHeapUsage and
+Memory.getDOMCounters) and tells iter_feed when a ceiling is crossed, so the client can swap
+in a fresh page (or context) and carry on with the same set of seen tweet IDs.
+"""
+import os
+import weakref
+from typing import Dict, NamedTuple, Optional
+
+
+class MemoryLimits(NamedTuple):
+    max_heap_mb: float = 384.0      # used JS heap of the page
+    max_dom_nodes: int = 30000      # live DOM nodes of the page
+    check_every: int = 5            # scroll steps between samples
+    recycle: str = 'page'           # 'page', or 'context' to also drop caches and workers (closes open_tab() tabs)
+
+
+class MemoryGovernor:
+    """
+    Samples a page's JS heap and DOM node count and decides when to recycle it. CDP sessions
+    are opened lazily, one per page; a page that cannot be sampled (e.g. on a browser without
+    CDP) is left ungoverned, while the other pages sharing the governor keep being sampled.
+    `stats` keeps the sample count, peaks and number of recycles over the governor's lifetime.
+    """
+    def __init__(self, limits: MemoryLimits = MemoryLimits()):
+        self.limits = limits
+        self.enabled = True
+        self._sessions = weakref.WeakKeyDictionary()
+        self._unavailable = weakref.WeakSet()  # pages whose sampling failed
+        self.stats = {'samples': 0, 'peak_heap_mb': 0.0, 'peak_dom_nodes': 0, 'recycles': 0, 'last': None}
+
+    async def sample(self, page) -> Optional[Dict]:
+        """{'heap_mb', 'dom_nodes'} of `page`, or None if it cannot be measured."""
+        if not self.enabled or page in self._unavailable:
+            return None
+        try:
+            cdp = self._sessions.get(page)
+            if cdp is None:
+                cdp = self._sessions[page] = await page.context.new_cdp_session(page)
+            heap = await cdp.send('Runtime.getHeapUsage')
+            counters = await cdp.send('Memory.getDOMCounters')
+        except Exception as e:
+            print(f"Memory sampling unavailable, not governing this page: {e}")
+            self._unavailable.add(page)
+            self._sessions.pop(page, None)
+            return None
+        sample = {'heap_mb': heap['usedSize'] / (1024 * 1024), 'dom_nodes': counters['nodes']}
+        self.stats['samples'] += 1
+        self.stats['peak_heap_mb'] = max(self.stats['peak_heap_mb'], sample['heap_mb'])
+        self.stats['peak_dom_nodes'] = max(self.stats['peak_dom_nodes'], sample['dom_nodes'])
+        self.stats['last'] = sample
+        return sample
+
+    def due(self, step: int) -> bool:
+        return self.enabled and step > 0 and step % self.limits.check_every == 0
+
+    async def over_limit(self, page) -> Optional[Dict]:
+        """The sample that crossed a ceiling, or None while the page is within limits."""
+        sample = await self.sample(page)
+        if sample and (sample['heap_mb'] >= self.limits.max_heap_mb or sample['dom_nodes'] >= self.limits.max_dom_nodes):
+            return sample
+        return None
+
+    def forget(self, page) -> None:
+        """Drop the CDP session of a page that is about to close."""
+        self._sessions.pop(page, None)
+        self._unavailable.discard(page)
+
+
+def governor_from_env() -> Optional[MemoryGovernor]:
+    """
+    MemoryGovernor configured by PAGE_HEAP_LIMIT_MB (default 384), PAGE_DOM_NODE_LIMIT
+    (default 30000) and PAGE_RECYCLE ('page' or 'context'); None when both limits are 0.
+    """
+    defaults = MemoryLimits()
+    limits = MemoryLimits(
+        max_heap_mb=float(os.getenv('PAGE_HEAP_LIMIT_MB', defaults.max_heap_mb)),
+        max_dom_nodes=int(os.getenv('PAGE_DOM_NODE_LIMIT', defaults.max_dom_nodes)),
+        recycle=os.getenv('PAGE_RECYCLE', defaults.recycle)
+    )
+    if limits.max_heap_mb <= 0 and limits.max_dom_nodes <= 0:
+        return None
+    # A single 0 switches that ceiling off.
+    limits = limits._replace(
+        max_heap_mb=limits.max_heap_mb if limits.max_heap_mb > 0 else float('inf'),
+        max_dom_nodes=limits.max_dom_nodes if limits.max_dom_nodes > 0 else float('inf')
+    )
+    return MemoryGovernor(limits)
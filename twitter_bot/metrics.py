@@ -0,0 +1,329 @@
+"""
+Stage timing and counters for a bot run.
+
+Instrumented code opens spans (`with METRICS.span('login'):`, or `@METRICS.timed('db', op=...)`
+on a function) and bumps counters (`METRICS.count('screenshots')`). Intentional human-like
+waits run inside `METRICS.idle()`, which charges their duration to every open span, so each
+stage reports real work and idle time separately. A span's idle time is the union of the idle
+blocks inside it: concurrent tasks sharing a parent span that wait at the same time count
+once. While METRICS is disabled (the default) span() and idle() hand back a shared no-op
+object and nothing is recorded.
+
+Enabled, every finished span is aggregated into a Prometheus-style histogram and optionally
+appended to a JSON lines file; serve() exposes the aggregates as Prometheus text on
+/metrics (and as JSON on /metrics.json).
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds.
+BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current: contextvars.ContextVar = contextvars.ContextVar('metrics_span', default=None)
+
+
+class _Noop:
+    """What span() and idle() return while metrics are disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'labels', 'start', 'idle', 'idling', 'idle_since', 'parent', 'token')
+
+    def __init__(self, metrics: 'Metrics', name: str, labels: Tuple):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.idle = 0.0
+        self.idling = 0  # idle blocks currently open inside this span
+        self.idle_since = 0.0
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self.token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        seconds = end - self.start
+        try:
+            _current.reset(self.token)
+        except ValueError:
+            # Exited in another context than it was entered in (e.g. across tasks).
+            _current.set(self.parent)
+        idle = self.idle + (end - self.idle_since if self.idling else 0.0)
+        self.metrics._observe(self.name, self.labels, seconds, min(idle, seconds), exc_type is None)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class _Idle:
+    __slots__ = ('metrics', 'start', 'spans')
+
+    def __init__(self, metrics: 'Metrics'):
+        self.metrics = metrics
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+        span = _current.get()
+        while span is not None:
+            if not span.idling:
+                span.idle_since = self.start
+            span.idling += 1
+            self.spans.append(span)
+            span = span.parent
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        seconds = end - self.start
+        # A span is idle while any idle block inside it is open, so overlapping blocks count once.
+        for span in self.spans:
+            span.idling -= 1
+            if not span.idling:
+                span.idle += end - span.idle_since
+        self.metrics._observe('human_delay', (), seconds, seconds, True)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    """
+    Span and counter registry. Disabled until enable() is called. Thread-safe, so spans may
+    finish in executor threads (DB writes, the sync OpenAI client).
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._spans: Dict[Tuple[str, Tuple], Dict] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._jsonl = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def enable(self, jsonl_path: Optional[str] = None) -> None:
+        """Start recording; with `jsonl_path`, also append every finished span to that file."""
+        if jsonl_path and self._jsonl is None:
+            self._jsonl = open(jsonl_path, 'a', buffering=1)
+        self.enabled = True
+
+    def configure_from_env(self, instance: Optional[int] = None) -> bool:
+        """
+        Enable from METRICS_FILE (JSON lines path) and/or METRICS_PORT (Prometheus endpoint).
+        Processes sharing the environment pass an `instance` number, which is added to the port
+        and inserted into the file name (metrics.jsonl -> metrics.2.jsonl).
+        """
+        path, port = os.getenv('METRICS_FILE'), os.getenv('METRICS_PORT')
+        if not path and not port:
+            return False
+        if path and instance is not None:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{instance}{ext}"
+        self.enable(path)
+        if port:
+            self.serve(int(port) + (instance or 0))
+        return True
+
+    def reset(self) -> None:
+        """Drop all recorded spans and counters (e.g. between benchmark runs in one process)."""
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def span(self, name: str, **labels):
+        """Context manager (sync or async) timing one stage."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, _label_key(labels))
+
+    def idle(self):
+        """Context manager around an intentional wait; its time counts as idle for all open spans."""
+        if not self.enabled:
+            return _NOOP
+        return _Idle(self)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def timed(self, name: str, **labels):
+        """Decorator: run every call of a sync or async function inside span(name, **labels)."""
+        def decorate(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    with self.span(name, **labels):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.span(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _observe(self, name: str, labels: Tuple, seconds: float, idle: float, ok: bool) -> None:
+        key = (name, labels)
+        with self._lock:
+            agg = self._spans.get(key)
+            if agg is None:
+                # One slot per bucket plus +Inf, not cumulative; render_prometheus() adds them up.
+                agg = self._spans[key] = {'count': 0, 'sum': 0.0, 'idle': 0.0, 'errors': 0, 'buckets': [0] * (len(BUCKETS) + 1)}
+            agg['count'] += 1
+            agg['sum'] += seconds
+            agg['idle'] += idle
+            agg['errors'] += not ok
+            agg['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+            if self._jsonl:
+                self._jsonl.write(json.dumps({
+                    'ts': time.time(), 'span': name, 'labels': dict(labels), 'seconds': round(seconds, 6),
+                    'idle_seconds': round(idle, 6), 'ok': ok
+                }) + '\n')
+
+    def summary(self) -> List[Dict]:
+        """One row per span name and labels, slowest total first, with work = total - idle."""
+        with self._lock:
+            rows = [
+                {'span': name, 'labels': dict(labels), 'count': agg['count'], 'seconds': agg['sum'],
+                 'idle_seconds': agg['idle'], 'work_seconds': agg['sum'] - agg['idle'], 'errors': agg['errors']}
+                for (name, labels), agg in self._spans.items()
+            ]
+            counters = [{'counter': name, 'labels': dict(labels), 'value': value} for (name, labels), value in self._counters.items()]
+        return sorted(rows, key=lambda row: -row['seconds']) + counters
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# HELP twitter_bot_span_seconds Wall time of instrumented stages.',
+            '# TYPE twitter_bot_span_seconds histogram'
+        ]
+        with self._lock:
+            spans = sorted(self._spans.items())
+            counters = sorted(self._counters.items())
+        for (name, labels), agg in spans:
+            pairs = (('span', name),) + labels
+            cumulative = 0
+            for bound, n in zip(BUCKETS, agg['buckets']):
+                cumulative += n
+                lines.append(f"twitter_bot_span_seconds_bucket{_format_labels(pairs + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"twitter_bot_span_seconds_bucket{_format_labels(pairs + (('le', '+Inf'),))} {agg['count']}")
+            lines.append(f"twitter_bot_span_seconds_sum{_format_labels(pairs)} {agg['sum']:.6f}")
+            lines.append(f"twitter_bot_span_seconds_count{_format_labels(pairs)} {agg['count']}")
+        lines += ['# HELP twitter_bot_span_idle_seconds_total Part of span time spent in intentional human-like waits.',
+                  '# TYPE twitter_bot_span_idle_seconds_total counter']
+        lines += [f"twitter_bot_span_idle_seconds_total{_format_labels((('span', name),) + labels)} {agg['idle']:.6f}"
+                  for (name, labels), agg in spans]
+        lines += ['# HELP twitter_bot_span_errors_total Spans that ended with an exception.',
+                  '# TYPE twitter_bot_span_errors_total counter']
+        lines += [f"twitter_bot_span_errors_total{_format_labels((('span', name),) + labels)} {agg['errors']}"
+                  for (name, labels), agg in spans]
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE twitter_bot_{name}_total counter')
+            lines.append(f"twitter_bot_{name}_total{_format_labels(labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def report(self) -> str:
+        """Per-stage table: calls, total, idle (human delays) and work seconds."""
+        rows = [row for row in self.summary() if 'span' in row]
+        lines = [f"{'stage':<28} {'calls':>6} {'total s':>9} {'idle s':>8} {'work s':>8}"]
+        for row in rows:
+            label = row['span'] + ''.join(f" {key}={value}" for key, value in sorted(row['labels'].items()))
+            lines.append(f"{label:<28} {row['count']:>6} {row['seconds']:>9.2f} {row['idle_seconds']:>8.2f} {row['work_seconds']:>8.2f}")
+        return '\n'.join(lines)
+
+    def serve(self, port: int = 9464, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Expose /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body, content_type = json.dumps(metrics.summary()).encode(), 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body, content_type = metrics.render_prometheus().encode(), 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+
+
+# Process-wide registry used by all instrumented modules.
+METRICS = Metrics()
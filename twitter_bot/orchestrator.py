@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from twitter_bot.ai_reply import AsyncReplyGenerator
+from twitter_bot.browser_pool import BrowserPool
+from twitter_bot.db import TwitterDBLogger
+from twitter_bot.memory_governor import MemoryGovernor, governor_from_env
+from twitter_bot.metrics import METRICS
+from twitter_bot.playwright_client import PlaywrightTwitterClient
+from twitter_bot.proxy_pool import ProxyPool
+from twitter_bot.resource_policy import ResourcePolicy, policy_from_env
+from twitter_bot.runner import TweetClaims, engage_best_tweet
+from twitter_bot.reply_cache import ReplyCache
+from twitter_bot.selector_resolver import SelectorResolver
+from twitter_bot.session_cache import SessionCache
+
+
+def load_roster(path: str) -> List[Dict]:
+    """
+    Load accounts from a JSON list such as
+    [{"username": "...", "password": "...", "proxies": ["http://host:port"]}, ...].
+    A single "proxy" string is accepted in place of "proxies".
+    """
+    with open(path) as f:
+        accounts = json.load(f)
+    roster = []
+    for account in accounts:
+        if not account.get('username') or not account.get('password'):
+            raise ValueError(f"Roster entry without username/password in {path}")
+        proxies = account.get('proxies') or ([account['proxy']] if account.get('proxy') else [])
+        roster.append({'username': account['username'], 'password': account['password'], 'proxies': proxies})
+    return roster
+
+
+def roster_proxy_pool(roster: List[Dict], cache_dir: str) -> Optional[ProxyPool]:
+    """One ProxyPool over every proxy in the roster (health kept in <cache_dir>/proxies.json), or None."""
+    proxies = [proxy for account in roster for proxy in account['proxies']]
+    return ProxyPool(proxies, state_path=os.path.join(cache_dir, 'proxies.json')) if proxies else None
+
+
+class Orchestrator:
+    """
+    Runs one engagement session per account concurrently on a single event loop.
+    All sessions share one browser with an isolated context per account, at most
+    `concurrency` run at a time, a failure only ends that account's session, and
+    `claims` makes sure no two accounts act on the same tweet URL.
+    """
+    def __init__(
+        self,
+        accounts: List[Dict],
+        db_logger: TwitterDBLogger,
+        concurrency: int = 4,
+        browser_pool: Optional[BrowserPool] = None,
+        session_cache: Optional[SessionCache] = None,
+        claims: Optional[TweetClaims] = None,
+        base_url: str = "https://twitter.com",
+        reply_generator: Optional[AsyncReplyGenerator] = None,
+        selectors: Optional[SelectorResolver] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+        resource_policy: Optional[ResourcePolicy] = None,
+        memory_governor: Optional[MemoryGovernor] = None
+    ):
+        self.accounts = accounts
+        self.db_logger = db_logger
+        self.concurrency = concurrency
+        self.browser_pool = browser_pool
+        self.session_cache = session_cache
+        self.claims = claims or TweetClaims()
+        self.base_url = base_url
+        self.reply_generator = reply_generator
+        self.selectors = selectors or SelectorResolver()
+        self.proxy_pool = proxy_pool
+        self.resource_policy = resource_policy
+        self.memory_governor = memory_governor
+
+    async def run(self) -> List[Dict]:
+        """Run every account and return one result dict per account, in roster order."""
+        owns_pool = self.browser_pool is None
+        if owns_pool:
+            self.browser_pool = BrowserPool(os.getenv('BROWSER_ENDPOINT'), size=0)
+            await self.browser_pool.start()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            return await asyncio.gather(*(self._run_account(account, semaphore) for account in self.accounts))
+        finally:
+            if owns_pool:
+                await self.browser_pool.close()
+                self.browser_pool = None
+
+    async def _run_account(self, account: Dict, semaphore: asyncio.Semaphore) -> Dict:
+        username = account['username']
+        async with semaphore:
+            start = time.monotonic()
+            result = {'username': username, 'status': 'failed', 'tweet_url': None, 'error': None}
+            try:
+                async with PlaywrightTwitterClient(
+                    username,
+                    account['password'],
+                    proxies=account.get('proxies'),
+                    session_cache=self.session_cache,
+                    browser_pool=self.browser_pool,
+                    base_url=self.base_url,
+                    selectors=self.selectors,
+                    proxy_pool=self.proxy_pool,
+                    resource_policy=self.resource_policy,
+                    memory_governor=self.memory_governor
+                ) as twitter:
+                    await twitter.ensure_logged_in()
+                    engaged = await engage_best_tweet(twitter, self.db_logger, self.claims, reply_generator=self.reply_generator)
+                result['status'] = 'engaged' if engaged else 'idle'
+                result['tweet_url'] = engaged['tweet']['url'] if engaged else None
+            except Exception as e:
+                print(f"[{username}] Session failed: {e}")
+                result['error'] = str(e)
+            result['seconds'] = time.monotonic() - start
+            return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run many accounts concurrently on one browser.")
+    parser.add_argument('--accounts', default=os.getenv('ACCOUNTS_FILE', 'accounts.json'), help="JSON account roster")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('CONCURRENCY', '4')))
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("Error: Please set the DATABASE_URL environment variable.")
+        sys.exit(1)
+
+    METRICS.configure_from_env()
+    db_logger = TwitterDBLogger(db_url)
+    session_cache = SessionCache(os.getenv('SESSION_CACHE_DIR', '.session_cache'))
+    roster = load_roster(args.accounts)
+    proxy_pool = roster_proxy_pool(roster, session_cache.cache_dir)
+    if proxy_pool:
+        await proxy_pool.probe_all()
+    resource_policy = policy_from_env(session_cache.cache_dir)
+    async with AsyncReplyGenerator(cache=ReplyCache(db_logger)) as reply_generator:
+        orchestrator = Orchestrator(
+            roster,
+            db_logger,
+            concurrency=args.concurrency,
+            session_cache=session_cache,
+            reply_generator=reply_generator,
+            selectors=SelectorResolver(os.path.join(session_cache.cache_dir, 'selectors.json')),
+            proxy_pool=proxy_pool,
+            resource_policy=resource_policy,
+            memory_governor=governor_from_env()
+        )
+        results = await orchestrator.run()
+    db_logger.close()
+    for result in results:
+        print(f"{result['username']}: {result['status']} {result['tweet_url'] or result['error'] or ''} ({result['seconds']:.1f}s)")
+    if resource_policy:
+        print(resource_policy.report())
+    if METRICS.enabled:
+        print(METRICS.report())
+        METRICS.close()
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    asyncio.run(main())
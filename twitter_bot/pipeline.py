@@ -0,0 +1,251 @@
+"""
+Staged engagement pipeline for one logged-in session:
+
+    scrape -> rank -> generate -> act -> log
+
+Every stage runs as its own task(s) and hands items to the next one through a bounded
+asyncio.Queue, so a slow stage (usually reply generation) fills its input queue and the
+stages before it block on put() until it catches up; scraping stops scrolling instead of
+piling up tweets. Unlike engage_best_tweet, which acts on one tweet per run, the pipeline
+keeps engaging until `max_actions` tweets were acted on or the feed runs out.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from twitter_bot.ai_reply import AsyncReplyGenerator, generate_ai_reply
+from twitter_bot.db import TwitterDBLogger
+from twitter_bot.reply_cache import ActedIndex
+from twitter_bot.runner import TweetClaims, record_engagement, repost_and_reply
+from twitter_bot.tweet_analyzer import ViralRanker
+
+_DONE = object()
+
+
+class StageStats:
+    """Items, errors and per-item latency of one stage, plus time spent blocked on a full downstream queue."""
+    def __init__(self):
+        self.items = 0
+        self.errors = 0
+        self.blocked_seconds = 0.0
+        self.max_queue = 0
+        self._latencies: List[float] = []
+
+    def record(self, seconds: float):
+        self.items += 1
+        self._latencies.append(seconds)
+
+    def summary(self) -> Dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+
+        return {
+            'items': self.items,
+            'errors': self.errors,
+            'p50': pct(0.5),
+            'p95': pct(0.95),
+            'max': latencies[-1] if latencies else 0.0,
+            'busy_seconds': sum(latencies),
+            'blocked_seconds': self.blocked_seconds,
+            'max_queue': self.max_queue
+        }
+
+
+class Stage:
+    """
+    One pipeline stage: `concurrency` workers take items from a bounded input queue and call
+    `handler(item, worker)`, which returns the items to pass downstream (possibly none).
+    `flush()`, if given, runs once after the input is exhausted and returns any held-back items.
+    """
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any, int], Awaitable[List]],
+        concurrency: int = 1,
+        queue_size: int = 4,
+        flush: Optional[Callable[[], Awaitable[List]]] = None
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.flush = flush
+        self.stats = StageStats()
+
+    async def emit(self, downstream: Optional['Stage'], items: List):
+        if downstream is None:
+            return
+        for item in items:
+            start = time.perf_counter()
+            await downstream.queue.put(item)
+            self.stats.blocked_seconds += time.perf_counter() - start
+            downstream.stats.max_queue = max(downstream.stats.max_queue, downstream.queue.qsize())
+
+    async def run(self, downstream: Optional['Stage']):
+        async def worker(index: int):
+            while True:
+                item = await self.queue.get()
+                if item is _DONE:
+                    return
+                start = time.perf_counter()
+                try:
+                    out = await self.handler(item, index)
+                except Exception as e:
+                    self.stats.errors += 1
+                    print(f"[{self.name}] failed: {e}")
+                    continue
+                self.stats.record(time.perf_counter() - start)
+                await self.emit(downstream, out)
+
+        await asyncio.gather(*(worker(i) for i in range(self.concurrency)))
+        if self.flush:
+            await self.emit(downstream, await self.flush())
+        if downstream:
+            for _ in range(downstream.concurrency):
+                await downstream.queue.put(_DONE)
+
+
+class EngagementPipeline:
+    """
+    Scrape, rank, generate, act and log as concurrent stages of one session.
+
+    The feed is ranked in windows of `window` tweets and the best claimable tweet of each
+    window goes on to reply generation (`generate_concurrency` replies in flight). Acting
+    uses `act_concurrency` extra tabs of the session's context, so the feed page keeps
+    scrolling while tweets are reposted and replied to. `queue_size` bounds every queue.
+    """
+    def __init__(
+        self,
+        twitter,
+        db_logger: TwitterDBLogger,
+        reply_generator: Optional[AsyncReplyGenerator] = None,
+        claims: Optional[TweetClaims] = None,
+        max_actions: int = 5,
+        feed_limit: int = 100,
+        window: int = 10,
+        queue_size: int = 4,
+        generate_concurrency: int = 2,
+        act_concurrency: int = 1,
+        ranker: Optional[ViralRanker] = None
+    ):
+        self.twitter = twitter
+        self.db_logger = db_logger
+        self.reply_generator = reply_generator
+        self.claims = claims or TweetClaims()
+        self.max_actions = max_actions
+        self.feed_limit = feed_limit
+        self.window = window
+        self.ranker = ranker or ViralRanker()
+        self.results: List[Dict] = []
+        self._acted: Optional[ActedIndex] = None
+        self._pending: List[Dict] = []
+        self._selected = 0
+        self._enough = asyncio.Event()
+        self._tabs: List = []
+        self.stages = {
+            'scrape': Stage('scrape', None, queue_size=queue_size),
+            'rank': Stage('rank', self._rank, queue_size=queue_size, flush=self._flush_rank),
+            'generate': Stage('generate', self._generate, concurrency=generate_concurrency, queue_size=queue_size),
+            'act': Stage('act', self._act, concurrency=act_concurrency, queue_size=queue_size),
+            'log': Stage('log', self._log, queue_size=queue_size)
+        }
+        self._elapsed = 0.0
+
+    @property
+    def stats(self) -> Dict:
+        stats = {name: stage.stats.summary() for name, stage in self.stages.items()}
+        minutes = self._elapsed / 60
+        stats['actions_per_minute'] = len(self.results) / minutes if minutes else 0.0
+        return stats
+
+    async def run(self) -> List[Dict]:
+        """Run the pipeline to completion and return the engaged tweets with their replies."""
+        loop = asyncio.get_running_loop()
+        self._acted = await loop.run_in_executor(None, ActedIndex.load, self.db_logger, self.twitter.username)
+        self._tabs = [await self.twitter.open_tab() for _ in range(self.stages['act'].concurrency)]
+        start = time.monotonic()
+        names = list(self.stages)
+        try:
+            await asyncio.gather(
+                self._scrape(),
+                *(self.stages[name].run(self.stages[nxt] if nxt else None)
+                  for name, nxt in zip(names[1:], names[2:] + [None]))
+            )
+        finally:
+            self._elapsed = time.monotonic() - start
+            for tab in self._tabs:
+                await tab.close_tab()
+        return self.results
+
+    async def _scrape(self):
+        stage, downstream = self.stages['scrape'], self.stages['rank']
+        feed = self.twitter.iter_feed(limit=self.feed_limit, stop=lambda tweet: self._enough.is_set())
+        try:
+            start = time.perf_counter()
+            async for tweet in feed:
+                stage.stats.record(time.perf_counter() - start)
+                if self._acted.filter([tweet]):
+                    await stage.emit(downstream, [tweet])
+                if self._enough.is_set():
+                    break
+                start = time.perf_counter()
+        except Exception as e:
+            stage.stats.errors += 1
+            print(f"[{self.twitter.username}] Scraping failed: {e}")
+        finally:
+            await feed.aclose()
+            await downstream.queue.put(_DONE)
+
+    async def _rank(self, tweet: Dict, worker: int) -> List[Dict]:
+        self._pending.append(tweet)
+        if len(self._pending) < self.window:
+            return []
+        return await self._flush_rank()
+
+    async def _flush_rank(self) -> List[Dict]:
+        """Best claimable tweet of the pending window."""
+        window, self._pending = self._pending, []
+        if self._selected >= self.max_actions:
+            return []
+        for tweet in self.ranker.rank(window):
+            if await self.claims.claim(tweet['url']):
+                self._selected += 1
+                if self._selected >= self.max_actions:
+                    self._enough.set()
+                print(f"[{self.twitter.username}] Selected most viral tweet: {tweet['url']}")
+                return [tweet]
+        return []
+
+    async def _generate(self, tweet: Dict, worker: int) -> List:
+        if self.reply_generator:
+            reply = await self.reply_generator.generate(tweet['content'], tweet['author'], tweet.get('tweet_id'))
+        else:
+            loop = asyncio.get_running_loop()
+            reply = await loop.run_in_executor(None, generate_ai_reply, tweet['content'], tweet['author'])
+        return [(tweet, reply)]
+
+    async def _act(self, item, worker: int) -> List:
+        tweet, ai_reply = item
+        ai_reply, actions = await repost_and_reply(self._tabs[worker], tweet, ai_reply, self.reply_generator)
+        return [{'tweet': tweet, 'ai_reply': ai_reply, 'actions': actions}]
+
+    async def _log(self, engaged: Dict, worker: int) -> List:
+        loop = asyncio.get_running_loop()
+        logged = await loop.run_in_executor(
+            None, record_engagement, self.db_logger, engaged['tweet'], engaged['actions'], engaged['ai_reply'],
+            self.twitter.username
+        )
+        if logged:
+            self._acted.add(engaged['tweet'].get('tweet_id') or engaged['tweet']['url'])
+        self.results.append(engaged)
+        return []
+
+
+def print_pipeline_stats(stats: Dict):
+    for name, s in stats.items():
+        if name == 'actions_per_minute':
+            continue
+        print(f"{name:>8}: {s['items']} items, {s['errors']} errors, p50 {s['p50'] * 1000:.0f}ms, "
+              f"p95 {s['p95'] * 1000:.0f}ms, blocked {s['blocked_seconds']:.1f}s, max queue {s['max_queue']}")
+    print(f"{stats['actions_per_minute']:.1f} actions per browser-minute")
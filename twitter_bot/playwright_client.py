@@ -1,17 +1,139 @@
 import asyncio
+import copy
+import inspect
+import os
 import random
-from typing import List, Optional
+import re
+import time
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError, Page, Browser
+from twitter_bot.browser_pool import BrowserPool, ContextLease, connect_browser
+from twitter_bot.memory_governor import MemoryGovernor
+from twitter_bot.metrics import METRICS
+from twitter_bot.proxy_pool import ProxyPool, is_proxy_error
+from twitter_bot.resource_policy import ResourcePolicy
+from twitter_bot.selector_resolver import SelectorResolver
+from twitter_bot.session_cache import SessionCache
+from twitter_bot.stealth import IGNORE_DEFAULT_ARGS, apply_stealth
+from twitter_bot.timeline_parser import is_timeline_response, parse_timeline
+from twitter_bot.typing_engine import DEFAULT_PROFILE, TypingProfile, scale_profile, type_text
+
+# Runs in the page: pulls the fields of every tweet article in a single round trip.
+EXTRACT_TWEETS_JS = """
+(articles) => articles.map((el) => {
+    const text = (sel) => { const n = el.querySelector(sel); return n ? n.innerText : null; };
+    const attr = (sel, name) => { const n = el.querySelector(sel); return n ? n.getAttribute(name) : null; };
+    return {
+        content: text('div[lang]'),
+        author: text('div[dir="ltr"] span'),
+        href: attr('a[role="link"][href*="/status/"]', 'href'),
+        created_at: attr('time[datetime]', 'datetime'),
+        likes: attr('button[data-testid="like"]', 'aria-label'),
+        retweets: attr('button[data-testid="retweet"]', 'aria-label'),
+        replies: attr('button[data-testid="reply"]', 'aria-label'),
+    };
+})
+"""
+
+_STATUS_ID_RE = re.compile(r'/status/(\d+)')
+
+
+def _count_from_label(label: Optional[str]) -> int:
+    """Turn an aria-label such as '1,234 Likes. Like' into 1234."""
+    return int(''.join(filter(str.isdigit, label or '')) or 0)
+
+
+def _tweet_id_from_href(href: Optional[str]) -> Optional[str]:
+    if not href:
+        return None
+    match = _STATUS_ID_RE.search(href)
+    return match.group(1) if match else href.split('/')[-1]
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO timestamp from a `<time datetime>` attribute (accepts a trailing 'Z')."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+class _ActionFailed(Exception):
+    """An engage() step that could not be completed (e.g. its button is missing)."""
+    def __init__(self, selector: Optional[str], message: str):
+        super().__init__(message)
+        self.selector = selector
+        self.message = message
+
+
+def _discard(value) -> None:
+    """Cancel a task/future or close a coroutine that will never be awaited."""
+    if asyncio.isfuture(value):
+        value.cancel()
+    elif inspect.iscoroutine(value):
+        value.close()
+
 
 class PlaywrightTwitterClient:
     """
     Handles browser automation for Twitter using Playwright (async, headless, with IP rotation and stealth).
     """
-    def __init__(self, username: str, password: str, proxies: Optional[List[str]] = None):
-        """Initialize with Twitter credentials and optional list of proxy URLs."""
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        proxies: Optional[List[str]] = None,
+        session_cache: Optional[SessionCache] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        browser_endpoint: Optional[str] = None,
+        base_url: str = "https://twitter.com",
+        selectors: Optional[SelectorResolver] = None,
+        typing_profile: TypingProfile = DEFAULT_PROFILE,
+        proxy_pool: Optional[ProxyPool] = None,
+        max_failovers: int = 2,
+        resource_policy: Optional[ResourcePolicy] = None,
+        memory_governor: Optional[MemoryGovernor] = None,
+        delay_scale: Optional[float] = None
+    ):
+        """
+        Initialize with Twitter credentials and optional list of proxy URLs.
+        With a `session_cache`, a saved storage_state is restored so ensure_logged_in() can skip login().
+        With a `browser_pool`, a pre-configured context is leased from a warm browser instead of
+        launching Chromium; with a `browser_endpoint`, a fresh context is opened on an already
+        running browser (see twitter_bot.browser_pool).
+        `base_url` can point the client at a local stand-in site for offline runs.
+        `selectors` resolves action buttons; share one with a stats file to keep its drift counts.
+        `typing_profile` sets the keystroke rhythm of replies (see twitter_bot.typing_engine).
+        With a `proxy_pool`, the proxy is picked by health and latency instead of at random, and a
+        navigation that fails because of the proxy moves the session to another proxy (at most
+        `max_failovers` times).
+        `resource_policy` blocks unneeded resources and serves static assets from disk in every
+        context the client opens (see twitter_bot.resource_policy).
+        `memory_governor` caps the JS heap and DOM size of long iter_feed() sessions by recycling
+        the page once a limit is crossed (see twitter_bot.memory_governor).
+        `delay_scale` multiplies every human-like delay and the typing rhythm (default: the
+        HUMAN_DELAY_SCALE environment variable, else 1); 0 measures machine cost only.
+        """
         self.username = username
         self.password = password
         self.proxies = proxies or []
+        self.session_cache = session_cache
+        self.restored_session = False
+        self.browser_pool = browser_pool
+        self._lease: Optional[ContextLease] = None
+        self.browser_endpoint = browser_endpoint
+        self.base_url = base_url.rstrip('/')
+        self.selectors = selectors or SelectorResolver()
+        self.delay_scale = delay_scale if delay_scale is not None else float(os.getenv('HUMAN_DELAY_SCALE', '1'))
+        self.typing_profile = scale_profile(typing_profile, self.delay_scale)
+        self.proxy_pool = proxy_pool
+        self.max_failovers = max_failovers
+        self.resource_policy = resource_policy
+        self.memory_governor = memory_governor
+        self._failovers = 0
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
         self.playwright = None
@@ -19,63 +141,130 @@ class PlaywrightTwitterClient:
         self.context = None
 
     async def __aenter__(self):
-        self.playwright = await async_playwright().start()
-        self.proxy = random.choice(self.proxies) if self.proxies else None
-        self.browser = await self.playwright.chromium.launch(headless=True, ignore_default_args=[
-            '--disable-extensions', 
-            '--disable-default-apps', 
-            '--disable-component-extensions-with-background-pages'
-        ])
-        context_args = {}
-        if self.proxy:
-            context_args["proxy"] = {"server": self.proxy}
-        self.context = await self.browser.new_context(**context_args)
-        self.page = await self.context.new_page()
-        webdriver_script = "Object.defineProperty(navigator, 'webdriver', {get: () => false})"
-        await self.page.add_init_script(webdriver_script)
-        permission_script = "Object.defineProperty(Notification, 'permission', {get: () => 'default'})"
-        await self.page.add_init_script(permission_script)
-        USER_AGENT = {
-            "userAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/74.0.3729.169 Safari/537.36",
-            "platform": "Win32",
-            "acceptLanguage": "en-US, en",
-            "userAgentMetadata": {
-            "brands": [
-                {"brand": " Not A;Brand", "version": "99"},
-                {"brand": "Chromium", "version": "74"},
-                {"brand": "Google Chrome", "version": "74"},
-            ],
-            "fullVersion": "74.0.3729.169",
-            "platform": "Windows",
-            "platformVersion": "10.0",
-            "architecture": "x86",
-            "model": "",
-            "mobile": False,
-            },
-        }
-        cdp = await self.page.context.new_cdp_session(self.page)
-        await cdp.send('Network.setUserAgentOverride', USER_AGENT)
+        if self.proxy_pool:
+            self.proxy = self.proxy_pool.choose(self.proxies or None)
+        else:
+            self.proxy = random.choice(self.proxies) if self.proxies else None
+        storage_state = None
+        if self.session_cache:
+            storage_state = self.session_cache.load(self.username, self.proxy)
+            self.restored_session = storage_state is not None
+        if not self.browser_pool:
+            with METRICS.span('browser_launch', mode='connect' if self.browser_endpoint else 'launch'):
+                self.playwright = await async_playwright().start()
+                if self.browser_endpoint:
+                    self.browser = await connect_browser(self.playwright, self.browser_endpoint)
+                else:
+                    self.browser = await self.playwright.chromium.launch(headless=True, ignore_default_args=IGNORE_DEFAULT_ARGS)
+        with METRICS.span('open_context'):
+            await self._open_context(storage_state)
         return self
 
+    async def _open_context(self, storage_state: Optional[Dict] = None):
+        """Lease or create the context (with `self.proxy`) and page the client works in."""
+        if self.browser_pool:
+            self._lease = await self.browser_pool.acquire(
+                key=f"{self.username}|{self.proxy or ''}", proxy=self.proxy, storage_state=storage_state
+            )
+            self.context, self.page = self._lease.context, self._lease.page
+        else:
+            context_args = {}
+            if self.proxy:
+                context_args["proxy"] = {"server": self.proxy}
+            if storage_state:
+                context_args["storage_state"] = storage_state
+            self.context = await self.browser.new_context(**context_args)
+            self.page = await self.context.new_page()
+            await apply_stealth(self.page)
+        if self.resource_policy:
+            await self.resource_policy.install(self.context)
+
+    async def failover(self, error: Exception) -> bool:
+        """
+        Report the current proxy as failed and move the session (cookies and local storage) to a
+        new context on another proxy from `proxy_pool`. False if no other proxy is available or
+        `max_failovers` is used up.
+        """
+        if not self.proxy_pool or not self.proxy or self._failovers >= self.max_failovers:
+            return False
+        self.proxy_pool.record(self.proxy, ok=False, error=str(error))
+        proxy = self.proxy_pool.choose(self.proxies or None, exclude=[self.proxy])
+        if not proxy:
+            return False
+        print(f"[{self.username}] Proxy {self.proxy} failed ({error}), failing over to {proxy}")
+        self._failovers += 1
+        await self._reopen_context(proxy)
+        return True
+
+    async def _reopen_context(self, proxy: Optional[str] = None):
+        """Close the context and open a fresh one (on `proxy` if given) with the same cookies and storage."""
+        storage_state = await self.context.storage_state()
+        if self._lease:
+            await self.browser_pool.release(self._lease, discard=True)
+            self._lease = None
+        else:
+            await self.context.close()
+        if proxy:
+            self.proxy = proxy
+        await self._open_context(storage_state)
+
+    async def recycle_page(self):
+        """
+        Replace the working page with a fresh one in the same context, releasing the old page's
+        JS heap and DOM. With a governor set to recycle='context' the whole context is replaced.
+        """
+        governor = self.memory_governor
+        old = self.page
+        if governor:
+            governor.forget(old)
+            governor.stats['recycles'] += 1
+        if governor and governor.limits.recycle == 'context':
+            await self._reopen_context()
+            return
+        self.page = await self.context.new_page()
+        cdp = await apply_stealth(self.page)
+        if self._lease:
+            self._lease.page, self._lease.cdp = self.page, cdp
+        await old.close()
+
+    async def _goto(self, url: str, timeout: float):
+        """page.goto() that reports to `proxy_pool` and fails over to another proxy on a proxy error."""
+        while True:
+            try:
+                response = await self.page.goto(url, timeout=timeout)
+            except Exception as e:
+                if self.proxy_pool and is_proxy_error(e) and await self.failover(e):
+                    continue
+                raise
+            if self.proxy_pool and self.proxy:
+                self.proxy_pool.record(self.proxy, ok=True)
+            return response
+
     async def __aexit__(self, exc_type, exc, tb):
         await self.close()
         if self.playwright:
             await self.playwright.stop()
 
     async def _human_delay(self, min_sec=0.7, max_sec=1.8):
-        await asyncio.sleep(random.uniform(min_sec, max_sec))
+        with METRICS.idle():
+            await asyncio.sleep(random.uniform(min_sec, max_sec) * self.delay_scale)
+
+    async def _screenshot(self, path: str):
+        with METRICS.span('screenshot'):
+            await self.page.screenshot(path=path)
 
+    @METRICS.timed('login')
     async def login(self):
         """Simulate human login to Twitter."""
         try:
-            await self.page.goto("https://twitter.com/login", timeout=30000)
+            await self._goto(f"{self.base_url}/login", timeout=30000)
             await self._human_delay(2, 3)
             # Wait for username input to appear (debugging aid)
             try:
                 await self.page.wait_for_selector('input[name="text"]', timeout=60000)
             except Exception as e:
                 print("Selector for username input not found within 60s.")
-                await self.page.screenshot(path="login_page.png")
+                await self._screenshot("login_page.png")
                 print(await self.page.content())
                 raise
             # Fill username
@@ -99,219 +288,401 @@ class PlaywrightTwitterClient:
             await self.close()
             raise
 
-    async def scrape_feed(self, count: int = 20):
-        """Scrape the latest `count` tweets from the home feed."""
-        tweets = []
+    @METRICS.timed('ensure_logged_in')
+    async def ensure_logged_in(self):
+        """
+        Reuse a restored session when the home timeline loads, otherwise run a full login()
+        and cache the new storage_state.
+        """
+        if self.restored_session:
+            start = time.monotonic()
+            if await self._session_is_valid():
+                saved = self.session_cache.record_hit(time.monotonic() - start)
+                print(f"Restored cached session (saved ~{saved:.1f}s, hit rate {self.session_cache.hit_rate:.0%})")
+                return
+            print("Cached session expired, logging in.")
+            self.session_cache.invalidate(self.username, self.proxy)
+        start = time.monotonic()
+        await self.login()
+        if self.session_cache:
+            self.session_cache.record_miss(time.monotonic() - start)
+            self.session_cache.save(self.username, self.proxy, await self.context.storage_state())
+            print(f"Cached new session (hit rate {self.session_cache.hit_rate:.0%})")
+
+    async def refresh_session(self) -> bool:
+        """
+        For long-lived clients: log in again (and re-cache the session) if the live session has
+        expired. Returns True if a login was needed.
+        """
+        if await self._session_is_valid():
+            return False
+        print("Session expired, logging in again.")
+        if self.session_cache:
+            self.session_cache.invalidate(self.username, self.proxy)
+        self.restored_session = False
+        await self.ensure_logged_in()
+        return True
+
+    async def park(self):
+        """Leave the page on about:blank, so no timeline keeps polling or holding memory while idle."""
+        if self.page and not self.page.is_closed() and self.page.url != 'about:blank':
+            await self.page.goto('about:blank')
+
+    async def _session_is_valid(self) -> bool:
+        """Cheap check: load home and look for the primary column."""
+        try:
+            await self._goto(f"{self.base_url}/home", timeout=30000)
+            await self.page.wait_for_selector('div[data-testid="primaryColumn"]', timeout=10000)
+            return True
+        except Exception:
+            return False
+
+    async def scrape_feed(self, count: int = 20, batch: bool = True, intercept: bool = False):
+        """Scrape the latest `count` tweets from the home feed (see iter_feed for the options)."""
+        return [tweet async for tweet in self.iter_feed(limit=count, batch=batch, intercept=intercept)]
+
+    async def iter_feed(
+        self,
+        limit: Optional[int] = None,
+        batch: bool = True,
+        intercept: bool = False,
+        stop: Optional[Callable[[Dict], bool]] = None,
+        time_budget: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield tweets from the home feed as soon as each one is extracted.
+        With `batch=True` every visible article is extracted in a single page round trip
+        per scroll step; `batch=False` keeps the legacy per-element extraction.
+        With `intercept=True` tweets are parsed from the timeline's GraphQL responses instead,
+        falling back to DOM scraping until a payload has been captured.
+        Iteration ends after `limit` tweets, once `stop(tweet)` returns True, after
+        `time_budget` seconds, or when scrolling stops loading new content.
+        Only a set of seen tweet IDs is kept between scroll steps. With a `memory_governor` the
+        page is measured every few steps and recycled when it outgrows its limits; scrolling
+        then restarts from the top of a fresh home timeline, skipping tweets already seen.
+        """
         if not self.page:
             raise RuntimeError("Not logged in. Call login() first.")
-        await self.page.goto("https://twitter.com/home", timeout=30000)
-        await self._human_delay(2, 3)
-        last_height = 0
-        tries = 0
-        while len(tweets) < count and tries < 10:
-            await self._human_delay(1, 2)
-            tweet_elements = await self.page.query_selector_all('article[data-testid="tweet"]')
+        seen = set()
+        yielded = 0
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        extract = self._extract_batch if batch else self._extract_per_element
+        captured: List[Dict] = []
+        intercepted = False
+
+        async def on_response(response):
+            if not is_timeline_response(response.url):
+                return
+            try:
+                captured.extend(parse_timeline(await response.json(), self.base_url))
+            except Exception as e:
+                print(f"Could not parse timeline response: {e}")
+
+        def exhausted() -> bool:
+            if limit is not None and yielded >= limit:
+                return True
+            return deadline is not None and time.monotonic() >= deadline
+
+        async def load_home():
+            nonlocal listening
+            with METRICS.span('feed_load'):
+                await self._goto(f"{self.base_url}/home", timeout=30000)
+                if listening and listening is not self.page:
+                    # Failed over or recycled to a new page; follow it (the DOM covers the first payload).
+                    listening.remove_listener("response", on_response)
+                    listening = self.page
+                    listening.on("response", on_response)
+                await self._human_delay(2, 3)
+
+        governor = self.memory_governor
+        listening = self.page if intercept else None
+        if listening:
+            listening.on("response", on_response)
+        try:
+            await load_home()
+            last_height = 0
+            tries = 0
+            step = 0
+            seen_at_recycle = None
+            while not exhausted() and tries < 10:
+                step += 1
+                if governor and governor.due(step):
+                    sample = await governor.over_limit(self.page)
+                    if sample:
+                        if seen_at_recycle == len(seen):
+                            # The fresh page hit the ceiling before scrolling past the tweets already seen.
+                            print(f"[{self.username}] Memory ceiling reached without new tweets, ending the feed")
+                            return
+                        print(f"[{self.username}] Page at {sample['heap_mb']:.0f} MB heap, {sample['dom_nodes']} DOM nodes; "
+                              f"recycling {governor.limits.recycle} after {len(seen)} tweets")
+                        seen_at_recycle = len(seen)
+                        METRICS.count('page_recycles', kind=governor.limits.recycle)
+                        await self.recycle_page()
+                        await load_home()
+                        last_height = 0
+                        tries = 0
+                await self._human_delay(1, 2)
+                if captured or intercepted:
+                    intercepted = True
+                    step_tweets = captured[:]
+                    del captured[:]
+                else:
+                    with METRICS.span('extract', mode='batch' if batch else 'per_element'):
+                        step_tweets = await extract()
+                METRICS.count('tweets_extracted', len(step_tweets), mode='intercept' if intercepted else 'dom')
+                for tweet in step_tweets:
+                    key = tweet['tweet_id'] or tweet['url']
+                    if not tweet['url'] or key in seen:
+                        continue
+                    seen.add(key)
+                    yielded += 1
+                    METRICS.count('feed_tweets')
+                    yield tweet
+                    if stop and stop(tweet):
+                        return
+                    if exhausted():
+                        return
+                # Scroll to load more
+                with METRICS.span('scroll'):
+                    await self.page.mouse.wheel(0, 2000)
+                    await self._human_delay(1, 2)
+                    new_height = await self.page.evaluate('document.body.scrollHeight')
+                if new_height == last_height:
+                    tries += 1
+                else:
+                    tries = 0
+                last_height = new_height
+        finally:
+            if listening:
+                listening.remove_listener("response", on_response)
+
+    async def _extract_batch(self) -> List[Dict]:
+        """Extract all visible tweets with one `eval_on_selector_all` call."""
+        raw = await self.page.eval_on_selector_all('article[data-testid="tweet"]', EXTRACT_TWEETS_JS)
+        tweets = []
+        for item in raw:
+            href = item.get('href')
+            tweets.append({
+                'content': item.get('content') or "",
+                'author': item.get('author') or "",
+                'url': f'{self.base_url}{href}' if href else None,
+                'tweet_id': _tweet_id_from_href(href),
+                'created_at': _parse_datetime(item.get('created_at')),
+                'likes': _count_from_label(item.get('likes')),
+                'retweets': _count_from_label(item.get('retweets')),
+                'replies': _count_from_label(item.get('replies'))
+            })
+        return tweets
+
+    async def _extract_per_element(self) -> List[Dict]:
+        """Legacy extraction: several awaited element-handle calls per tweet."""
+        tweets = []
+        tweet_elements = await self.page.query_selector_all('article[data-testid="tweet"]')
+        handles = list(tweet_elements)
+
+        async def query(el, selector: str):
+            # Keep every handle as soon as it exists, so a failure later in the tweet cannot leak it.
+            handle = await el.query_selector(selector)
+            handles.append(handle)
+            return handle
+
+        try:
             for el in tweet_elements:
-                try:
-                    content = await el.query_selector('div[lang]')
-                    content_text = await content.inner_text() if content else ""
-                    author_el = await el.query_selector('div[dir="ltr"] span')
-                    author = await author_el.inner_text() if author_el else ""
-                    url_el = await el.query_selector('a[role="link"][href*="/status/"]')
-                    url = await url_el.get_attribute('href') if url_el else None
-                    tweet_id = url.split('/')[-1] if url else None
-                    # Engagement metrics
-                    likes_content = await el.query_selector('button[data-testid="like"]')
-                    likes_label = await likes_content.get_attribute('aria-label')
-                    likes = int(''.join(filter(str.isdigit, likes_label)) or 0)
-                    retweets_content = await el.query_selector('button[data-testid="retweet"]')
-                    retweets_label = await retweets_content.get_attribute('aria-label')
-                    retweets = int(''.join(filter(str.isdigit, retweets_label)) or 0)
-                    replies_content = await el.query_selector('button[data-testid="reply"]')
-                    replies_label = await replies_content.get_attribute('aria-label')
-                    replies = int(''.join(filter(str.isdigit, replies_label)) or 0)
-            
-                    tweet = {
-                        'content': content_text,
-                        'author': author,
-                        'url': f'https://twitter.com{url}' if url else None,
-                        'tweet_id': tweet_id,
-                        'likes': likes,
-                        'retweets': retweets,
-                        'replies': replies
-                    }
-                    if tweet not in tweets and tweet['url']:
-                        tweets.append(tweet)
-                        if len(tweets) >= count:
-                            break
-                except Exception:
-                    continue
-            # Scroll to load more
-            await self.page.mouse.wheel(0, 2000)
-            await self._human_delay(1, 2)
-            new_height = await self.page.evaluate('document.body.scrollHeight')
-            if new_height == last_height:
-                tries += 1
-            else:
-                tries = 0
-            last_height = new_height
-        return tweets[:count]
-
-    async def repost_tweet(self, tweet_url: str):
-        """Simulate reposting (retweeting) a tweet given its URL."""
+                with METRICS.span('extract_tweet'):
+                    try:
+                        content = await query(el, 'div[lang]')
+                        content_text = await content.inner_text() if content else ""
+                        author_el = await query(el, 'div[dir="ltr"] span')
+                        author = await author_el.inner_text() if author_el else ""
+                        url_el = await query(el, 'a[role="link"][href*="/status/"]')
+                        url = await url_el.get_attribute('href') if url_el else None
+                        tweet_id = url.split('/')[-1] if url else None
+                        # Engagement metrics
+                        likes_content = await query(el, 'button[data-testid="like"]')
+                        likes_label = await likes_content.get_attribute('aria-label')
+                        likes = int(''.join(filter(str.isdigit, likes_label)) or 0)
+                        retweets_content = await query(el, 'button[data-testid="retweet"]')
+                        retweets_label = await retweets_content.get_attribute('aria-label')
+                        retweets = int(''.join(filter(str.isdigit, retweets_label)) or 0)
+                        replies_content = await query(el, 'button[data-testid="reply"]')
+                        replies_label = await replies_content.get_attribute('aria-label')
+                        replies = int(''.join(filter(str.isdigit, replies_label)) or 0)
+
+                        tweets.append({
+                            'content': content_text,
+                            'author': author,
+                            'url': f'{self.base_url}{url}' if url else None,
+                            'tweet_id': tweet_id,
+                            'likes': likes,
+                            'retweets': retweets,
+                            'replies': replies
+                        })
+                    except Exception:
+                        continue
+        finally:
+            # Release the handles now; otherwise they pin detached nodes until the page is closed.
+            for handle in handles:
+                if handle:
+                    try:
+                        await handle.dispose()
+                    except Exception:
+                        pass
+        return tweets
+
+    async def engage(
+        self,
+        tweet_url: str,
+        actions: List[str],
+        reply_text: Union[None, str, Awaitable[Optional[str]]] = None
+    ) -> List[Dict]:
+        """
+        Open a tweet once and run `actions` ('repost', 'reply', 'like', 'bookmark') in order
+        against the loaded page. `reply_text` may be awaitable (e.g. a reply still being
+        generated); it is only awaited when the reply step is reached, and a None text skips it.
+        If no reply step will run, an awaitable `reply_text` is cancelled.
+        Returns one dict per action: action, success, selector (of the button clicked first),
+        seconds and error.
+        """
         if not self.page:
             raise RuntimeError("Not logged in. Call login() first.")
+        unknown = [action for action in actions if action not in self._ACTION_STEPS]
+        if unknown:
+            raise ValueError(f"Unknown engage actions: {unknown}")
+        if 'reply' not in actions:
+            _discard(reply_text)
+        results = []
         try:
-            await self.page.goto(tweet_url, timeout=20000)
-            await self._human_delay(2, 3)
-            
-            # Try multiple possible retweet selectors
-            retweet_selectors = [
-                'div[data-testid="retweet"]',
-                '[data-testid="retweet"]',
-                'div[aria-label*="Retweet"]',
-                'div[aria-label*="Repost"]',
-                'div[role="button"][aria-label*="Retweet"]',
-                'div[role="button"][aria-label*="Repost"]'
-            ]
-            
-            retweet_btn = None
-            for selector in retweet_selectors:
-                retweet_btn = await self.page.query_selector(selector)
-                if retweet_btn:
-                    print(f"Found retweet button with selector: {selector}")
-                    break
-            
-            if not retweet_btn:
-                print("Retweet button not found with any selector.")
-                await self.page.screenshot(path="retweet_page.png")
-                # print("Page content:", await self.page.content())
-                return
-                
-            await retweet_btn.click()
-            await self._human_delay(1, 2)
-            
-            # Try multiple confirm button selectors
-            confirm_selectors = [
-                'div[data-testid="retweetConfirm"]',
-                '[data-testid="retweetConfirm"]',
-                'div[data-testid="retweet"]',
-                'div[role="button"][aria-label*="Retweet"]',
-                'div[role="button"][aria-label*="Repost"]'
-            ]
-            
-            confirm_btn = None
-            for selector in confirm_selectors:
-                confirm_btn = await self.page.query_selector(selector)
-                if confirm_btn:
-                    print(f"Found confirm button with selector: {selector}")
-                    break
-                    
-            if not confirm_btn:
-                print("Retweet confirm button not found.")
-                await self.page.screenshot(path="retweet_confirm_page.png")
-                return
-                
-            await confirm_btn.click()
-            await self._human_delay(1, 2)
-            print(f"Reposted tweet: {tweet_url}")
+            with METRICS.span('tweet_load'):
+                await self._goto(tweet_url, timeout=20000)
+                await self._human_delay(2, 3)
         except Exception as e:
-            print(f"Failed to repost tweet: {e}")
-            await self.page.screenshot(path="repost_error.png")
+            print(f"Failed to open tweet {tweet_url}: {e}")
+            _discard(reply_text)
+            return [{'action': action, 'success': False, 'selector': None, 'seconds': 0.0, 'error': str(e)} for action in actions]
+        for action in actions:
+            start = time.monotonic()
+            result = {'action': action, 'success': False, 'selector': None, 'seconds': 0.0, 'error': None}
+            with METRICS.span('action', action=action):
+                try:
+                    if action == 'reply':
+                        text = await reply_text if inspect.isawaitable(reply_text) else reply_text
+                        if not text:
+                            raise _ActionFailed(None, "no reply text")
+                        result['selector'] = await self._reply_step(text)
+                    else:
+                        result['selector'] = await self._ACTION_STEPS[action](self)
+                    result['success'] = True
+                except _ActionFailed as e:
+                    result['selector'], result['error'] = e.selector, e.message
+                except Exception as e:
+                    print(f"Failed to {action} tweet: {e}")
+                    await self._screenshot(f"{action}_error.png")
+                    result['error'] = str(e)
+            METRICS.count('actions', action=action, result='ok' if result['success'] else 'failed')
+            result['seconds'] = time.monotonic() - start
+            results.append(result)
+        return results
 
-    async def reply_to_tweet(self, tweet_url: str, reply_text: str):
-        """Simulate replying to a tweet with the given text."""
-        if not self.page:
-            raise RuntimeError("Not logged in. Call login() first.")
+    async def _click_action(self, action: str, label: str, screenshot: str, primary: Optional[str] = None) -> str:
+        """
+        Resolve and click the button for `action`; raises _ActionFailed if it is missing,
+        reporting `primary` (the step's first button, if already clicked) as its selector.
+        """
+        found = await self.selectors.match(self.page, action)
+        if not found:
+            print(f"{label} not found with any selector.")
+            await self._screenshot(screenshot)
+            raise _ActionFailed(primary, f"{label} not found")
+        await self.page.locator(found).first.click()
+        await self._human_delay(1, 2)
+        return found
+
+    async def _repost_step(self) -> str:
+        selector = await self._click_action('retweet', "Retweet button", "retweet_page.png")
+        await self._click_action('retweet_confirm', "Retweet confirm button", "retweet_confirm_page.png", selector)
+        print(f"Reposted tweet: {self.page.url}")
+        return selector
+
+    async def _reply_step(self, reply_text: str) -> str:
+        selector = await self.selectors.match(self.page, 'reply')
+        if not selector:
+            print("Reply button not found with any selector.")
+            await self._screenshot("reply_page.png")
+            print("Page content:", await self.page.content())
+            raise _ActionFailed(None, "Reply button not found")
+        await self.page.locator(selector).first.click()
+        await self._human_delay(1, 2)
+
+        textarea = await self.selectors.resolve(self.page, 'reply_textarea')
+        if not textarea:
+            print("Reply textarea not found.")
+            await self._screenshot("reply_textarea_page.png")
+            raise _ActionFailed(selector, "Reply textarea not found")
+        await textarea.click()
+        await self._human_delay(0.5, 1.2)
+        await type_text(self.page, reply_text, self.typing_profile)
+        await self._human_delay(1, 7)
+
+        send_btn = await self.selectors.resolve(self.page, 'reply_send')
+        if not send_btn:
+            print("Send reply button not found.")
+            await self._screenshot("reply_send_page.png")
+            raise _ActionFailed(selector, "Send reply button not found")
+        await send_btn.scroll_into_view_if_needed()
+        await self._human_delay(0.5, 1.2)
         try:
-            await self.page.goto(tweet_url, timeout=20000)
-            await self._human_delay(2, 3)
-            
-            # Try multiple possible reply selectors
-            reply_selectors = [
-                'div[data-testid="reply"]',
-                'button[data-testid="reply"]',
-                '[data-testid="reply"]',
-                'div[aria-label*="Reply"]',
-                'div[role="button"][aria-label*="Reply"]'
-            ]
-            
-            reply_btn = None
-            for selector in reply_selectors:
-                reply_btn = await self.page.query_selector(selector)
-                if reply_btn:
-                    print(f"Found reply button with selector: {selector}")
-                    break
-                    
-            if not reply_btn:
-                print("Reply button not found with any selector.")
-                await self.page.screenshot(path="reply_page.png")
-                print("Page content:", await self.page.content())
-                return
-                
-            await reply_btn.click()
-            await self._human_delay(1, 2)
-            
-            # Try multiple textarea selectors
-            textarea_selectors = [
-                'div[role="textbox"]',
-                '[data-testid="tweetTextarea_0_label"]',
-                'div[contenteditable="true"]',
-                'div[data-testid="tweetTextarea"]'
-            ]
-            
-            textarea = None
-            for selector in textarea_selectors:
-                textarea = await self.page.query_selector(selector)
-                if textarea:
-                    print(f"Found textarea with selector: {selector}")
-                    break
-                    
-            if not textarea:
-                print("Reply textarea not found.")
-                await self.page.screenshot(path="reply_textarea_page.png")
-                return
-                
-            await textarea.click()
-            await self._human_delay(0.5, 1.2)
-            for char in reply_text:
-                await textarea.type(char, delay=random.randint(30, 80))
-            await self._human_delay(1, 7)
-            
-            # Try multiple send button selectors
-            send_selectors = [
-                'button[data-testid="tweetButton"]',
-                'div[data-testid="tweetButton"]',
-                '[data-testid="tweetButton"]',
-                'div[data-testid="tweetButtonInline"]',
-                'div[role="button"][aria-label*="Tweet"]'
-            ]
-            
-            send_btn = None
-            for selector in send_selectors:
-                send_btn = await self.page.query_selector(selector)
-                if send_btn:
-                    print(f"Found send button with selector: {selector}")
-                    break
-                    
-            if not send_btn:
-                print("Send reply button not found.")
-                await self.page.screenshot(path="reply_send_page.png")
-                return
-                
-            await send_btn.scroll_into_view_if_needed()
-            await self._human_delay(0.5, 1.2)
-            try:
-                await send_btn.click(timeout=10000)
-            except Exception:
-                print("Normal click on reply failed, trying force click.")
-                await send_btn.click(timeout=10000, force=True)
-            print(f"Replied to tweet: {tweet_url}")
-        except Exception as e:
-            print(f"Failed to reply to tweet: {e}")
-            await self.page.screenshot(path="reply_error.png")
+            await send_btn.click(timeout=10000)
+        except Exception:
+            print("Normal click on reply failed, trying force click.")
+            await send_btn.click(timeout=10000, force=True)
+        print(f"Replied to tweet: {self.page.url}")
+        return selector
+
+    async def _like_step(self) -> str:
+        return await self._click_action('like', "Like button", "like_page.png")
+
+    async def _bookmark_step(self) -> str:
+        return await self._click_action('bookmark', "Bookmark button", "bookmark_page.png")
+
+    _ACTION_STEPS = {'repost': _repost_step, 'reply': _reply_step, 'like': _like_step, 'bookmark': _bookmark_step}
+
+    async def repost_tweet(self, tweet_url: str) -> Dict:
+        """Simulate reposting (retweeting) a tweet given its URL."""
+        return (await self.engage(tweet_url, ['repost']))[0]
+
+    async def reply_to_tweet(self, tweet_url: str, reply_text: str) -> Dict:
+        """Simulate replying to a tweet with the given text."""
+        return (await self.engage(tweet_url, ['reply'], reply_text=reply_text))[0]
+
+    async def open_tab(self) -> 'PlaywrightTwitterClient':
+        """
+        A client on a new tab of this client's context (same cookies and proxy), so tweets can be
+        acted on while this page keeps scrolling the feed. Close it with close_tab().
+        """
+        tab = copy.copy(self)
+        tab.page = await self.context.new_page()
+        await apply_stealth(tab.page)
+        # The tab borrows the browser; close() on it must not release or close anything,
+        # and it cannot fail over on its own since the context belongs to this client.
+        tab.browser = tab.playwright = tab._lease = tab.proxy_pool = None
+        return tab
+
+    async def close_tab(self):
+        if self.page:
+            await self.page.close()
+            self.page = None
 
     async def close(self):
+        self.selectors.save()
+        if self.proxy_pool:
+            self.proxy_pool.save()
+        if self.resource_policy:
+            self.resource_policy.save()
+        if self._lease:
+            await self.browser_pool.release(self._lease)
+            self._lease = None
+            self.context = None
+            self.page = None
         if self.browser:
             await self.browser.close()
             self.browser = None
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import random
+import time
+import urllib.request
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+from twitter_bot.session_cache import _atomic_write_json
+
+# Substrings of Playwright navigation errors that point at the proxy rather than the site.
+# A bare navigation timeout is left out: a slow page is not a proxy failure.
+PROXY_ERROR_MARKERS = (
+    'ERR_PROXY', 'ERR_TUNNEL_CONNECTION_FAILED', 'ERR_SOCKS', 'ERR_CONNECTION_RESET',
+    'ERR_CONNECTION_CLOSED', 'ERR_CONNECTION_REFUSED', 'ERR_TIMED_OUT', 'ERR_EMPTY_RESPONSE'
+)
+# Proxy schemes urllib can probe; others (socks5://, ...) are only judged by navigation outcomes.
+PROBE_SCHEMES = ('http', 'https')
+
+
+def proxy_scheme(proxy: str) -> str:
+    """Scheme of a proxy URL; bare host:port entries (allowed in rosters) are HTTP proxies."""
+    return urlsplit(proxy).scheme.lower() if '://' in proxy else 'http'
+
+
+def is_proxy_error(error: Exception) -> bool:
+    message = str(error)
+    return any(marker in message for marker in PROXY_ERROR_MARKERS)
+
+
+class ProxyPool:
+    """
+    Health-checked proxy pool. probe_all() fetches `probe_url` through every HTTP(S) proxy
+    concurrently and keeps an exponentially weighted moving average of latency and error rate per proxy;
+    navigation successes and failures reported with record() feed the error rate too.
+    A failure quarantines the proxy for `base_backoff` seconds, doubling with every failure
+    in a row up to `max_backoff`. choose() picks among the healthy proxies whose score
+    (latency weighted by error rate) is within `spread` of the best, so load is spread over
+    the fast ones. Health state is persisted to `state_path` between runs.
+    """
+    def __init__(
+        self,
+        proxies: Iterable[str] = (),
+        state_path: Optional[str] = None,
+        probe_url: str = "https://twitter.com/robots.txt",
+        probe_timeout: float = 10.0,
+        alpha: float = 0.3,
+        base_backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+        spread: float = 1.5
+    ):
+        self.proxies: List[str] = list(dict.fromkeys(proxies))
+        self.state_path = state_path
+        self.probe_url = probe_url
+        self.probe_timeout = probe_timeout
+        self.alpha = alpha
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.spread = spread
+        self.state: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        if self.state_path:
+            _atomic_write_json(self.state_path, self.state)
+
+    def _entry(self, proxy: str) -> Dict:
+        if proxy not in self.proxies:
+            self.proxies.append(proxy)
+        return self.state.setdefault(proxy, {
+            'latency': None, 'error_rate': 0.0, 'failures_in_row': 0, 'quarantined_until': 0.0,
+            'successes': 0, 'failures': 0, 'last_error': None
+        })
+
+    def record(self, proxy: str, ok: bool, latency: Optional[float] = None, error: Optional[str] = None) -> None:
+        """Update a proxy's moving averages with one probe or navigation outcome."""
+        entry = self._entry(proxy)
+        entry['error_rate'] = (1 - self.alpha) * entry['error_rate'] + self.alpha * (0.0 if ok else 1.0)
+        if ok:
+            entry['successes'] += 1
+            entry['failures_in_row'] = 0
+            entry['quarantined_until'] = 0.0
+            if latency is not None:
+                previous = entry['latency']
+                entry['latency'] = latency if previous is None else (1 - self.alpha) * previous + self.alpha * latency
+            return
+        entry['failures'] += 1
+        entry['failures_in_row'] += 1
+        entry['last_error'] = error
+        backoff = min(self.base_backoff * 2 ** (entry['failures_in_row'] - 1), self.max_backoff)
+        entry['quarantined_until'] = time.time() + backoff
+
+    def is_healthy(self, proxy: str) -> bool:
+        return self._entry(proxy)['quarantined_until'] <= time.time()
+
+    def score(self, proxy: str) -> float:
+        """Lower is better: moving-average latency (unknown counts as probe_timeout / 2) times error penalty."""
+        entry = self._entry(proxy)
+        latency = entry['latency'] if entry['latency'] is not None else self.probe_timeout / 2
+        return latency * (1 + 4 * entry['error_rate'])
+
+    def choose(self, candidates: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        A fast healthy proxy from `candidates` (default: all), never one in `exclude`. If all of
+        them are quarantined, the one whose quarantine ends first; None if there is no candidate.
+        """
+        excluded = set(exclude)
+        pool = [proxy for proxy in (candidates or self.proxies) if proxy not in excluded]
+        if not pool:
+            return None
+        healthy = [proxy for proxy in pool if self.is_healthy(proxy)]
+        if not healthy:
+            return min(pool, key=lambda proxy: self._entry(proxy)['quarantined_until'])
+        best = min(self.score(proxy) for proxy in healthy)
+        return random.choice([proxy for proxy in healthy if self.score(proxy) <= best * self.spread])
+
+    def _probe_sync(self, proxy: str) -> float:
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({'http': proxy, 'https': proxy}))
+        start = time.monotonic()
+        with opener.open(self.probe_url, timeout=self.probe_timeout) as response:
+            response.read(1024)
+        return time.monotonic() - start
+
+    async def probe(self, proxy: str) -> Optional[bool]:
+        """Whether `proxy` answered the probe; None, recording nothing, for schemes urllib cannot speak."""
+        if proxy_scheme(proxy) not in PROBE_SCHEMES:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            latency = await loop.run_in_executor(None, self._probe_sync, proxy)
+        except Exception as e:
+            self.record(proxy, ok=False, error=str(e))
+            return False
+        self.record(proxy, ok=True, latency=latency)
+        return True
+
+    async def probe_all(self, include_quarantined: bool = False) -> Dict[str, Optional[bool]]:
+        """Probe every proxy (by default only those not in quarantine) concurrently; None for unprobed schemes."""
+        targets = [proxy for proxy in self.proxies if include_quarantined or self.is_healthy(proxy)]
+        results = await asyncio.gather(*(self.probe(proxy) for proxy in targets))
+        return dict(zip(targets, results))
+
+    def report(self) -> List[Dict]:
+        """Per-proxy health, healthy and fastest first."""
+        now = time.time()
+        return [
+            {
+                'proxy': proxy,
+                'healthy': self.is_healthy(proxy),
+                'latency': self._entry(proxy)['latency'],
+                'error_rate': self._entry(proxy)['error_rate'],
+                'quarantine_seconds': max(self._entry(proxy)['quarantined_until'] - now, 0.0),
+                'last_error': self._entry(proxy)['last_error']
+            }
+            for proxy in sorted(self.proxies, key=lambda proxy: (not self.is_healthy(proxy), self.score(proxy)))
+        ]
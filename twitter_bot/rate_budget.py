@@ -0,0 +1,124 @@
+"""
+Per-account action budgets for long-running sessions.
+
+Each account gets one token bucket per window (hour, day): a bucket holds up to its window's
+allowance and refills continuously at allowance / window seconds, so a burst can never exceed
+the allowance and spending is spread over the window instead of resetting on the hour. An
+action may run once every bucket holds a token for it. Bucket levels are persisted so a
+restarted daemon does not get a fresh allowance.
+"""
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+from twitter_bot.session_cache import _atomic_write_json
+
+
+class TokenBucket:
+    """`capacity` tokens, refilled at capacity / `period` per second; starts full."""
+    def __init__(self, capacity: float, period: float, tokens: Optional[float] = None, updated: Optional[float] = None):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity if tokens is None else min(tokens, capacity)
+        self.updated = time.time() if updated is None else updated
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(now or time.time())
+        return self.tokens
+
+    def wait_seconds(self, cost: float = 1, now: Optional[float] = None) -> float:
+        """
+        Seconds until `cost` tokens are available (0 if they are now). A cost above capacity
+        waits for a full bucket instead of forever; spending it then leaves the bucket in debt.
+        """
+        missing = min(cost, self.capacity) - self.available(now)
+        return max(missing / self.rate, 0.0)
+
+    def spend(self, cost: float = 1, now: Optional[float] = None) -> None:
+        self._refill(now or time.time())
+        self.tokens -= cost
+
+
+class RateBudget:
+    """
+    Actions per hour and per day for one account, as two TokenBuckets (an allowance of 0
+    leaves that window unlimited). State is kept per account in `state_path`, which several
+    accounts can share.
+    """
+    WINDOWS = {'hour': 3600, 'day': 86400}
+
+    def __init__(self, account: str, per_hour: float = 20, per_day: float = 150, state_path: Optional[str] = None):
+        self.account = account
+        self.state_path = state_path
+        saved = self._load().get(account, {})
+        self.buckets: Dict[str, TokenBucket] = {}
+        for window, allowance in (('hour', per_hour), ('day', per_day)):
+            if allowance > 0:
+                state = saved.get(window, {})
+                self.buckets[window] = TokenBucket(allowance, self.WINDOWS[window], state.get('tokens'), state.get('updated'))
+
+    def _load(self) -> Dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        # Re-read so accounts saved by other processes since we loaded are kept.
+        state = self._load()
+        state[self.account] = {
+            window: {'tokens': bucket.tokens, 'updated': bucket.updated} for window, bucket in self.buckets.items()
+        }
+        _atomic_write_json(self.state_path, state)
+
+    def available(self) -> int:
+        """Whole actions every window still allows right now."""
+        if not self.buckets:
+            return sys.maxsize
+        now = time.time()
+        return int(min(bucket.available(now) for bucket in self.buckets.values()))
+
+    def wait_seconds(self, cost: float = 1) -> float:
+        """Seconds until every window allows `cost` more actions."""
+        now = time.time()
+        return max((bucket.wait_seconds(cost, now) for bucket in self.buckets.values()), default=0.0)
+
+    def spend(self, cost: float = 1) -> None:
+        now = time.time()
+        for bucket in self.buckets.values():
+            bucket.spend(cost, now)
+        self.save()
+
+    def report(self) -> str:
+        return ', '.join(f"{bucket.available():.1f}/{bucket.capacity:g} per {window}" for window, bucket in self.buckets.items()) or 'unlimited'
+
+
+def budget_from_env(account: str, cache_dir: str, min_allowance: float = 1) -> RateBudget:
+    """
+    RateBudget from ACTIONS_PER_HOUR (default 20) and ACTIONS_PER_DAY (default 150), kept in
+    <cache_dir>/budgets.json. Raises ValueError for an allowance below `min_allowance` (other
+    than 0), which could never pay for an action costing that much.
+    """
+    allowances = {}
+    for window, name, default in (('hour', 'ACTIONS_PER_HOUR', '20'), ('day', 'ACTIONS_PER_DAY', '150')):
+        allowance = float(os.getenv(name, default))
+        if 0 < allowance < min_allowance:
+            raise ValueError(f"{name} must be 0 (unlimited) or at least {min_allowance:g}, got {allowance:g}")
+        allowances[window] = allowance
+    return RateBudget(
+        account,
+        per_hour=allowances['hour'],
+        per_day=allowances['day'],
+        state_path=os.path.join(cache_dir, 'budgets.json')
+    )
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, delete, select
+from twitter_bot.db import ActedTweet, ReplyCacheEntry, TwitterDBLogger
+
+
+def _utcnow() -> datetime:
+    # Stored naive: TIMESTAMP columns compare reliably across SQLite and PostgreSQL this way.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def reply_cache_key(tweet_id: Optional[str], tweet_content: str, author: str) -> str:
+    """tweet_id plus a content hash, so an edited tweet or a different author misses the cache."""
+    digest = hashlib.sha256(f"{author}\n{tweet_content}".encode()).hexdigest()[:32]
+    return f"{tweet_id or ''}:{digest}"
+
+
+class ReplyCache:
+    """
+    Two-level cache of generated replies: an in-process LRU of `max_entries` in front of the
+    reply_cache table. Entries expire `ttl` seconds after they are stored. DB lookups run in
+    the default executor so the event loop is not blocked.
+    """
+    def __init__(self, db_logger: TwitterDBLogger, ttl: float = 24 * 3600, max_entries: int = 1024):
+        self.db_logger = db_logger
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, Tuple[str, datetime]]" = OrderedDict()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    @property
+    def api_calls_saved(self) -> int:
+        return self.stats['memory_hits'] + self.stats['db_hits']
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.api_calls_saved + self.stats['misses']
+        return self.api_calls_saved / total if total else 0.0
+
+    def _remember(self, key: str, reply: str, expires_at: datetime):
+        self._lru[key] = (reply, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._lru.get(key)
+        if entry and entry[1] > _utcnow():
+            self._lru.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return entry[0]
+        loop = asyncio.get_running_loop()
+        row = await loop.run_in_executor(None, self._load, key)
+        if row:
+            self._remember(key, *row)
+            self.stats['db_hits'] += 1
+            return row[0]
+        self.stats['misses'] += 1
+        return None
+
+    async def put(self, key: str, reply: str) -> None:
+        expires_at = _utcnow() + timedelta(seconds=self.ttl)
+        self._remember(key, reply, expires_at)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._store, key, reply, expires_at)
+
+    async def discard(self, key: str) -> None:
+        """Forget a reply once it has been posted, so another account never posts the same text."""
+        self._lru.pop(key, None)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._delete, key)
+
+    def _delete(self, key: str) -> None:
+        table = ReplyCacheEntry.__table__
+        with self.db_logger.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.cache_key == key))
+
+    def _load(self, key: str) -> Optional[Tuple[str, datetime]]:
+        table = ReplyCacheEntry.__table__
+        stmt = select(table.c.reply, table.c.expires_at).where(
+            and_(table.c.cache_key == key, table.c.expires_at > _utcnow())
+        )
+        with self.db_logger.engine.connect() as conn:
+            row = conn.execute(stmt).first()
+        return (row[0], row[1]) if row else None
+
+    def _store(self, key: str, reply: str, expires_at: datetime) -> None:
+        table = ReplyCacheEntry.__table__
+        stmt = self.db_logger._insert(table)
+        if stmt is None:
+            with self.db_logger.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.cache_key == key))
+                conn.execute(table.insert().values(cache_key=key, reply=reply, created_at=_utcnow(), expires_at=expires_at))
+            return
+        stmt = stmt.values(cache_key=key, reply=reply, created_at=_utcnow(), expires_at=expires_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.cache_key],
+            set_={'reply': stmt.excluded.reply, 'created_at': stmt.excluded.created_at, 'expires_at': stmt.excluded.expires_at}
+        )
+        with self.db_logger.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def purge_expired(self) -> int:
+        table = ReplyCacheEntry.__table__
+        with self.db_logger.engine.begin() as conn:
+            return conn.execute(delete(table).where(table.c.expires_at <= _utcnow())).rowcount
+
+
+class ActedIndex:
+    """Tweet IDs an account has already acted on, loaded with one indexed query."""
+    def __init__(self, account: str, tweet_ids: Iterable[str] = ()):
+        self.account = account
+        self._tweet_ids: Set[str] = set(tweet_ids)
+        self.filtered = 0
+
+    @classmethod
+    def load(cls, db_logger: TwitterDBLogger, account: str) -> 'ActedIndex':
+        table = ActedTweet.__table__
+        with db_logger.engine.connect() as conn:
+            rows = conn.execute(select(table.c.tweet_id).where(table.c.account == account))
+            return cls(account, (tweet_id for (tweet_id,) in rows))
+
+    def __contains__(self, tweet_id: str) -> bool:
+        return tweet_id in self._tweet_ids
+
+    def add(self, tweet_id: str) -> None:
+        self._tweet_ids.add(tweet_id)
+
+    def filter(self, tweets: List[Dict]) -> List[Dict]:
+        """Drop tweets this account has already acted on."""
+        fresh = [t for t in tweets if (t.get('tweet_id') or t['url']) not in self._tweet_ids]
+        self.filtered += len(tweets) - len(fresh)
+        return fresh
@@ -0,0 +1,295 @@
+"""
+Bandwidth-lean browsing for proxied contexts.
+
+ResourcePolicy routes every request of a browser context through context.route(): media,
+fonts and analytics are aborted by rule, immutable static assets (content-hashed JS and CSS
+bundles served with long-lived Cache-Control) come from an on-disk AssetCache shared by all
+contexts and runs, and everything else goes to the network untouched. Per-run counters report
+the bytes that came over the wire and the bytes the cache saved.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+from twitter_bot.session_cache import _atomic_write_json, _file_lock
+
+# Playwright resource types aborted by default; the bot reads text and aria-labels only.
+DEFAULT_BLOCK_TYPES = ('image', 'media', 'font')
+
+# Hosts (and their subdomains) that only serve tracking and ads.
+DEFAULT_BLOCK_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'ads-twitter.com', 'analytics.twitter.com'
+)
+
+# Client event logging ("jot") and similar beacons on the main hosts.
+DEFAULT_BLOCK_PATTERNS = (r'/jot/', r'/i/api/1\.1/jot/', r'/client_event\.json', r'/1\.1/live_pipeline/')
+
+# Resource types worth looking up in the asset cache.
+CACHEABLE_TYPES = ('script', 'stylesheet', 'font', 'image')
+
+# Response headers that describe the encoded transfer, not the body we store.
+_SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie', 'date'}
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+# Files in an asset cache directory that no index entry refers to are deleted once they are
+# this old (seconds); younger ones may belong to a process that has not saved its index yet.
+ORPHAN_GRACE = 24 * 3600
+
+
+def is_immutable(headers: Dict[str, str], min_max_age: int = 7 * 24 * 3600) -> bool:
+    """True when Cache-Control marks the response immutable or fresh for at least `min_max_age` seconds."""
+    cache_control = headers.get('cache-control', '').lower()
+    if 'no-store' in cache_control or 'private' in cache_control:
+        return False
+    if 'immutable' in cache_control:
+        return True
+    match = _MAX_AGE_RE.search(cache_control)
+    return bool(match) and int(match.group(1)) >= min_max_age
+
+
+class AssetCache:
+    """
+    Size-bounded on-disk LRU of static asset bodies keyed by URL. Bodies live in `cache_dir`
+    as one file per URL; `index.json` keeps their headers, sizes and last use so the LRU order
+    survives between runs. The least recently used assets are evicted once the total size
+    exceeds `max_bytes`. Several processes (shard workers) may share `cache_dir`: save() merges
+    into the index on disk under a file lock instead of overwriting it, and loading sweeps out
+    stale body and temp files that no index entry refers to (left behind by crashed runs).
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock_path = os.path.join(cache_dir, 'index.lock')
+        # Keys this process dropped since its last save, with the time they were dropped.
+        self._removed: Dict[str, float] = {}
+        with _file_lock(self.lock_path):
+            self._index: "OrderedDict[str, Dict]" = self._ordered(self._read_index())
+            self._sweep()
+        self.total_bytes = sum(entry['size'] for entry in self._index.values())
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+    def _read_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _ordered(self, entries: Dict[str, Dict]) -> "OrderedDict[str, Dict]":
+        """Oldest use first, dropping entries whose body file has gone missing."""
+        entries = sorted(entries.items(), key=lambda item: item[1]['last_used'])
+        return OrderedDict((key, entry) for key, entry in entries if os.path.exists(self._path(key)))
+
+    def _sweep(self) -> None:
+        """Delete body files missing from the index and leftover temp files older than ORPHAN_GRACE."""
+        known = {os.path.basename(self._path(key)) for key in self._index}
+        cutoff = time.time() - ORPHAN_GRACE
+        for name in os.listdir(self.cache_dir):
+            if not (name.startswith('.tmp-') or (name.endswith('.bin') and name not in known)):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def save(self) -> None:
+        """
+        Merge this process's entries into index.json: the most recent use of an asset wins,
+        and assets this process dropped stay dropped unless another process used them since.
+        """
+        with _file_lock(self.lock_path):
+            merged = self._read_index()
+            for key, removed_at in self._removed.items():
+                if key in merged and merged[key]['last_used'] <= removed_at:
+                    del merged[key]
+            for key, entry in self._index.items():
+                if key not in merged or merged[key]['last_used'] < entry['last_used']:
+                    merged[key] = entry
+            self._index = self._ordered(merged)
+            self.total_bytes = sum(entry['size'] for entry in self._index.values())
+            self._removed.clear()
+            self._evict()
+            _atomic_write_json(self.index_path, dict(self._index))
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.bin')
+
+    def get(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """(status, headers, body) of a cached asset, or None."""
+        key = self.key(url)
+        entry = self._index.get(key)
+        if entry:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                self._forget(key)
+            else:
+                entry['last_used'] = time.time()
+                self._index.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry['status'], entry['headers'], body
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        key = self.key(url)
+        self._forget(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self._path(key))
+        self._index[key] = {
+            'url': url, 'status': status, 'size': len(body), 'last_used': time.time(),
+            'headers': {name: value for name, value in headers.items() if name.lower() not in _SKIP_HEADERS}
+        }
+        self.total_bytes += len(body)
+        self.stats['stored'] += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes:
+            self._forget(next(iter(self._index)))
+            self.stats['evicted'] += 1
+
+    def _forget(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        self._removed[key] = time.time()
+        self.total_bytes -= entry['size']
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class ResourcePolicy:
+    """
+    Request routing rules for browser contexts. install(context) registers one route handler
+    per context that aborts requests whose resource type is in `block_types`, whose host is in
+    `block_hosts` or whose URL matches one of `block_patterns`, answers cacheable GETs from
+    `cache` (fetching and storing immutable ones on a miss) and lets the rest through.
+    One policy can serve every context of a process; `stats` accumulates over all of them.
+    """
+    def __init__(
+        self,
+        block_types: Iterable[str] = DEFAULT_BLOCK_TYPES,
+        block_hosts: Iterable[str] = DEFAULT_BLOCK_HOSTS,
+        block_patterns: Iterable[str] = DEFAULT_BLOCK_PATTERNS,
+        cache: Optional[AssetCache] = None,
+        min_max_age: int = 7 * 24 * 3600
+    ):
+        self.block_types = set(block_types)
+        self.block_hosts = tuple(block_hosts)
+        self.block_patterns = [re.compile(pattern) for pattern in block_patterns]
+        self.cache = cache
+        self.min_max_age = min_max_age
+        self._contexts = weakref.WeakSet()
+        self._served = weakref.WeakSet()
+        self.stats = {
+            'requests': 0, 'blocked': 0, 'blocked_by_type': {}, 'cache_hits': 0,
+            'bytes_transferred': 0, 'bytes_saved': 0
+        }
+
+    async def install(self, context) -> None:
+        """Route all requests of `context` through this policy (once per context)."""
+        if context in self._contexts:
+            return
+        self._contexts.add(context)
+        await context.route('**/*', self._handle)
+        context.on('requestfinished', self._on_finished)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.block_types:
+            return True
+        host = urlsplit(url).hostname or ''
+        if any(host == blocked or host.endswith('.' + blocked) for blocked in self.block_hosts):
+            return True
+        return any(pattern.search(url) for pattern in self.block_patterns)
+
+    async def _handle(self, route) -> None:
+        request = route.request
+        self.stats['requests'] += 1
+        if self.should_block(request.url, request.resource_type):
+            self.stats['blocked'] += 1
+            by_type = self.stats['blocked_by_type']
+            by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            await route.abort('blockedbyclient')
+            return
+        if not self.cache or request.method != 'GET' or request.resource_type not in CACHEABLE_TYPES:
+            await route.continue_()
+            return
+        cached = self.cache.get(request.url)
+        if cached:
+            status, headers, body = cached
+            self._served.add(request)
+            self.stats['cache_hits'] += 1
+            self.stats['bytes_saved'] += len(body)
+            await route.fulfill(status=status, headers=headers, body=body)
+            return
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            # Let the browser try on its own (and fail visibly) rather than abort here.
+            await route.continue_()
+            return
+        self._served.add(request)
+        self.stats['bytes_transferred'] += len(body)
+        if response.status == 200 and is_immutable(response.headers, self.min_max_age):
+            self.cache.put(request.url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
+
+    async def _on_finished(self, request) -> None:
+        """Count bytes of requests the browser fetched itself (not those answered by the route handler)."""
+        if request in self._served:
+            return
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.stats['bytes_transferred'] += max(sizes['responseBodySize'], 0) + max(sizes['responseHeadersSize'], 0)
+
+    def save(self) -> None:
+        if self.cache:
+            self.cache.save()
+
+    def report(self) -> str:
+        s = self.stats
+        blocked = ', '.join(f"{count} {kind}" for kind, count in sorted(s['blocked_by_type'].items()))
+        return (f"Resources: {s['requests']} requests, {s['blocked']} blocked ({blocked or 'none'}), "
+                f"{s['cache_hits']} from asset cache; {s['bytes_transferred'] / 1024:.0f} KiB transferred, "
+                f"{s['bytes_saved'] / 1024:.0f} KiB saved by the cache")
+
+
+def policy_from_env(cache_dir: str) -> Optional[ResourcePolicy]:
+    """
+    ResourcePolicy configured by BLOCK_RESOURCES (comma-separated resource types, default
+    image,media,font; "none" blocks no types) and ASSET_CACHE_MB (default 200, 0 disables the
+    asset cache, which lives in <cache_dir>/assets). None when both are switched off.
+    """
+    block = os.getenv('BLOCK_RESOURCES', ','.join(DEFAULT_BLOCK_TYPES))
+    block_types = [] if block.strip().lower() == 'none' else [t.strip() for t in block.split(',') if t.strip()]
+    cache_mb = float(os.getenv('ASSET_CACHE_MB', '200'))
+    cache = AssetCache(os.path.join(cache_dir, 'assets'), max_bytes=int(cache_mb * 1024 * 1024)) if cache_mb > 0 else None
+    if not block_types and cache is None:
+        return None
+    return ResourcePolicy(block_types=block_types, cache=cache)
@@ -0,0 +1,175 @@
+"""
+One engagement run (scrape, pick the most viral tweet, repost, reply, log), shared by
+main.py and the multi-account orchestrator.
+"""
+import asyncio
+import inspect
+from datetime import datetime, timezone
+from typing import Awaitable, Dict, List, Optional, Set, Tuple, Union
+from twitter_bot.ai_reply import AsyncReplyGenerator, generate_ai_reply
+from twitter_bot.db import TwitterDBLogger, scraped_tweet_metadata
+from twitter_bot.reply_cache import ActedIndex, reply_cache_key
+from twitter_bot.tweet_analyzer import ViralRanker, select_most_viral, select_top_viral
+
+
+class TweetClaims:
+    """Tweet URLs already taken by some account, so no two accounts act on the same tweet."""
+    def __init__(self):
+        self._claimed: Set[str] = set()
+
+    async def claim(self, tweet_url: str) -> bool:
+        """Claim `tweet_url`; False if another account already has it."""
+        if tweet_url in self._claimed:
+            return False
+        self._claimed.add(tweet_url)
+        return True
+
+
+async def pick_tweet(tweets: List[Dict], claims: Optional[TweetClaims] = None) -> Optional[Dict]:
+    """Most viral tweet that can still be claimed."""
+    if claims is None:
+        return select_most_viral(tweets)
+    for tweet in ViralRanker().rank(tweets):
+        if await claims.claim(tweet['url']):
+            return tweet
+    return None
+
+
+def record_engagement(
+    db_logger: TwitterDBLogger,
+    tweet: Dict,
+    actions: List[Dict],
+    ai_reply: Optional[str],
+    account: Optional[str] = None
+) -> bool:
+    """
+    Log the actions of one run that succeeded (`actions` are the per-action results of
+    repost_and_reply) in a single transaction, and add the tweet to `account`'s already-acted
+    index if any did; `account` is also recorded in each action's extra, which the analytics
+    rollups group by. Returns False, writing nothing, when no action succeeded.
+    """
+    succeeded = [result['action'] for result in actions if result['success']]
+    if not succeeded:
+        return False
+    extra = {'url': tweet['url'], 'account': account} if account else {'url': tweet['url']}
+    with db_logger.run() as run:
+        if account:
+            run.mark_acted(account, [tweet.get('tweet_id') or tweet['url']])
+        # 1. Upsert user
+        user_id = run.upsert_user(twitter_handle=tweet['author'])
+        # 2. Upsert tweet
+        tweet_db_id = run.upsert_tweet(
+            tweet_id=tweet.get('tweet_id') or tweet['url'],  # fallback to URL if no tweet_id
+            author_id=user_id,
+            content=tweet['content'],
+            created_at=tweet.get('created_at'),
+            metadata=scraped_tweet_metadata(tweet)
+        )
+        # 3. Create session
+        session_id = run.create_session(user_id=user_id, session_timestamp=datetime.now(timezone.utc))
+        # 4. Log the repost and the reply, if they went through
+        for action in succeeded:
+            run.log_action(
+                session_id=session_id,
+                tweet_db_id=tweet_db_id,
+                action_type=action,
+                ai_reply=ai_reply if action == 'reply' else None,
+                likes=tweet['likes'],
+                retweets=tweet['retweets'],
+                replies=tweet['replies'],
+                extra=extra
+            )
+    return True
+
+
+async def repost_and_reply(
+    twitter,
+    tweet: Dict,
+    reply: Union[str, Awaitable[str]],
+    reply_generator: Optional[AsyncReplyGenerator] = None
+) -> Tuple[Optional[str], List[Dict]]:
+    """
+    Repost `tweet` and reply to it with one navigation (see PlaywrightTwitterClient.engage).
+    `reply` may still be generating; it is awaited only once the repost is done, and an
+    "AI error" reply is not posted. Returns the reply text if it was posted, and the
+    per-action results.
+    """
+    async def usable_reply() -> Optional[str]:
+        text = await reply if inspect.isawaitable(reply) else reply
+        if "AI error" in text:
+            # Only the reply is skipped; the repost is logged if it succeeded.
+            print(f"[{twitter.username}] AI error: {text}")
+            return None
+        return text
+
+    text_task = asyncio.ensure_future(usable_reply())
+    actions = await twitter.engage(tweet['url'], ['repost', 'reply'], reply_text=text_task)
+    if actions[0]['success']:
+        print(f"[{twitter.username}] Reposted")
+    if not actions[1]['success']:
+        text_task.cancel()
+        return None, actions
+    ai_reply = text_task.result()
+    print(f"[{twitter.username}] Replied: {ai_reply}")
+    if reply_generator and reply_generator.cache:
+        await reply_generator.cache.discard(reply_cache_key(tweet.get('tweet_id'), tweet['content'], tweet['author']))
+    return ai_reply, actions
+
+
+async def engage_best_tweet(
+    twitter,
+    db_logger: TwitterDBLogger,
+    claims: Optional[TweetClaims] = None,
+    count: int = 20,
+    reply_generator: Optional[AsyncReplyGenerator] = None,
+    speculative_k: int = 2
+) -> Optional[Dict]:
+    """
+    Scrape the feed of a logged-in client, then repost and reply to the most viral tweet.
+    With a `reply_generator`, replies for the current top `speculative_k` tweets are generated
+    while the feed is still being scraped, and the chosen reply finishes during the repost.
+    Without one, the blocking generate_ai_reply runs in the default executor, as do DB writes,
+    so concurrent sessions keep going. Tweets the account already acted on are skipped
+    before scoring.
+    Returns the engaged tweet with its reply (None if it was not posted) and the per-action
+    results, or None when nothing was done.
+    """
+    loop = asyncio.get_running_loop()
+    acted = await loop.run_in_executor(None, ActedIndex.load, db_logger, twitter.username)
+    print(f"[{twitter.username}] Scraping feed....")
+    speculation = reply_generator.speculation() if reply_generator else None
+    if speculation:
+        tweets = []
+        async for tweet in twitter.iter_feed(limit=count):
+            if acted.filter([tweet]):
+                tweets.append(tweet)
+                speculation.speculate(select_top_viral(tweets, speculative_k))
+    else:
+        tweets = acted.filter(await twitter.scrape_feed(count=count))
+    if acted.filtered:
+        print(f"[{twitter.username}] Skipped {acted.filtered} tweets already acted on")
+
+    # Analyze and select most viral tweet
+    best_tweet = await pick_tweet(tweets, claims)
+    print(f"[{twitter.username}] Selected most viral tweet: {best_tweet}")
+    if not best_tweet:
+        print(f"[{twitter.username}] No tweets found.")
+        if speculation:
+            speculation.cancel()
+        return None
+
+    # Generate AI reply
+    if speculation:
+        reply_task = speculation.reply_for(best_tweet)
+        speculation.cancel()
+    else:
+        reply_task = loop.run_in_executor(None, generate_ai_reply, best_tweet['content'], best_tweet['author'])
+
+    # Repost while the reply is being generated, then reply on the same page load
+    ai_reply, actions = await repost_and_reply(twitter, best_tweet, reply_task, reply_generator)
+
+    if await loop.run_in_executor(None, record_engagement, db_logger, best_tweet, actions, ai_reply, twitter.username):
+        print(f"[{twitter.username}] Logged to DB")
+    else:
+        print(f"[{twitter.username}] No action succeeded, nothing logged")
+    return {'tweet': best_tweet, 'ai_reply': ai_reply, 'actions': actions}
@@ -0,0 +1,147 @@
+import json
+import time
+from typing import Dict, List, Optional
+from playwright.async_api import Locator, Page
+from twitter_bot.metrics import METRICS
+from twitter_bot.session_cache import _atomic_write_json
+
+# Fallback selectors per action, most specific first; the first one that matches is used.
+SELECTORS: Dict[str, List[str]] = {
+    'retweet': [
+        'div[data-testid="retweet"]',
+        '[data-testid="retweet"]',
+        'div[aria-label*="Retweet"]',
+        'div[aria-label*="Repost"]',
+        'div[role="button"][aria-label*="Retweet"]',
+        'div[role="button"][aria-label*="Repost"]'
+    ],
+    # Only inside the confirm menu: anything broader also matches the repost button itself,
+    # and clicking that again undoes the repost instead of confirming it.
+    'retweet_confirm': [
+        'div[data-testid="retweetConfirm"]',
+        '[data-testid="retweetConfirm"]',
+        '[role="menu"] [role="menuitem"][aria-label*="Retweet"]',
+        '[role="menu"] [role="menuitem"][aria-label*="Repost"]',
+        '[role="menu"] div[role="button"][aria-label*="Retweet"]',
+        '[role="menu"] div[role="button"][aria-label*="Repost"]'
+    ],
+    'reply': [
+        'div[data-testid="reply"]',
+        'button[data-testid="reply"]',
+        '[data-testid="reply"]',
+        'div[aria-label*="Reply"]',
+        'div[role="button"][aria-label*="Reply"]'
+    ],
+    'reply_textarea': [
+        'div[role="textbox"]',
+        '[data-testid="tweetTextarea_0_label"]',
+        'div[contenteditable="true"]',
+        'div[data-testid="tweetTextarea"]'
+    ],
+    'reply_send': [
+        'button[data-testid="tweetButton"]',
+        'div[data-testid="tweetButton"]',
+        '[data-testid="tweetButton"]',
+        'div[data-testid="tweetButtonInline"]',
+        'div[role="button"][aria-label*="Tweet"]'
+    ],
+    'like': [
+        'button[data-testid="like"]',
+        'div[data-testid="like"]',
+        '[data-testid="like"]',
+        'div[role="button"][aria-label*="Like"]'
+    ],
+    'bookmark': [
+        'button[data-testid="bookmark"]',
+        'div[data-testid="bookmark"]',
+        '[data-testid="bookmark"]',
+        'div[role="button"][aria-label*="Bookmark"]'
+    ]
+}
+
+# Indices of the candidates that match at least one element, checked in one page round trip.
+MATCH_SELECTORS_JS = """
+(selectors) => selectors.flatMap((selector, i) => {
+    try {
+        return document.querySelector(selector) ? [i] : [];
+    } catch (e) {
+        return [];
+    }
+})
+"""
+
+
+class SelectorResolver:
+    """
+    Finds the element for an action (see SELECTORS) with a single DOM query over all of its
+    fallback selectors instead of one query_selector round trip per candidate. The first
+    candidate in SELECTORS order that matches wins, whatever matched before: a fallback is
+    broader than the selectors ahead of it, so promoting it could pick the wrong element.
+
+    Hit and miss counts per action and selector are kept for drift reporting, and persisted
+    to `stats_path` when given. A selector that used to match and has missed
+    `drift_threshold` lookups in a row is reported as drifted.
+    """
+    def __init__(self, stats_path: Optional[str] = None, drift_threshold: int = 3):
+        self.stats_path = stats_path
+        self.drift_threshold = drift_threshold
+        self.stats: Dict[str, Dict[str, Dict]] = self._load()
+        self.metrics = {'lookups': 0, 'misses': 0, 'drift_events': 0}
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not self.stats_path:
+            return {}
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        if self.stats_path:
+            _atomic_write_json(self.stats_path, self.stats)
+
+    async def match(self, page: Page, action: str) -> Optional[str]:
+        """The first candidate of `action` that matches on `page`, or None if nothing matches."""
+        candidates = SELECTORS[action]
+        matched = set(await page.evaluate(MATCH_SELECTORS_JS, candidates))
+        self.record(action, candidates, matched)
+        return candidates[min(matched)] if matched else None
+
+    async def resolve(self, page: Page, action: str) -> Optional[Locator]:
+        """Locator for the first matching candidate of `action`, or None if nothing matches."""
+        selector = await self.match(page, action)
+        return page.locator(selector).first if selector else None
+
+    def record(self, action: str, candidates: List[str], matched) -> None:
+        """Update hit/miss counts for one lookup; `matched` holds indices into `candidates`."""
+        self.metrics['lookups'] += 1
+        if not matched:
+            self.metrics['misses'] += 1
+        METRICS.count('selector_lookups', action=action, result='hit' if matched else 'miss')
+        stats = self.stats.setdefault(action, {})
+        first = min(matched) if matched else None
+        for i, selector in enumerate(candidates):
+            entry = stats.setdefault(selector, {'hits': 0, 'matches': 0, 'missed_in_row': 0, 'last_match': None})
+            if i in matched:
+                entry['matches'] += 1
+                entry['missed_in_row'] = 0
+                entry['last_match'] = time.time()
+                if i == first:
+                    entry['hits'] += 1
+                continue
+            entry['missed_in_row'] += 1
+            if entry['matches'] and entry['missed_in_row'] == self.drift_threshold:
+                self.metrics['drift_events'] += 1
+                print(f"Selector drift: {action} selector {selector!r} stopped matching "
+                      f"after {entry['matches']} matches")
+
+    def drift(self) -> List[Dict]:
+        """Selectors that used to match and have missed `drift_threshold` or more lookups in a row."""
+        return [
+            {'action': action, 'selector': selector, 'matches': entry['matches'], 'missed_in_row': entry['missed_in_row']}
+            for action, stats in self.stats.items()
+            for selector, entry in stats.items()
+            if entry['matches'] and entry['missed_in_row'] >= self.drift_threshold
+        ]
+
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers of shared files are not serialised between processes
+    fcntl = None
+
+
+def _atomic_write_json(path: str, data: Dict) -> None:
+    """Write JSON to a temp file in the same directory and rename it over `path`."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path` (created if missing) for processes sharing a cache directory."""
+    with open(path, 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+class SessionCache:
+    """
+    On-disk cache of Playwright `storage_state` per (account, proxy), so a run can skip login().
+    Entries older than `max_age` seconds are treated as missing. Hit/miss counts and the
+    measured cost of a full login are kept in `stats.json` to report time saved per run; each
+    update is merged into the file under a lock, so sharded processes do not lose each other's counts.
+    """
+    def __init__(self, cache_dir: str = '.session_cache', max_age: float = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        self.stats_path = os.path.join(cache_dir, 'stats.json')
+        self.stats_lock_path = os.path.join(cache_dir, 'stats.lock')
+        self.stats = self._load_stats()
+
+    def _path(self, username: str, proxy: Optional[str]) -> str:
+        key = hashlib.sha256(f"{username}|{proxy or ''}".encode()).hexdigest()[:24]
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def load(self, username: str, proxy: Optional[str] = None) -> Optional[Dict]:
+        """Return the cached storage_state, or None if it is missing, unreadable or expired."""
+        try:
+            with open(self._path(username, proxy)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('saved_at', 0) > self.max_age:
+            return None
+        return entry.get('storage_state')
+
+    def save(self, username: str, proxy: Optional[str], storage_state: Dict) -> None:
+        _atomic_write_json(self._path(username, proxy), {'saved_at': time.time(), 'storage_state': storage_state})
+
+    def invalidate(self, username: str, proxy: Optional[str] = None) -> None:
+        try:
+            os.remove(self._path(username, proxy))
+        except FileNotFoundError:
+            pass
+
+    def _load_stats(self) -> Dict:
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'hits': 0, 'misses': 0, 'logins': 0, 'login_seconds': 0.0, 'saved_seconds': 0.0}
+
+    @property
+    def avg_login_seconds(self) -> float:
+        return self.stats['login_seconds'] / self.stats['logins'] if self.stats['logins'] else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+
+    def _add_stats(self, **deltas: float) -> None:
+        """Add `deltas` to the counts on disk (re-read under the lock) and keep the merged result."""
+        with _file_lock(self.stats_lock_path):
+            self.stats = self._load_stats()
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+            _atomic_write_json(self.stats_path, self.stats)
+
+    def record_hit(self, check_seconds: float) -> float:
+        """Record a restored session; returns the estimated seconds saved versus a full login."""
+        saved = max(self.avg_login_seconds - check_seconds, 0.0)
+        self._add_stats(hits=1, saved_seconds=saved)
+        return saved
+
+    def record_miss(self, login_seconds: float) -> None:
+        self._add_stats(misses=1, logins=1, login_seconds=login_seconds)
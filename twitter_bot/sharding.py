@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+import uuid
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from twitter_bot.ai_reply import AsyncReplyGenerator
+from twitter_bot.browser_pool import BrowserPool
+from twitter_bot.db import TwitterDBLogger
+from twitter_bot.memory_governor import governor_from_env
+from twitter_bot.metrics import METRICS
+from twitter_bot.orchestrator import Orchestrator, load_roster, roster_proxy_pool
+from twitter_bot.resource_policy import policy_from_env
+from twitter_bot.reply_cache import ReplyCache
+from twitter_bot.selector_resolver import SelectorResolver
+from twitter_bot.session_cache import SessionCache
+from twitter_bot.work_queue import DBTweetClaims, WorkQueue
+
+
+def worker_main(worker_id: str, run_id: str, roster_path: str, db_url: str, concurrency: int, stats_queue):
+    """Entry point of a worker process: its own event loop, browser and DB engine."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor turns Ctrl-C into SIGTERM
+    # Worker "w<n>" exports its metrics on METRICS_PORT + n + 1 (the supervisor keeps METRICS_PORT free).
+    METRICS.configure_from_env(instance=int(worker_id.lstrip('w')) + 1)
+    try:
+        asyncio.run(_worker(worker_id, run_id, roster_path, db_url, concurrency, stats_queue))
+    finally:
+        METRICS.close()
+
+
+async def _worker(worker_id: str, run_id: str, roster_path: str, db_url: str, concurrency: int, stats_queue):
+    draining = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, draining.set)
+    accounts = load_roster(roster_path)
+    roster = {account['username']: account for account in accounts}
+    db_logger = TwitterDBLogger(db_url)
+    work = WorkQueue(db_logger, run_id)
+    claims = DBTweetClaims(work, worker_id)
+    session_cache = SessionCache(os.getenv('SESSION_CACHE_DIR', '.session_cache'))
+    reply_generator = AsyncReplyGenerator(cache=ReplyCache(db_logger))
+    selectors = SelectorResolver(os.path.join(session_cache.cache_dir, 'selectors.json'))
+    proxy_pool = roster_proxy_pool(accounts, session_cache.cache_dir)
+    if proxy_pool:
+        await proxy_pool.probe_all()
+    resource_policy = policy_from_env(session_cache.cache_dir)
+    memory_governor = governor_from_env()
+    async with BrowserPool(os.getenv('BROWSER_ENDPOINT'), size=0) as pool, reply_generator:
+        # Drain: finish the batch in flight, then stop claiming once SIGTERM arrives.
+        while not draining.is_set():
+            items = work.claim(worker_id, limit=concurrency)
+            if not items:
+                break
+            start = time.monotonic()
+            known = [item for item in items if item['account'] in roster]
+            for item in items:
+                if item['account'] not in roster:
+                    work.complete(item['id'], error='account missing from roster')
+            orchestrator = Orchestrator(
+                [roster[item['account']] for item in known],
+                db_logger,
+                concurrency=concurrency,
+                browser_pool=pool,
+                session_cache=session_cache,
+                claims=claims,
+                reply_generator=reply_generator,
+                selectors=selectors,
+                proxy_pool=proxy_pool,
+                resource_policy=resource_policy,
+                memory_governor=memory_governor
+            )
+            results = await orchestrator.run()
+            for item, result in zip(known, results):
+                work.complete(item['id'], error=result['error'] if result['status'] == 'failed' else None)
+            stats_queue.put({
+                'worker': worker_id,
+                'accounts': len(items),
+                'engaged': sum(1 for r in results if r['status'] == 'engaged'),
+                'failed': len(items) - len(known) + sum(1 for r in results if r['status'] == 'failed'),
+                'seconds': time.monotonic() - start
+            })
+    db_logger.close()
+
+
+class ShardSupervisor:
+    """
+    Shards a roster across `workers` processes that pull accounts from a WorkQueue.
+    A worker that exits while work is left is restarted, up to `max_restarts` times, and its
+    unfinished claims are requeued. If every worker has stopped (without a drain) while accounts
+    are still pending, those are marked failed and counted in `unfinished`. restart_worker()
+    drains one worker gracefully and starts a replacement, and drain() lets every worker finish
+    its current batch before stopping.
+    """
+    def __init__(
+        self,
+        roster_path: str,
+        db_url: str,
+        workers: int = 2,
+        concurrency: int = 4,
+        run_id: Optional[str] = None,
+        max_restarts: int = 3
+    ):
+        self.roster_path = roster_path
+        self.db_url = db_url
+        self.workers = workers
+        self.concurrency = concurrency
+        self.run_id = run_id or uuid.uuid4().hex
+        self.max_restarts = max_restarts
+        self._ctx = multiprocessing.get_context('spawn')
+        self._stats_queue = self._ctx.Queue()
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self._draining = False
+        self._restart_requested = set()
+        self._db_logger = TwitterDBLogger(db_url)
+        self.work = WorkQueue(self._db_logger, self.run_id)
+        self.stats: Dict[str, Dict] = {}
+        self.unfinished = 0
+
+    def _start_worker(self, worker_id: str):
+        process = self._ctx.Process(
+            target=worker_main,
+            args=(worker_id, self.run_id, self.roster_path, self.db_url, self.concurrency, self._stats_queue),
+            name=f"twitter-worker-{worker_id}"
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self.stats.setdefault(worker_id, {'accounts': 0, 'engaged': 0, 'failed': 0, 'seconds': 0.0, 'restarts': 0})
+        print(f"Started worker {worker_id} (pid {process.pid})")
+
+    def restart_worker(self, worker_id: str):
+        """Ask one worker to drain; the supervise loop starts its replacement once it exits."""
+        process = self._processes.get(worker_id)
+        if process and process.is_alive():
+            self._restart_requested.add(worker_id)
+            os.kill(process.pid, signal.SIGTERM)
+
+    def restart_all(self):
+        for worker_id in list(self._processes):
+            self.restart_worker(worker_id)
+
+    def drain(self):
+        """Stop every worker after its current batch; nothing is restarted afterwards."""
+        self._draining = True
+        for process in self._processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    def _collect_stats(self):
+        while True:
+            try:
+                batch = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            totals = self.stats[batch['worker']]
+            for key in ('accounts', 'engaged', 'failed', 'seconds'):
+                totals[key] += batch[key]
+
+    def run(self) -> Dict[str, Dict]:
+        """Enqueue the roster, supervise workers until the queue is empty, return per-worker stats."""
+        accounts = [account['username'] for account in load_roster(self.roster_path)]
+        self.work.enqueue(accounts)
+        print(f"Run {self.run_id}: {len(accounts)} accounts across {self.workers} workers")
+        for i in range(self.workers):
+            self._start_worker(f"w{i}")
+        while self._processes:
+            time.sleep(0.5)
+            self._collect_stats()
+            for worker_id, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del self._processes[worker_id]
+                requeued = self.work.requeue(worker_id=worker_id)
+                if requeued:
+                    print(f"Worker {worker_id} exited ({process.exitcode}), requeued {requeued} accounts")
+                requested = worker_id in self._restart_requested
+                self._restart_requested.discard(worker_id)
+                crashed = process.exitcode != 0
+                if crashed and self.stats[worker_id]['restarts'] >= self.max_restarts:
+                    print(f"Worker {worker_id} keeps failing, not restarting it")
+                elif not self._draining and (crashed or requested) and self.work.pending_count():
+                    if crashed:
+                        self.stats[worker_id]['restarts'] += 1
+                    self._start_worker(worker_id)
+        self._collect_stats()
+        if not self._draining:
+            # Workers that gave up leave their requeued accounts behind with nobody to claim them.
+            self.unfinished = self.work.fail_unfinished('no worker left to run it')
+            if self.unfinished:
+                print(f"Run {self.run_id}: {self.unfinished} accounts left unfinished after every worker stopped")
+        self._db_logger.close()
+        return self.stats
+
+
+def print_stats(stats: Dict[str, Dict]):
+    for worker_id, s in sorted(stats.items()):
+        rate = s['accounts'] / s['seconds'] * 60 if s['seconds'] else 0.0
+        print(f"{worker_id}: {s['accounts']} accounts, {s['engaged']} engaged, {s['failed']} failed, "
+              f"{s['restarts']} restarts, {rate:.1f} accounts/min")
+    total = sum(s['accounts'] for s in stats.values())
+    print(f"total: {total} accounts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard accounts across worker processes.")
+    parser.add_argument('--accounts', default=os.getenv('ACCOUNTS_FILE', 'accounts.json'), help="JSON account roster")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('CONCURRENCY', '4')), help="sessions per worker")
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("Error: Please set the DATABASE_URL environment variable.")
+        sys.exit(1)
+
+    supervisor = ShardSupervisor(args.accounts, db_url, workers=args.workers, concurrency=args.concurrency)
+    signal.signal(signal.SIGINT, lambda signum, frame: supervisor.drain())
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.drain())
+    # SIGHUP drains and restarts every worker, e.g. after a deploy.
+    signal.signal(signal.SIGHUP, lambda signum, frame: supervisor.restart_all())
+    print_stats(supervisor.run())
+    if supervisor.unfinished:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()
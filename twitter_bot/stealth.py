@@ -0,0 +1,41 @@
+# Browser fingerprint settings shared by every page the bot drives.
+
+# Default Chromium args Playwright would add that make headless browsers easier to spot.
+IGNORE_DEFAULT_ARGS = [
+    '--disable-extensions',
+    '--disable-default-apps',
+    '--disable-component-extensions-with-background-pages'
+]
+
+INIT_SCRIPTS = [
+    "Object.defineProperty(navigator, 'webdriver', {get: () => false})",
+    "Object.defineProperty(Notification, 'permission', {get: () => 'default'})"
+]
+
+USER_AGENT = {
+    "userAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/74.0.3729.169 Safari/537.36",
+    "platform": "Win32",
+    "acceptLanguage": "en-US, en",
+    "userAgentMetadata": {
+        "brands": [
+            {"brand": " Not A;Brand", "version": "99"},
+            {"brand": "Chromium", "version": "74"},
+            {"brand": "Google Chrome", "version": "74"},
+        ],
+        "fullVersion": "74.0.3729.169",
+        "platform": "Windows",
+        "platformVersion": "10.0",
+        "architecture": "x86",
+        "model": "",
+        "mobile": False,
+    },
+}
+
+
+async def apply_stealth(page):
+    """Install the init scripts and the CDP user-agent override on a fresh page."""
+    for script in INIT_SCRIPTS:
+        await page.add_init_script(script)
+    cdp = await page.context.new_cdp_session(page)
+    await cdp.send('Network.setUserAgentOverride', USER_AGENT)
+    return cdp
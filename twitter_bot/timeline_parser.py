@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# GraphQL operations whose responses carry timeline tweets.
+TIMELINE_OPERATIONS = ('HomeTimeline', 'HomeLatestTimeline', 'TweetDetail')
+
+
+def is_timeline_response(url: str) -> bool:
+    """Return True for GraphQL timeline endpoints such as /i/api/graphql/<id>/HomeTimeline."""
+    if '/graphql/' not in url:
+        return False
+    operation = url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+    return operation in TIMELINE_OPERATIONS
+
+
+def parse_timeline(payload: Dict[str, Any], base_url: str = 'https://twitter.com') -> List[Dict]:
+    """
+    Parse a HomeTimeline/TweetDetail JSON payload into the tweet dicts returned by scrape_feed.
+    IDs, timestamps and engagement counts are taken verbatim from the payload.
+    """
+    tweets = []
+    for result in _iter_tweet_results(payload):
+        tweet = _parse_tweet_result(result, base_url)
+        if tweet:
+            tweets.append(tweet)
+    return tweets
+
+
+def _iter_tweet_results(node: Any) -> Iterator[Dict]:
+    """Yield every `tweet_results.result` object, wherever it sits in the instruction tree."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == 'tweet_results' and isinstance(value, dict):
+                if isinstance(value.get('result'), dict):
+                    yield value['result']
+            else:
+                yield from _iter_tweet_results(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _iter_tweet_results(item)
+
+
+def _parse_tweet_result(result: Dict, base_url: str) -> Optional[Dict]:
+    if result.get('__typename') == 'TweetWithVisibilityResults':
+        result = result.get('tweet') or {}
+    legacy = result.get('legacy')
+    tweet_id = result.get('rest_id') or (legacy or {}).get('id_str')
+    if not legacy or not tweet_id:
+        return None
+    user = (((result.get('core') or {}).get('user_results') or {}).get('result')) or {}
+    handle = (user.get('core') or {}).get('screen_name') or (user.get('legacy') or {}).get('screen_name') or ''
+    note = ((((result.get('note_tweet') or {}).get('note_tweet_results')) or {}).get('result')) or {}
+    return {
+        'content': note.get('text') or legacy.get('full_text') or '',
+        'author': handle,
+        'url': f'{base_url}/{handle or "i/web"}/status/{tweet_id}',
+        'tweet_id': str(tweet_id),
+        'created_at': _parse_created_at(legacy.get('created_at')),
+        'likes': int(legacy.get('favorite_count') or 0),
+        'retweets': int(legacy.get('retweet_count') or 0),
+        'replies': int(legacy.get('reply_count') or 0)
+    }
+
+
+def _parse_created_at(value: Optional[str]) -> Optional[datetime]:
+    """Parse Twitter's legacy timestamp format, e.g. 'Wed Jul 09 18:02:11 +0000 2025'."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%a %b %d %H:%M:%S %z %Y')
+    except ValueError:
+        return None
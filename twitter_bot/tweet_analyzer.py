@@ -1,33 +1,178 @@
 from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from twitter_bot.db import Tweet, TwitterDBLogger
+from twitter_bot.metrics import METRICS
 
+DEFAULT_WEIGHTS = {'retweets': 2.5, 'likes': 1.0, 'replies': 0.5}
+
+
+def viral_score(t: Dict, now: Optional[datetime] = None) -> float:
+    """
+    Weighted, time-normalized score:
+    score = (retweets * 2.5 + likes + replies * 0.5) / age_in_minutes
+    Falls back gracefully if created_at is missing or malformed.
+    """
+    likes = t.get('likes', 0)
+    retweets = t.get('retweets', 0)
+    replies = t.get('replies', 0)
+    created_at = t.get('created_at')
+    age_minutes = 1
+    if created_at:
+        dt = None
+        if isinstance(created_at, datetime):
+            dt = created_at
+        elif isinstance(created_at, str):
+            try:
+                dt = datetime.fromisoformat(created_at)
+            except Exception:
+                dt = None
+        if dt:
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            now = now or datetime.now(timezone.utc)
+            age_minutes = (now - dt).total_seconds() / 60
+            age_minutes = max(age_minutes, 1)
+    # Weighted score
+    return (retweets * 2.5 + likes + replies * 0.5) / age_minutes
+
+
+def _epoch_seconds(created_at) -> float:
+    """created_at as UTC epoch seconds (naive values are UTC); NaN if missing or malformed."""
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            return np.nan
+    if not isinstance(created_at, datetime):
+        return np.nan
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def tweet_columns(metrics: Sequence[Dict], created_at: Sequence, names: Iterable[str] = DEFAULT_WEIGHTS) -> Dict[str, np.ndarray]:
+    """
+    Columnar arrays for ViralRanker: one float64 array per engagement count in `names` (pass
+    the ranker's weights; read from the `metrics` dicts, missing counts are 0) plus
+    'created_at' as epoch seconds.
+    """
+    n = len(metrics)
+    columns = {
+        name: np.fromiter((m.get(name) or 0 for m in metrics), dtype=np.float64, count=n)
+        for name in names
+    }
+    # Inline fast path for aware datetimes (what scrape_feed returns); a call per value costs more than the conversion.
+    columns['created_at'] = np.fromiter(
+        (c.timestamp() if type(c) is datetime and c.tzinfo else _epoch_seconds(c) for c in created_at),
+        dtype=np.float64,
+        count=n
+    )
+    return columns
+
+
+class ViralRanker:
+    """
+    Vectorized viral scoring over columnar arrays:
+    score = sum(weight * count) / max(age_in_minutes, min_age_minutes) ** decay
+    The defaults give the same scores as viral_score. Every tweet in a call is aged against
+    one shared `now`, and a tweet without a usable created_at counts as one minute old.
+    """
+    def __init__(self, weights: Optional[Dict[str, float]] = None, decay: float = 1.0, min_age_minutes: float = 1.0):
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.decay = decay
+        self.min_age_minutes = min_age_minutes
+
+    def scores(self, columns: Dict[str, np.ndarray], now: Optional[datetime] = None) -> np.ndarray:
+        now = now or datetime.now(timezone.utc)
+        engagement = np.zeros(len(columns['created_at']))
+        for name, weight in self.weights.items():
+            engagement += weight * columns[name]
+        age = (now.timestamp() - columns['created_at']) / 60
+        age = np.where(np.isnan(age), 1.0, np.maximum(age, self.min_age_minutes))
+        return engagement / age ** self.decay
+
+    @staticmethod
+    def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the `k` highest scores, best first; ties keep input order."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k == 1:
+            return np.array([np.argmax(scores)])
+        idx = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        return idx[np.lexsort((idx, -scores[idx]))]
+
+    def top_k(self, tweets: List[Dict], k: int, now: Optional[datetime] = None) -> List[Dict]:
+        """The `k` highest-scoring tweet dicts, best first."""
+        if not tweets:
+            return []
+        columns = tweet_columns(tweets, [t.get('created_at') for t in tweets], self.weights)
+        return [tweets[i] for i in self.top_indices(self.scores(columns, now), k)]
+
+    def rank(self, tweets: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """All of `tweets`, best first."""
+        return self.top_k(tweets, len(tweets), now)
+
+    def top_k_chunks(
+        self,
+        chunks: Iterable[Tuple[List, Dict[str, np.ndarray]]],
+        k: int,
+        now: Optional[datetime] = None
+    ) -> List[Tuple[float, object]]:
+        """
+        Running top-k over (keys, columns) chunks, e.g. rows streamed from the tweets table.
+        Only the current best `k` are kept between chunks; returns (score, key) pairs, best first.
+        """
+        now = now or datetime.now(timezone.utc)
+        best_keys: List = []
+        best_scores = np.empty(0)
+        for keys, columns in chunks:
+            scores = np.concatenate([best_scores, self.scores(columns, now)])
+            keys = best_keys + list(keys)
+            idx = self.top_indices(scores, k)
+            best_keys = [keys[i] for i in idx]
+            best_scores = scores[idx]
+        return list(zip(best_scores.tolist(), best_keys))
+
+
+def _table_chunks(result, chunk_size: int, names: Iterable[str]) -> Iterator[Tuple[List[str], Dict[str, np.ndarray]]]:
+    for rows in result.partitions(chunk_size):
+        tweet_ids, created_at, metadata = zip(*rows)
+        yield list(tweet_ids), tweet_columns([m or {} for m in metadata], created_at, names)
+
+
+def rank_tweets_table(
+    db_logger: TwitterDBLogger,
+    k: int = 10,
+    chunk_size: int = 50000,
+    ranker: Optional[ViralRanker] = None,
+    now: Optional[datetime] = None
+) -> List[Tuple[float, str]]:
+    """
+    (score, tweet_id) of the `k` most viral tweets in the tweets table, best first.
+    Rows are streamed with a server-side cursor and scored `chunk_size` at a time.
+    """
+    ranker = ranker or ViralRanker()
+    table = Tweet.__table__
+    stmt = select(table.c.tweet_id, table.c.created_at, table.c.metadata)
+    with db_logger.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        return ranker.top_k_chunks(_table_chunks(result, chunk_size, ranker.weights), k, now)
+
+
+@METRICS.timed('select_most_viral')
 def select_most_viral(tweets):
     """
     Select the most viral tweet using a weighted, time-normalized score:
     score = (retweets * 2.5 + likes + replies * 0.5) / age_in_minutes
     Falls back gracefully if created_at is missing or malformed.
     """
-    def score(t):
-        likes = t.get('likes', 0)
-        retweets = t.get('retweets', 0)
-        replies = t.get('replies', 0)
-        created_at = t.get('created_at')
-        age_minutes = 1
-        if created_at:
-            dt = None
-            if isinstance(created_at, datetime):
-                dt = created_at
-            elif isinstance(created_at, str):
-                try:
-                    dt = datetime.fromisoformat(created_at)
-                except Exception:
-                    dt = None
-            if dt:
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                now = datetime.now(timezone.utc)
-                age_minutes = (now - dt).total_seconds() / 60
-                age_minutes = max(age_minutes, 1)
-        # Weighted score
-        return (retweets * 2.5 + likes + replies * 0.5) / age_minutes
-
-    return max(tweets, key=score) if tweets else None 
\ No newline at end of file
+    return ViralRanker().top_k(tweets, 1)[0] if tweets else None
+
+
+@METRICS.timed('select_top_viral')
+def select_top_viral(tweets: List[Dict], k: int) -> List[Dict]:
+    """The `k` most viral tweets, best first, scored against one shared 'now'."""
+    return ViralRanker().top_k(tweets, k)
@@ -0,0 +1,214 @@
+"""
+Human-like typing with few protocol calls.
+
+People type in bursts: a few words at a steady rhythm, then a pause. plan_keys() precomputes
+such a schedule for a text, key by key: word-aligned bursts with a log-normal tempo each,
+faster common bigrams, slower keys after spaces, punctuation and capitals, occasional
+thinking pauses at word boundaries and typos that are noticed and corrected with Backspace.
+plan_typing() turns it into a few keyboard.type(run, delay=...) calls: a run ends at every
+slower transition (a new word, punctuation, a capital, a pause, a typo), whose interval is
+kept exactly as a sleep before the next call, and the keys inside a run share one delay,
+the mean of their planned intervals. So a reply costs about one call per word instead of
+one per character, and the events stay real key presses.
+"""
+import asyncio
+import math
+import random
+import re
+from typing import List, NamedTuple, Optional
+from playwright.async_api import Page
+from twitter_bot.metrics import METRICS
+
+# Frequent English bigrams are typed faster than the average pair of keys.
+FAST_BIGRAMS = {
+    'th', 'he', 'in', 'er', 'an', 're', 'on', 'at', 'en', 'nd', 'ti', 'es', 'or', 'te', 'of',
+    'ed', 'is', 'it', 'al', 'ar', 'st', 'to', 'nt', 'ng', 'se', 'ha', 'as', 'ou', 'io', 'le'
+}
+
+# Neighbouring keys on a QWERTY layout, used to pick plausible typos.
+QWERTY_ROWS = ['qwertyuiop', 'asdfghjkl', 'zxcvbnm']
+NEIGHBOURS = {}
+for _r, _row in enumerate(QWERTY_ROWS):
+    for _c, _key in enumerate(_row):
+        NEIGHBOURS[_key] = ''.join(
+            QWERTY_ROWS[r][c]
+            for r in range(max(_r - 1, 0), min(_r + 2, len(QWERTY_ROWS)))
+            for c in range(_c - 1, _c + 2)
+            if 0 <= c < len(QWERTY_ROWS[r]) and (r, c) != (_r, _c)
+        )
+
+
+class Key(NamedTuple):
+    """One planned key: a character, or a key name such as 'Backspace' if `named`."""
+    key: str
+    before: float  # ms since the previous key
+    named: bool = False
+    boundary: bool = False  # slower than the keys before it, so it starts a new call
+
+
+class Burst(NamedTuple):
+    """Keys sent with one call: wait `pause` ms, then type `text` (or press `text` if `key`), each key followed by `delay` ms."""
+    pause: float
+    text: str
+    delay: float
+    key: bool = False
+
+
+class TypingProfile(NamedTuple):
+    mean_delay: float = 55.0        # ms between two ordinary keys (the old per-character loop used 30-80)
+    jitter: float = 0.35            # sigma of the log-normal tempo of a burst
+    words_per_burst: float = 2.0    # mean burst length in words
+    max_burst: int = 40             # keys per burst at most
+    typo_rate: float = 0.02         # chance of a corrected typo per letter
+    pause_rate: float = 0.08        # chance of a thinking pause before a burst
+    pause_range: tuple = (300.0, 1200.0)
+    correction_pause: tuple = (150.0, 400.0)  # ms before the Backspace that fixes a typo
+
+
+DEFAULT_PROFILE = TypingProfile()
+
+
+def scale_profile(profile: TypingProfile, scale: float) -> TypingProfile:
+    """The same rhythm `scale` times as slow (0 types at machine speed)."""
+    if scale == 1:
+        return profile
+    return profile._replace(
+        mean_delay=profile.mean_delay * scale,
+        pause_range=tuple(ms * scale for ms in profile.pause_range),
+        correction_pause=tuple(ms * scale for ms in profile.correction_pause)
+    )
+
+
+def _key_factor(prev: str, char: str) -> float:
+    """Relative delay before typing `char` after `prev`."""
+    factor = 1.0
+    if (prev + char).lower() in FAST_BIGRAMS:
+        factor *= 0.7
+    if prev == ' ':
+        factor *= 1.3
+    elif prev in '.,!?;:':
+        factor *= 2.0
+    if char.isupper():
+        factor *= 1.2
+    return factor
+
+
+def _split_words(text: str, max_burst: int) -> List[str]:
+    """Words with their trailing whitespace; words longer than `max_burst` are split."""
+    words = re.findall(r'\S*\s*', text)[:-1] or [text]
+    return [word[i:i + max_burst] for word in words for i in range(0, len(word), max_burst)]
+
+
+def plan_keys(text: str, profile: TypingProfile = DEFAULT_PROFILE, rng: Optional[random.Random] = None) -> List[Key]:
+    """Every key that types `text`, including corrected typos, with its planned interval."""
+    rng = rng or random.Random()
+    sigma = profile.jitter
+    words = _split_words(text, profile.max_burst)
+    keys: List[Key] = []
+    prev = ''
+    i = 0
+    while i < len(words):
+        # Geometric number of words per burst, capped at max_burst keys.
+        chunk = words[i]
+        i += 1
+        while i < len(words) and rng.random() > 1 / profile.words_per_burst and len(chunk + words[i]) <= profile.max_burst:
+            chunk += words[i]
+            i += 1
+        # One tempo per burst (log-normal with mean 1), scaled per key by its bigram factor.
+        tempo = profile.mean_delay * rng.lognormvariate(-sigma * sigma / 2, sigma)
+        delays = [tempo * _key_factor(a, b) for a, b in zip((prev or '\0') + chunk, chunk)]
+        if keys and rng.random() < profile.pause_rate:
+            delays[0] += rng.uniform(*profile.pause_range)
+        typo_at = None
+        letters = [j for j, char in enumerate(chunk) if char.lower() in NEIGHBOURS]
+        if letters and rng.random() < 1 - (1 - profile.typo_rate) ** len(letters):
+            typo_at = rng.choice(letters)
+        for j, char in enumerate(chunk):
+            # A new burst (new tempo), a thinking pause or a slow bigram starts a new call.
+            boundary = j == 0 or delays[j] > tempo
+            if j == typo_at:
+                # Hit a wrong neighbouring key, notice it, erase it and carry on.
+                typo = rng.choice(NEIGHBOURS[char.lower()])
+                keys.append(Key(typo.upper() if char.isupper() else typo, delays[j], boundary=boundary))
+                keys.append(Key('Backspace', rng.uniform(*profile.correction_pause), named=True))
+                boundary = True
+            keys.append(Key(char, delays[j], boundary=boundary))
+        prev = chunk[-1]
+    return keys
+
+
+def plan_typing(text: str, profile: TypingProfile = DEFAULT_PROFILE, rng: Optional[random.Random] = None) -> List[Burst]:
+    """
+    Call schedule that types `text`: one call per run of characters between two boundary keys
+    (at most max_burst long), typed at the mean of the run's planned intervals; boundary keys
+    keep their planned interval through the pause before their call.
+    """
+    keys = plan_keys(text, profile, rng)
+    bursts: List[Burst] = []
+    carry = 0.0  # delay Playwright waits after the last key of the previous call
+    i = 0
+    while i < len(keys):
+        pause = max(keys[i].before - carry, 0.0)
+        if keys[i].named:
+            bursts.append(Burst(pause, keys[i].key, 0.0, key=True))
+            carry, i = 0.0, i + 1
+            continue
+        j = i + 1
+        while j < len(keys) and not keys[j].named and not keys[j].boundary and j - i < profile.max_burst:
+            j += 1
+        inner = [key.before for key in keys[i + 1:j]]
+        delay = sum(inner) / len(inner) if inner else 0.0
+        bursts.append(Burst(pause, ''.join(key.key for key in keys[i:j]), delay))
+        carry, i = delay, j
+    return bursts
+
+
+def burst_intervals(bursts: List[Burst]) -> List[float]:
+    """Planned delay in ms before every key of a schedule."""
+    intervals = []
+    carry = 0.0
+    for burst in bursts:
+        intervals.append(carry + burst.pause)
+        if not burst.key:
+            intervals.extend([burst.delay] * (len(burst.text) - 1))
+        carry = burst.delay
+    return intervals
+
+
+def schedule_stats(intervals: List[float]) -> dict:
+    """Mean, standard deviation and p10/p50/p90 of inter-key intervals in ms."""
+    if not intervals:
+        return {'count': 0, 'mean': 0.0, 'stdev': 0.0, 'p10': 0.0, 'p50': 0.0, 'p90': 0.0}
+    ordered = sorted(intervals)
+    mean = sum(ordered) / len(ordered)
+
+    def pct(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+    return {
+        'count': len(ordered),
+        'mean': mean,
+        'stdev': math.sqrt(sum((x - mean) ** 2 for x in ordered) / len(ordered)),
+        'p10': pct(0.1),
+        'p50': pct(0.5),
+        'p90': pct(0.9)
+    }
+
+
+async def type_text(
+    page: Page,
+    text: str,
+    profile: TypingProfile = DEFAULT_PROFILE,
+    rng: Optional[random.Random] = None
+) -> List[Burst]:
+    """Type `text` into the focused element burst by burst; returns the bursts that were sent."""
+    bursts = plan_typing(text, profile, rng)
+    for burst in bursts:
+        if burst.pause:
+            with METRICS.idle():
+                await asyncio.sleep(burst.pause / 1000)
+        if burst.key:
+            await page.keyboard.press(burst.text, delay=burst.delay)
+        else:
+            await page.keyboard.type(burst.text, delay=burst.delay)
+    return bursts
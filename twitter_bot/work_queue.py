@@ -0,0 +1,222 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import select, update, and_
+from sqlalchemy.exc import IntegrityError
+from twitter_bot.db import ScheduledAction, TweetClaim, TwitterDBLogger, WorkItem
+
+
+def _utc(value: datetime) -> datetime:
+    """TIMESTAMP columns come back naive (in UTC); make them comparable with aware datetimes."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class WorkQueue:
+    """
+    DB-backed queue of accounts for one sharded launch (`run_id`), shared by worker processes.
+
+    Claims use UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING on
+    PostgreSQL, so concurrent workers never block on or double-claim a row. SQLite ignores
+    the locking clause, and the single UPDATE ... RETURNING is atomic there because SQLite
+    serialises writers.
+    """
+    def __init__(self, db_logger: TwitterDBLogger, run_id: str):
+        self.engine = db_logger.engine
+        self._insert = db_logger._insert
+        self.run_id = run_id
+
+    def enqueue(self, accounts: Iterable[str]) -> int:
+        rows = [{'run_id': self.run_id, 'account': account, 'status': 'pending'} for account in accounts]
+        if rows:
+            with self.engine.begin() as conn:
+                conn.execute(WorkItem.__table__.insert(), rows)
+        return len(rows)
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        """Claim up to `limit` pending accounts for `worker_id`."""
+        table = WorkItem.__table__
+        pending = (
+            select(table.c.id)
+            .where(and_(table.c.run_id == self.run_id, table.c.status == 'pending'))
+            .order_by(table.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(pending.scalar_subquery()))
+            .values(status='claimed', claimed_by=worker_id, claimed_at=datetime.now(timezone.utc))
+            .returning(table.c.id, table.c.account)
+        )
+        with self.engine.begin() as conn:
+            return [{'id': row_id, 'account': account} for row_id, account in conn.execute(stmt)]
+
+    def complete(self, item_id: int, error: Optional[str] = None) -> None:
+        table = WorkItem.__table__
+        stmt = update(table).where(table.c.id == item_id).values(
+            status='failed' if error else 'done', error=error, finished_at=datetime.now(timezone.utc)
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def requeue(self, worker_id: Optional[str] = None, older_than: Optional[float] = None) -> int:
+        """Put claimed-but-unfinished items back to pending (after a worker died or was restarted)."""
+        table = WorkItem.__table__
+        conditions = [table.c.run_id == self.run_id, table.c.status == 'claimed']
+        if worker_id:
+            conditions.append(table.c.claimed_by == worker_id)
+        if older_than is not None:
+            conditions.append(table.c.claimed_at < datetime.now(timezone.utc) - timedelta(seconds=older_than))
+        stmt = update(table).where(and_(*conditions)).values(status='pending', claimed_by=None, claimed_at=None)
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def fail_unfinished(self, error: str) -> int:
+        """Fail every item still pending or claimed, e.g. once no worker is left to run them."""
+        table = WorkItem.__table__
+        stmt = update(table).where(and_(table.c.run_id == self.run_id, table.c.status.in_(['pending', 'claimed']))).values(
+            status='failed', error=error, finished_at=datetime.now(timezone.utc)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def pending_count(self) -> int:
+        table = WorkItem.__table__
+        stmt = select(table.c.id).where(and_(table.c.run_id == self.run_id, table.c.status.in_(['pending', 'claimed'])))
+        with self.engine.connect() as conn:
+            return len(conn.execute(stmt).all())
+
+    def claim_tweet(self, tweet_url: str, worker_id: str) -> bool:
+        """INSERT ... ON CONFLICT DO NOTHING (a plain INSERT elsewhere): True only for the first worker to claim the URL."""
+        table = TweetClaim.__table__
+        if self._insert(table) is None:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(table.insert().values(run_id=self.run_id, tweet_url=tweet_url, claimed_by=worker_id))
+                return True
+            except IntegrityError:
+                return False
+        stmt = self._insert(table).values(
+            run_id=self.run_id, tweet_url=tweet_url, claimed_by=worker_id
+        ).on_conflict_do_nothing(index_elements=[table.c.run_id, table.c.tweet_url]).returning(table.c.id)
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).first() is not None
+
+
+class DBTweetClaims:
+    """TweetClaims backed by the tweet_claims table, shared across worker processes."""
+    def __init__(self, queue: WorkQueue, worker_id: str):
+        self.queue = queue
+        self.worker_id = worker_id
+
+    async def claim(self, tweet_url: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.queue.claim_tweet, tweet_url, self.worker_id)
+
+
+class ActionQueue:
+    """
+    Persistent per-account queue of planned engagements (the scheduled_actions table) for the
+    daemon. Items wait as 'pending' until their due time, are marked 'running' while acted on
+    and end as 'done' or 'failed'. An item found 'running' after a restart may already have
+    been reposted, so abandon() fails it instead of running it again.
+    """
+    def __init__(self, db_logger: TwitterDBLogger):
+        self.engine = db_logger.engine
+
+    def enqueue(self, account: str, planned: Iterable[Dict]) -> int:
+        """Queue planned items, each a dict with tweet, due_at and an optional reply."""
+        rows = [
+            {
+                'account': account,
+                'tweet_id': item['tweet'].get('tweet_id') or item['tweet']['url'],
+                'tweet': _tweet_to_json(item['tweet']),
+                'reply': item.get('reply'),
+                'status': 'pending',
+                'due_at': item['due_at']
+            }
+            for item in planned
+        ]
+        if rows:
+            with self.engine.begin() as conn:
+                conn.execute(ScheduledAction.__table__.insert(), rows)
+        return len(rows)
+
+    def next_pending(self, account: str) -> Optional[Dict]:
+        """The pending item due first (whether or not it is due yet), or None."""
+        table = ScheduledAction.__table__
+        stmt = (
+            select(table.c.id, table.c.tweet, table.c.reply, table.c.due_at)
+            .where(and_(table.c.account == account, table.c.status == 'pending'))
+            .order_by(table.c.due_at, table.c.id)
+            .limit(1)
+        )
+        with self.engine.connect() as conn:
+            row = conn.execute(stmt).first()
+        if row is None:
+            return None
+        return {'id': row.id, 'tweet': _tweet_from_json(row.tweet), 'reply': row.reply, 'due_at': _utc(row.due_at)}
+
+    def start(self, item_id: int) -> bool:
+        """Mark a pending item running; False if it is no longer pending."""
+        table = ScheduledAction.__table__
+        stmt = update(table).where(and_(table.c.id == item_id, table.c.status == 'pending')).values(status='running')
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def complete(self, item_id: int, error: Optional[str] = None) -> None:
+        table = ScheduledAction.__table__
+        stmt = update(table).where(table.c.id == item_id).values(
+            status='failed' if error else 'done', error=error, finished_at=datetime.now(timezone.utc)
+        )
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def abandon(self, account: str) -> int:
+        """Fail items left 'running' by a previous process."""
+        table = ScheduledAction.__table__
+        stmt = update(table).where(and_(table.c.account == account, table.c.status == 'running')).values(
+            status='failed', error='interrupted', finished_at=datetime.now(timezone.utc)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def expire(self, account: str, older_than: float) -> int:
+        """Drop pending items overdue by more than `older_than` seconds; their tweets have gone stale."""
+        table = ScheduledAction.__table__
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than)
+        stmt = update(table).where(and_(
+            table.c.account == account, table.c.status == 'pending', table.c.due_at < cutoff
+        )).values(status='expired', finished_at=datetime.now(timezone.utc))
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def pending_count(self, account: str) -> int:
+        table = ScheduledAction.__table__
+        stmt = select(table.c.id).where(and_(table.c.account == account, table.c.status == 'pending'))
+        with self.engine.connect() as conn:
+            return len(conn.execute(stmt).all())
+
+    def queued_tweet_ids(self, account: str, within: float = 7 * 86400) -> Set[str]:
+        """
+        Tweets queued for `account` that are still pending or were due in the last `within`
+        seconds, so a new plan does not pick them again. Older ones have left the feed, and
+        those that were acted on are filtered by the acted_tweets index anyway.
+        """
+        table = ScheduledAction.__table__
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=within)
+        stmt = select(table.c.tweet_id).where(and_(
+            table.c.account == account, (table.c.status == 'pending') | (table.c.due_at >= cutoff)
+        ))
+        with self.engine.connect() as conn:
+            return {tweet_id for (tweet_id,) in conn.execute(stmt)}
+
+
+def _tweet_to_json(tweet: Dict) -> Dict:
+    created_at = tweet.get('created_at')
+    return dict(tweet, created_at=created_at.isoformat() if isinstance(created_at, datetime) else created_at)
+
+
+def _tweet_from_json(tweet: Dict) -> Dict:
+    created_at = tweet.get('created_at')
+    return dict(tweet, created_at=datetime.fromisoformat(created_at) if created_at else None)